@@ -53,25 +53,128 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Same output as DRF's JSONRenderer, encoded with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'projects.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Login and signup attempts (projects.throttling), per client IP and per email.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': env('LOGIN_THROTTLE_IP_RATE', default='10/min'),
+        'login_email': env('LOGIN_THROTTLE_EMAIL_RATE', default='5/min'),
+    },
+    # Proxies in front of the app (1 on Render); with one, the client IP is the
+    # last X-Forwarded-For entry. 0 ignores the header, which a client without
+    # a proxy in front can set to anything, and keys on REMOTE_ADDR.
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
+# The proxy terminates TLS, so behind it take the scheme and host from its
+# X-Forwarded-Proto and X-Forwarded-Host headers. Otherwise absolute URLs,
+# such as pagination ``next`` links, would be http:// and blocked as mixed
+# content by the https frontend.
+if REST_FRAMEWORK['NUM_PROXIES']:
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    USE_X_FORWARDED_HOST = True
+
 JWT_COOKIE_NAME = 'jwt'
 JWT_COOKIE_SECURE = not DEBUG
 JWT_COOKIE_SAMESITE = 'Lax'
 JWT_COOKIE_HTTPONLY = True
 JWT_SECRET_KEY = env('JWT_SECRET_KEY')
 JWT_EXPIRATION_TIME = 3600
+# Per-process JWT auth cache (projects.utils.user_cache): at most
+# JWT_USER_CACHE_SIZE users, each kept for JWT_USER_CACHE_TTL seconds so other
+# workers pick up changes to the user.
+JWT_USER_CACHE_SIZE = env.int('JWT_USER_CACHE_SIZE', default=1024)
+JWT_USER_CACHE_TTL = env.int('JWT_USER_CACHE_TTL', default=30)
+# Per-process (user, project) -> role cache used by projects.permissions; entries
+# expire after the TTL (seconds) so other workers pick up membership changes.
+PROJECT_ROLE_CACHE_SIZE = env.int('PROJECT_ROLE_CACHE_SIZE', default=4096)
+PROJECT_ROLE_CACHE_TTL = env.int('PROJECT_ROLE_CACHE_TTL', default=30)
+# Login throttle buckets live in process memory, at most LOGIN_THROTTLE_CACHE_SIZE
+# keys per worker. Name a cache alias in LOGIN_THROTTLE_CACHE to share counts
+# between workers instead (sliding windows, since buckets need atomic updates).
+LOGIN_THROTTLE_CACHE = env('LOGIN_THROTTLE_CACHE', default=None)
+LOGIN_THROTTLE_CACHE_SIZE = env.int('LOGIN_THROTTLE_CACHE_SIZE', default=10000)
+
+# Django cache, used by the response cache below. Defaults to per-process local
+# memory; with several workers point CACHE_URL at a shared cache (e.g. redis://...)
+# so invalidations reach every worker, not just the one that handled the write.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Cached project list/detail, task list and member list responses
+# (projects.response_cache); entries expire after the timeout (seconds).
+RESPONSE_CACHE_ENABLED = env.bool('RESPONSE_CACHE_ENABLED', default=True)
+RESPONSE_CACHE_ALIAS = env('RESPONSE_CACHE_ALIAS', default='default')
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=30)
+
+# Live change feed (projects.events). The in-process broadcaster only reaches
+# clients connected to the same ASGI worker; point this at another backend to fan out.
+PROJECT_EVENTS_BROADCASTER = env('PROJECT_EVENTS_BROADCASTER', default='projects.events.InProcessBroadcaster')
+# Seconds between keep-alive comments on idle event streams.
+PROJECT_EVENTS_HEARTBEAT = env.int('PROJECT_EVENTS_HEARTBEAT', default=15)
+
+# Opt-in request profiling (projects.middleware.RequestProfilingMiddleware): Server-Timing
+# headers on every response, and a JSON log entry on projects.slow_requests for requests
+# slower than the threshold (ms). A query shape seen this many times in one request is
+# reported as a likely N+1.
+REQUEST_PROFILING = env.bool('REQUEST_PROFILING', default=False)
+REQUEST_PROFILING_SLOW_MS = env.int('REQUEST_PROFILING_SLOW_MS', default=500)
+REQUEST_PROFILING_REPEAT_THRESHOLD = env.int('REQUEST_PROFILING_REPEAT_THRESHOLD', default=5)
+
+# Serve the hot read endpoints (me, profile, project/task/comment lists) from native
+# async views. Only enable when running the ASGI application (see README).
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=False)
+
+# Delta sync (projects.sync). Each cursor is rewound by the overlap (seconds) so
+# rows committed slightly out of timestamp order are not missed; tombstones older
+# than the retention (days) are pruned and cursors older than that are refused.
+# A response holds about SYNC_PAGE_SIZE changes and says whether more follow.
+SYNC_CURSOR_OVERLAP = env.int('SYNC_CURSOR_OVERLAP', default=5)
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=1000)
+
+# Project export and import (projects.transfer): rows read, encoded, validated
+# and written per batch. Memory follows the batch size, not the project size.
+PROJECT_TRANSFER_BATCH_SIZE = env.int('PROJECT_TRANSFER_BATCH_SIZE', default=500)
+
+# Deleted projects are hidden at once and purged later (projects.deletion), this many
+# rows per DELETE. The purge runs on a thread in the process that deleted the project;
+# with that off, run `manage.py purge_deleted_projects` periodically instead.
+PROJECT_PURGE_BATCH_SIZE = env.int('PROJECT_PURGE_BATCH_SIZE', default=1000)
+PROJECT_PURGE_IN_PROCESS = env.bool('PROJECT_PURGE_IN_PROCESS', default=True)
+
+# Manual task order (projects.ranking). A move that leaves a rank longer than
+# TASK_RANK_REBALANCE_LENGTH respaces its column on a thread in that process;
+# with that off, run `manage.py rebalance_task_ranks` periodically instead.
+TASK_RANK_REBALANCE_LENGTH = env.int('TASK_RANK_REBALANCE_LENGTH', default=16)
+TASK_RANK_REBALANCE_IN_PROCESS = env.bool('TASK_RANK_REBALANCE_IN_PROCESS', default=True)
+
+# In-process metrics, served at /metrics in the Prometheus text format. With several
+# worker processes, point METRICS_DIR at a directory they share (and clear it on
+# deploy): each worker writes its totals there at most every METRICS_FLUSH_INTERVAL
+# seconds and /metrics sums them. Scrapers must send METRICS_TOKEN as a bearer
+# token; without one, /metrics is a 404 unless DEBUG is on.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_DIR = env('METRICS_DIR', default=None)
+METRICS_FLUSH_INTERVAL = env.int('METRICS_FLUSH_INTERVAL', default=5)
+METRICS_TOKEN = env('METRICS_TOKEN', default=None)
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, but async-capable, so ASGI requests stay on the event loop.
+    'projects.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'projects.middleware.JWTAuthenticationMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'projects.middleware.MetricsMiddleware',
+    'projects.middleware.RequestProfilingMiddleware',
+    'projects.middleware.JWTAuthenticationMiddleware',
+    'projects.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -108,9 +211,28 @@ DATABASES = {
     'default': dj_database_url.parse(env('DATABASE_URL'))              
 }
 
+# Read replicas, as comma separated URLs. Safe requests to the project, task,
+# comment and member views read from one of them (projects.routers); all writes
+# go to default. A client that writes is pinned to default for DATABASE_PIN_SECONDS,
+# which should exceed the replicas' usual lag, so it reads its own writes.
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[])):
+    alias = f'replica{index}'
+    # Test runs never create or drop a database on a replica; leave replicas unset for them.
+    DATABASES[alias] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['projects.routers.ReplicaRouter']
+DATABASE_PIN_SECONDS = env.int('DATABASE_PIN_SECONDS', default=5)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+# Logins use email; ModelBackend remains for username logins to the admin site.
+AUTHENTICATION_BACKENDS = [
+    'projects.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
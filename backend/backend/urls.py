@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from projects.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),  # Django Admin Interface
     path('api/', include('projects.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),  # Prometheus scrape endpoint
 ]
 
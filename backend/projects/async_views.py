@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+
+from .conditional import aconditional_get
+from .filters import filter_tasks, task_ordering
+from .models import Comment, Project, Task
+from .pagination import CommentPagination, ProjectPagination, TaskPagination
+from .permissions import IsProjectMember, aget_project_role
+from .renderers import FastJSONRenderer
+from .response_cache import project_version_key, version_tag
+from .rows import CommentRowSerializer, TaskRowSerializer
+from .serializers import ProjectSerializer, UserSerializer
+from .utils import aget_user_from_jwt
+from .views import CommentListCreateView, MeView, ProfileView, ProjectListCreateView, TaskListCreateView, visible_projects
+
+
+class AsyncReadView(View):
+    """
+    Native async GET for a hot read endpoint, served when ASYNC_READ_VIEWS is on.
+
+    GET responses match the DRF view named by ``sync_view`` byte for byte:
+    same authentication, permissions, filtering, pagination, ETags and JSON
+    rendering. Every other method is handed to ``sync_view`` in a worker
+    thread, so one URL keeps serving writes.
+    """
+    sync_view = None
+    project_member_required = False
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Same as APIView.as_view(), so writes handed to the DRF views behave as before.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+
+        try:
+            request.user = await aget_user_from_jwt(request)
+        except AuthenticationFailed:
+            # DRF answers 403 here because JWTAuthentication sends no WWW-Authenticate challenge.
+            return self.render({'detail': NotAuthenticated.default_detail}, status.HTTP_403_FORBIDDEN)
+        # Query parameter parsing and pagination links reuse DRF's request wrapper.
+        self.drf_request = Request(request)
+
+        try:
+            if self.project_member_required:
+                if await aget_project_role(request.user, kwargs['project_id']) is None:
+                    return self.render({'detail': IsProjectMember.message}, status.HTTP_403_FORBIDDEN)
+            return await self.get(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.render({'detail': str(exc)}, status.HTTP_404_NOT_FOUND)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(data, exc.status_code)
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        response = HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    async def render_list(self, queryset, serializer_class, pagination_class):
+        """Serialize ``queryset``, keyset-paginated exactly as the DRF view would be."""
+        paginator = pagination_class()
+        page = await paginator.apaginate_queryset(queryset, self.drf_request, view=self)
+        if page is not None:
+            return self.render(paginator.get_paginated_data(serializer_class(page, many=True).data))
+        return self.render(serializer_class([row async for row in queryset], many=True).data)
+
+    async def render_rows(self, queryset, row_serializer_class, pagination_class):
+        """render_list() for a row serializer, as RowListMixin does."""
+        serializer = row_serializer_class()
+        paginator = pagination_class()
+        page = paginator.page_queryset(queryset, self.drf_request, view=self)
+        if page is None:
+            return self.render(serializer.serialize([row async for row in serializer.values(queryset)]))
+        rows = paginator.set_page([row async for row in serializer.values(page, paginator.fields)])
+        return self.render(paginator.get_paginated_data(serializer.serialize(rows)))
+
+
+class AsyncMeView(AsyncReadView):
+    sync_view = MeView
+
+    async def get(self, request):
+        return self.render(UserSerializer(request.user).data)
+
+
+class AsyncProfileView(AsyncReadView):
+    sync_view = ProfileView
+
+    async def get(self, request, username):
+        user = await User.objects.filter(username=username).afirst()
+        if user is None:
+            raise Http404('No User matches the given query.')
+        return self.render(UserSerializer(user).data)
+
+
+class AsyncProjectListView(AsyncReadView):
+    sync_view = ProjectListCreateView
+    read_from_replica = True
+
+    async def get_validators(self):
+        agg = await Project.objects.filter(projectmembership__user=self.request.user).aaggregate(
+            count=Count('id'), latest=Max('updated_at'))
+        return f"{agg['count']}:{agg['latest']}", None
+
+    @aconditional_get
+    async def get(self, request):
+        queryset = visible_projects(request.user).order_by('created_at', 'id')
+        return await self.render_list(queryset, ProjectSerializer, ProjectPagination)
+
+
+class AsyncTaskListView(AsyncReadView):
+    sync_view = TaskListCreateView
+    read_from_replica = True
+    project_member_required = True
+
+    def get_ordering(self):
+        return task_ordering(self.drf_request.query_params, default=TaskPagination.ordering)
+
+    async def get_validators(self):
+        agg = await Task.objects.filter(project_id=self.kwargs['project_id']).aaggregate(
+            count=Count('id'), latest=Max('updated_at'))
+        version = await sync_to_async(version_tag)(project_version_key(self.kwargs['project_id']))
+        return f"{agg['count']}:{agg['latest']}:{version}", None
+
+    @aconditional_get
+    async def get(self, request, project_id):
+        queryset = Task.objects.filter(project_id=project_id).select_related('project', 'assignee')
+        queryset = filter_tasks(queryset, self.drf_request.query_params, request.user).order_by(*self.get_ordering())
+        return await self.render_rows(queryset, TaskRowSerializer, TaskPagination)
+
+
+class AsyncCommentListView(AsyncReadView):
+    sync_view = CommentListCreateView
+    read_from_replica = True
+    project_member_required = True
+
+    async def get_validators(self):
+        agg = await Comment.objects.filter(
+            task_id=self.kwargs['task_id'], task__project_id=self.kwargs['project_id']
+        ).aaggregate(count=Count('id'), latest=Max('updated_at'))
+        version = await sync_to_async(version_tag)(project_version_key(self.kwargs['project_id']))
+        return f"{agg['count']}:{agg['latest']}:{version}", None
+
+    @aconditional_get
+    async def get(self, request, project_id, task_id):
+        if not await Task.objects.filter(id=task_id, project_id=project_id).aexists():
+            raise Http404('No Task matches the given query.')
+        queryset = Comment.objects.filter(task_id=task_id).select_related('commenter', 'task').order_by('posted_at', 'id')
+        return await self.render_rows(queryset, CommentRowSerializer, CommentPagination)
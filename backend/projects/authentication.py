@@ -1,6 +1,7 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import User
+from . import metrics
 from .utils import get_user_from_jwt
 
 
@@ -8,7 +9,8 @@ class JWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
         try:
             user = get_user_from_jwt(request)
-        except AuthenticationFailed:
+        except AuthenticationFailed as exc:
+            metrics.AUTH_FAILURES.inc(reason=exc.detail)
             return None
 
         return (user, None)
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+User = get_user_model()
+
+
+def users_with_email(email):
+    """
+    Users whose email matches ``email`` ignoring case. Filters on
+    ``LOWER(email)`` so the auth_user_email_lower_idx expression index is used.
+    """
+    return User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.strip().lower())
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with ``email`` and ``password`` in a single query.
+
+    ``ModelBackend`` stays installed after this one for username logins
+    (the admin site); it ignores email credentials without querying.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not isinstance(email, str) or password is None:
+            return None
+        # Emails were not always unique, so try each account sharing one.
+        users = list(users_with_email(email).order_by('id'))
+        if not users:
+            # Hash anyway, so response time does not reveal whether the email is registered.
+            User().set_password(password)
+            return None
+        for user in users:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        return None
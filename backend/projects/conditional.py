@@ -0,0 +1,65 @@
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(method):
+    """
+    Wrap a view's ``get`` with ETag / Last-Modified support.
+
+    The view's ``get_validators()`` returns ``(seed, last_modified)`` from a
+    cheap aggregate query; ``seed`` must change whenever the payload would
+    (including deletions). Runs after authentication and permission checks.
+    When the client's validators match, a 304 is returned without touching
+    the serializer. A ``None`` seed skips conditional handling, e.g. when the
+    object does not exist and the view should produce its own 404.
+
+    Collections pass no ``last_modified``: deleting a row leaves the latest
+    ``updated_at`` of the rest unchanged, so a client revalidating with
+    If-Modified-Since alone would get a stale 304. Their ETag counts rows.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        seed, last_modified = self.get_validators()
+        if seed is None:
+            return method(self, request, *args, **kwargs)
+
+        etag, timestamp, response = check_validators(request, seed, last_modified)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, timestamp)
+    return wrapper
+
+def aconditional_get(method):
+    """Async counterpart of conditional_get(); ``get_validators()`` is awaited."""
+    @functools.wraps(method)
+    async def wrapper(self, request, *args, **kwargs):
+        seed, last_modified = await self.get_validators()
+        if seed is None:
+            return await method(self, request, *args, **kwargs)
+
+        etag, timestamp, response = check_validators(request, seed, last_modified)
+        if response is None:
+            response = await method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, timestamp)
+    return wrapper
+
+def check_validators(request, seed, last_modified):
+    """Return ``(etag, timestamp, response)``; ``response`` is a 304/412 or None."""
+    raw = f'{request.user.pk}|{request.get_full_path()}|{seed}'
+    etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+def set_validators(response, etag, timestamp):
+    response.headers['ETag'] = etag
+    if timestamp is not None:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,135 @@
+"""
+Deleting large projects without Django's cascade collector.
+
+``Project.delete()`` loads every task and membership of the project into
+Python and deletes everything in one transaction, which for a big project
+can outlast the request. Instead, ``mark_project_deleted()`` sets
+``Project.deleted_at`` in one short transaction. The project drops out of
+``Project.objects``, and with it out of lists and membership checks. The
+same transaction records what the cascade's signals would have: membership
+tombstones for delta sync, cache version bumps and a ``project.deleted`` event.
+
+``purge_project()`` then deletes the comments, tasks and memberships a
+bounded batch per statement, and finally the project row. It runs on a
+daemon thread in the process that marked the project
+(PROJECT_PURGE_IN_PROCESS), or from ``manage.py purge_deleted_projects``.
+Each batch commits on its own, so either can resume what the other left.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .events import publish_event
+from .models import Comment, Project, ProjectMembership, Task, Tombstone
+from .permissions import role_cache
+from .response_cache import bump, project_version_key, user_version_key
+
+logger = logging.getLogger('projects.deletion')
+
+
+def mark_project_deleted(project):
+    """Hide ``project`` now and queue its rows for purging."""
+    now = timezone.now()
+    with transaction.atomic():
+        if not Project.all_objects.filter(pk=project.pk, deleted_at__isnull=True).update(deleted_at=now, updated_at=now):
+            return
+        member_ids = list(ProjectMembership.objects.filter(project_id=project.pk).values_list('user_id', flat=True))
+        # Tells each member's sync client to drop the whole project.
+        Tombstone.objects.bulk_create([
+            Tombstone(kind='membership', object_id=user_id, project_id=project.pk, user_id=user_id) for user_id in member_ids
+        ])
+        bump(project_version_key(project.pk), *[user_version_key(user_id) for user_id in member_ids])
+        publish_event(project.pk, 'project.deleted')
+        if settings.PROJECT_PURGE_IN_PROCESS:
+            transaction.on_commit(start_purge_worker)
+    project.deleted_at = now
+    project_id = str(project.pk)
+    role_cache.discard_where(lambda key: key[1] == project_id)
+
+def _raw_delete(model, pks):
+    # A single DELETE without the collector: dependents are already gone, and
+    # the signals' work was done when the project was marked.
+    rows = model._base_manager.filter(pk__in=pks)
+    return rows._raw_delete(rows.db)
+
+def _purge_batches(queryset, batch_size):
+    """Delete ``queryset`` ``batch_size`` rows per statement, yielding the running total."""
+    deleted = 0
+    while batch := list(queryset.values_list('pk', flat=True)[:batch_size]):
+        deleted += _raw_delete(queryset.model, batch)
+        yield deleted
+
+def purge_task_comments(task_id, batch_size):
+    """Delete a task's comments in bounded batches, ahead of deleting the task itself."""
+    for _ in _purge_batches(Comment.objects.filter(task_id=task_id), batch_size):
+        pass
+
+def purge_project(project_id, batch_size, progress=None):
+    """
+    Delete a marked project's rows. ``progress(project_id, table, deleted)``
+    is called after every batch. Returns rows deleted per table.
+    """
+    tables = {
+        'comments': Comment.objects.filter(task__project_id=project_id),
+        'tasks': Task.objects.filter(project_id=project_id),
+        'memberships': ProjectMembership.objects.filter(project_id=project_id),
+    }
+    deleted = dict.fromkeys(tables, 0)
+    for table, queryset in tables.items():
+        for count in _purge_batches(queryset, batch_size):
+            deleted[table] = count
+            if progress:
+                progress(project_id, table, deleted[table])
+
+    with transaction.atomic():
+        # Anything written by requests that were already under way when the project was marked.
+        for table, queryset in tables.items():
+            deleted[table] += _raw_delete(queryset.model, queryset.values('pk'))
+        _raw_delete(Project, Project.all_objects.filter(pk=project_id, deleted_at__isnull=False).values('pk'))
+    return deleted
+
+def purge_deleted_projects(batch_size, progress=None):
+    """Purge every marked project, oldest first. Returns how many were purged."""
+    purged = 0
+    marked = Project.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at')
+    while (project_id := marked.values_list('pk', flat=True).first()) is not None:
+        purge_project(project_id, batch_size, progress)
+        purged += 1
+    return purged
+
+def log_progress(project_id, table, deleted):
+    logger.info('Purging project %s: %s %s deleted', project_id, deleted, table)
+
+
+_worker = None
+_pending = False
+_worker_lock = threading.Lock()
+
+def start_purge_worker():
+    """Have this process's purge thread run again, starting it if it is not running."""
+    global _worker, _pending
+    with _worker_lock:
+        _pending = True
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name='project-purge', daemon=True)
+            _worker.start()
+
+def _run_worker():
+    global _worker, _pending
+    try:
+        while True:
+            with _worker_lock:
+                if not _pending:
+                    _worker = None
+                    return
+                _pending = False
+            purge_deleted_projects(settings.PROJECT_PURGE_BATCH_SIZE, log_progress)
+    except Exception:
+        logger.exception('Project purge failed; the next deletion or purge_deleted_projects will retry it.')
+        with _worker_lock:
+            _worker = None
+    finally:
+        connections.close_all()
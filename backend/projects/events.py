@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One client's stream of events for a project, consumed on its event loop."""
+
+    def __init__(self, broadcaster, project_id, user_id, queue_size):
+        self.broadcaster = broadcaster
+        self.project_id = project_id
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Hand an event over from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The client's loop has shut down; it will unsubscribe on its own.
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind must resync rather than silently miss events.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """
+    Fan events out to subscribers connected to this process.
+
+    Alternative backends (e.g. Redis pub/sub for multi-process deployments)
+    implement the same ``publish`` / ``subscribe`` / ``unsubscribe`` methods
+    and are selected with the PROJECT_EVENTS_BROADCASTER setting.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, project_id, event):
+        event = {'event_id': next(self._ids), **event}
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(project_id), ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, project_id, user_id):
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(self, str(project_id), user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[subscription.project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.project_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.project_id]
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                backend = getattr(settings, 'PROJECT_EVENTS_BROADCASTER', 'projects.events.InProcessBroadcaster')
+                _broadcaster = import_string(backend)()
+    return _broadcaster
+
+def publish_event(project_id, event_type, **data):
+    """Publish a compact change event once the surrounding transaction commits."""
+    event = {'type': event_type, 'project_id': str(project_id), **data}
+    transaction.on_commit(lambda: get_broadcaster().publish(project_id, event))
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events message."""
+    return f"id: {event.get('event_id', '')}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+def ends_stream(event, user_id):
+    """Whether ``event`` revokes the subscriber's access to the project."""
+    return event['type'] == 'project.deleted' or (
+        event['type'] == 'membership.deleted' and event.get('user_id') == user_id
+    )
+
+async def event_stream(subscription, heartbeat):
+    """
+    Yield SSE messages for a subscription until the client goes away or
+    loses access. Idle streams get a comment every ``heartbeat`` seconds so
+    proxies keep the connection open.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            event = await subscription.get(heartbeat)
+            if subscription.overflowed:
+                # Events were dropped; the client must refetch before resubscribing.
+                yield format_sse({'type': 'resync', 'project_id': subscription.project_id})
+                return
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event)
+            if ends_stream(event, subscription.user_id):
+                return
+    finally:
+        subscription.close()
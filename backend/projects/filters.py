@@ -0,0 +1,102 @@
+import uuid
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+# Public sort keys for task lists, mapped to the columns that back them.
+# ``priority`` sorts by its ordinal (low < medium < high), not its label.
+# ``rank`` is the manual board order, column by column.
+TASK_ORDERING_FIELDS = {
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'due_date': 'due_date',
+    'priority': 'priority_rank',
+    'status': 'status',
+    'title': 'title',
+    'rank': ('status', 'rank'),
+}
+
+def _csv(value):
+    return [part for part in value.split(',') if part]
+
+def _parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        # Well formed but not a real date, e.g. 2024-13-01.
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Must be a date in YYYY-MM-DD format.'})
+    return parsed
+
+def filter_tasks(queryset, params, user):
+    """
+    Apply the task list query parameters to ``queryset``.
+
+    Supported: ``project`` (id), ``status`` and ``priority`` (comma separated),
+    ``assignee`` (``me``, ``none`` or a user id), ``due_after`` / ``due_before``
+    (inclusive dates) and ``overdue`` (``true`` / ``false``).
+    """
+    project_id = params.get('project')
+    if project_id:
+        try:
+            queryset = queryset.filter(project_id=uuid.UUID(project_id))
+        except ValueError:
+            raise ValidationError({'project': 'Must be a valid project id.'})
+
+    if params.get('status'):
+        queryset = queryset.filter(status__in=_csv(params['status']))
+
+    if params.get('priority'):
+        queryset = queryset.filter(priority__in=_csv(params['priority']))
+
+    assignee = params.get('assignee')
+    if assignee == 'me':
+        queryset = queryset.filter(assignee=user)
+    elif assignee == 'none':
+        queryset = queryset.filter(assignee__isnull=True)
+    elif assignee:
+        if not assignee.isdigit():
+            raise ValidationError({'assignee': 'Must be "me", "none" or a user id.'})
+        queryset = queryset.filter(assignee_id=int(assignee))
+
+    due_after = _parse_date_param(params, 'due_after')
+    if due_after:
+        queryset = queryset.filter(due_date__gte=due_after)
+    due_before = _parse_date_param(params, 'due_before')
+    if due_before:
+        queryset = queryset.filter(due_date__lte=due_before)
+
+    overdue = params.get('overdue')
+    if overdue:
+        if overdue not in ('true', 'false'):
+            raise ValidationError({'overdue': 'Must be "true" or "false".'})
+        is_overdue = {'due_date__lt': timezone.localdate()}
+        if overdue == 'true':
+            queryset = queryset.filter(**is_overdue).exclude(status='done')
+        else:
+            queryset = queryset.exclude(**is_overdue, status__in=['todo', 'in_progress'])
+
+    return queryset
+
+def task_ordering(params, default):
+    """
+    Resolve ``?ordering=`` (one sort key, ``-`` for descending) into an
+    order_by tuple with ``id`` as the tie-breaker in the same direction.
+    """
+    value = params.get('ordering')
+    if not value:
+        return default
+
+    descending = value.startswith('-')
+    fields = TASK_ORDERING_FIELDS.get(value.lstrip('-'))
+    if fields is None:
+        raise ValidationError({'ordering': f'Must be one of: {", ".join(TASK_ORDERING_FIELDS)}.'})
+    if isinstance(fields, str):
+        fields = (fields,)
+    prefix = '-' if descending else ''
+    return tuple(f'{prefix}{field}' for field in fields) + (f'{prefix}id',)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.urls import path as url_path, reverse
+
+from projects import async_views, views
+from projects.models import Comment, ProjectMembership
+from projects.utils import generate_jwt
+
+ENDPOINTS = [
+    ('me', views.MeView, async_views.AsyncMeView),
+    ('profile', views.ProfileView, async_views.AsyncProfileView),
+    ('project_list', views.ProjectListCreateView, async_views.AsyncProjectListView),
+    ('task_list', views.TaskListCreateView, async_views.AsyncTaskListView),
+    ('comment_list', views.CommentListCreateView, async_views.AsyncCommentListView),
+]
+
+# The test client's 'testserver' is only allowed under the test runner.
+HEADERS = {'host': 'localhost'}
+
+
+class BenchmarkURLConf:
+    """
+    Resolve every request against a one-route URLconf, so each mode reaches
+    its own view class whatever ASYNC_READ_VIEWS is.
+    """
+    def __init__(self, view_class, path, kwargs):
+        self.urlconf = ModuleType('benchmark_urls')
+        self.urlconf.urlpatterns = [url_path(path.lstrip('/'), view_class.as_view(), kwargs)]
+        super().__init__()
+
+    def get_response(self, request):
+        request.urlconf = self.urlconf
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
+
+class BenchmarkWSGIHandler(BenchmarkURLConf, WSGIHandler):
+    pass
+
+class BenchmarkASGIHandler(BenchmarkURLConf, ASGIHandler):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare sync (DRF) and native async read views under concurrent load, through the '
+        'WSGI and ASGI handlers with the configured MIDDLEWARE. Sync views run on a pool of '
+        'threads standing in for sync workers; async views run on one event loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and mode.')
+        parser.add_argument('--concurrency', type=int, default=64, help='In-flight requests on the event loop.')
+        parser.add_argument('--sync-workers', type=int, default=8, help='Threads serving the sync views.')
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help='Extra delay added to every query, to model a network hop to the database.')
+        parser.add_argument('--user', help='Username to authenticate as (default: the first project member found).')
+        parser.add_argument('--json', action='store_true', help='Print machine-readable results.')
+
+    def handle(self, *args, **options):
+        targets = self.targets(options['user'])
+        if options['db_latency_ms']:
+            self.add_db_latency(options['db_latency_ms'] / 1000)
+
+        results = []
+        for name, sync_view, async_view in ENDPOINTS:
+            path, kwargs = targets[name]
+            for mode, run in (('sync', self.run_sync), ('async', self.run_async)):
+                timings, elapsed = run(sync_view if mode == 'sync' else async_view, path, kwargs, targets['token'], options)
+                results.append(self.summarize(name, mode, timings, elapsed))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<14}{'mode':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<14}{row['mode']:<7}{row['rps']:>10.1f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            )
+
+    def targets(self, username):
+        memberships = ProjectMembership.objects.select_related('user', 'project')
+        membership = (memberships.filter(user__username=username) if username else memberships).first()
+        if membership is None:
+            raise CommandError('Need a user with at least one project; seed some data first.')
+        user, project = membership.user, membership.project
+        comment = Comment.objects.filter(task__project=project).first()
+        task_id = comment.task_id if comment else project.tasks.values_list('id', flat=True).first() or 0
+        return {
+            'token': generate_jwt(user),
+            'me': (reverse('me'), {}),
+            'profile': (reverse('profile', args=[user.username]), {'username': user.username}),
+            'project_list': (reverse('project_list_create'), {}),
+            'task_list': (reverse('task_list_create', args=[project.id]), {'project_id': project.id}),
+            'comment_list': (reverse('comment', args=[project.id, task_id]), {'project_id': project.id, 'task_id': task_id}),
+        }
+
+    def add_db_latency(self, delay):
+        def slow_execute(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # Fires again on every reconnect of the same wrapper object.
+            if slow_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_execute)
+
+        connection_created.connect(install, weak=False)
+
+    def run_sync(self, view_class, path, kwargs, token, options):
+        handler = BenchmarkWSGIHandler(view_class, path, kwargs)
+        factory = RequestFactory()
+        factory.cookies['jwt'] = token
+
+        def one(_):
+            status = []
+            start = time.perf_counter()
+            # Closing the response ends the request, which closes the connection as CONN_MAX_AGE=0 does.
+            response = handler(factory.get(path, headers=HEADERS).environ, lambda code, headers: status.append(code))
+            b''.join(response)
+            response.close()
+            assert status[0].startswith('200'), status[0]
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['sync_workers']) as pool:
+            timings = list(pool.map(one, range(options['requests'])))
+        return timings, time.perf_counter() - start
+
+    def run_async(self, view_class, path, kwargs, token, options):
+        handler = BenchmarkASGIHandler(view_class, path, kwargs)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+            'method': 'GET', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HEADERS['host'].encode()), (b'cookie', f'jwt={token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': (HEADERS['host'], 80),
+        }
+
+        async def one(semaphore):
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            status = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # The client stays connected until the handler is done with it.
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                assert status[0] == 200, status[0]
+                return time.perf_counter() - start
+
+        async def main():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(one(semaphore) for _ in range(options['requests'])))
+
+        start = time.perf_counter()
+        timings = asyncio.run(main())
+        return timings, time.perf_counter() - start
+
+    def summarize(self, endpoint, mode, timings, elapsed):
+        cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'endpoint': endpoint,
+            'mode': mode,
+            'requests': len(timings),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(cuts[49] * 1000, 2),
+            'p95_ms': round(cuts[94] * 1000, 2),
+            'p99_ms': round(cuts[98] * 1000, 2),
+        }
@@ -0,0 +1,227 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from projects.models import Comment, Project, ProjectMembership, Task
+from projects.sync import encode_cursor
+from projects.transfer import CONTENT_TYPES
+from projects.throttling import reset_throttles
+from projects.utils import generate_jwt
+
+# Streams never finish, so they cannot be timed per request.
+SKIPPED = {'project_events': 'Server-Sent Events stream'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive every endpoint in projects/urls.py through the test client and report p50/p95/p99 '
+        'latency, queries per request and response bytes. Writes are rolled back after each '
+        'request so every run sees the same data. Generate data first with generate_dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint, to warm caches.')
+        parser.add_argument('--only', action='append', default=[], help='Only run endpoints whose name contains this.')
+        parser.add_argument('--password', default='password', help='Password of the benchmark user, for login.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+        parser.add_argument('--compare', help='A previous JSON report to print changes against.')
+        parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table.')
+
+    def handle(self, *args, **options):
+        context = self.context()
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*',) and not h.startswith('.')), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.client.cookies['jwt'] = generate_jwt(context['user'])
+        self.host = host
+
+        results = []
+        for name, method, path, data, write in self.scenarios(context, options):
+            if options['only'] and not any(part in name for part in options['only']):
+                continue
+            for i in range(options['warmup']):
+                self.request(name, method, path, data, write, i)
+            samples = [self.request(name, method, path, data, write, i) for i in range(options['requests'])]
+            results.append(self.summarize(name, method, samples))
+
+        report = {'meta': self.meta(options), 'skipped': SKIPPED, 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_table(results, self.load_baseline(options['compare']))
+
+    def context(self):
+        # The busiest project with tasks: most members, then most tasks.
+        project = Project.objects.filter(owner__isnull=False).annotate(
+            members=Count('projectmembership'),
+            tasks_total=F('todo_count') + F('in_progress_count') + F('done_count'),
+        ).filter(tasks_total__gt=0).order_by('-members', '-tasks_total', 'id').select_related('owner').first()
+        if project is None:
+            raise CommandError('No projects with tasks to benchmark; run generate_dataset first.')
+        task = project.tasks.order_by('-comment_count', 'id').first()
+        # The task a move puts ``task`` in front of: the top of its column.
+        top = project.tasks.filter(status=task.status).exclude(pk=task.pk).order_by('rank', 'id').first()
+
+        members = ProjectMembership.objects.filter(project=project).exclude(user=project.owner)
+        return {
+            'user': project.owner,
+            'project': project,
+            'task': task,
+            'move_before': top and top.id,
+            'comment': Comment.objects.filter(task=task).first(),
+            'member': members.select_related('user').first(),
+            'outsider': User.objects.exclude(projectmembership__project=project).first(),
+            'sync_cursor': encode_cursor(timezone.now() - timedelta(hours=1)),
+        }
+
+    def scenarios(self, context, options):
+        """(name, method, path, data(i), write) for every endpoint that can be exercised."""
+        project, task, user = context['project'], context['task'], context['user']
+        p, t = project.id, task.id
+        yield 'signup', 'post', reverse('signup'), lambda i: {
+            'email': f'benchmark-signup-{i}@example.com', 'first_name': 'Bench', 'last_name': 'Mark', 'password': 'password'
+        }, True
+        yield 'login', 'post', reverse('login'), lambda i: {'email': user.email, 'password': options['password']}, True
+        yield 'logout', 'post', reverse('logout'), None, True
+        yield 'me', 'get', reverse('me'), None, False
+        yield 'profile', 'get', reverse('profile', args=[user.username]), None, False
+
+        yield 'project_list_create', 'get', reverse('project_list_create'), None, False
+        yield 'project_list_create', 'post', reverse('project_list_create'), lambda i: {'name': f'Benchmark {i}'}, True
+        yield 'project_detail', 'get', reverse('project_detail', args=[p]), None, False
+        yield 'project_detail', 'patch', reverse('project_detail', args=[p]), lambda i: {'description': f'Edit {i}'}, True
+        yield 'project_detail', 'delete', reverse('project_detail', args=[p]), None, True
+        yield 'project_stats', 'get', reverse('project_stats', args=[p]), None, False
+        yield 'project_stats_summary', 'get', reverse('project_stats_summary'), None, False
+
+        yield 'task_list_create', 'get', reverse('task_list_create', args=[p]), None, False
+        yield 'task_list_create', 'post', reverse('task_list_create', args=[p]), lambda i: {'title': f'Benchmark {i}'}, True
+        yield 'task_detail', 'get', reverse('task_detail', args=[p, t]), None, False
+        yield 'task_detail', 'patch', reverse('task_detail', args=[p, t]), lambda i: {'status': 'done'}, True
+        yield 'task_detail', 'delete', reverse('task_detail', args=[p, t]), None, True
+        yield 'task_bulk', 'post', reverse('task_bulk', args=[p]), lambda i: {
+            'create': [{'title': f'Bulk {i}.{n}'} for n in range(20)],
+        }, True
+        yield 'task_move', 'post', reverse('task_move', args=[p, t]), lambda i: {'before': context['move_before']}, True
+        yield 'my_tasks', 'get', reverse('my_tasks'), None, False
+
+        yield 'project_membership', 'get', reverse('project_membership', args=[p]), None, False
+        if context['outsider']:
+            yield 'project_membership', 'post', reverse('project_membership', args=[p]), lambda i: {
+                'username': context['outsider'].username
+            }, True
+        if context['member']:
+            member_url = reverse('project_membership_detail', args=[p, context['member'].user_id])
+            yield 'project_membership_detail', 'get', member_url, None, False
+            yield 'project_membership_detail', 'patch', member_url, lambda i: {'role': 'admin'}, True
+            yield 'project_membership_detail', 'delete', member_url, None, True
+
+        yield 'comment', 'get', reverse('comment', args=[p, t]), None, False
+        yield 'comment', 'post', reverse('comment', args=[p, t]), lambda i: {'comment': f'Benchmark {i}'}, True
+        if context['comment']:
+            yield 'comment_detail', 'get', reverse('comment_detail', args=[p, t, context['comment'].id]), None, False
+
+        export_url = reverse('project_export', args=[p])
+        yield 'project_export', 'get', export_url, None, False
+        yield 'project_export', 'get', f'{export_url}?as=csv', None, False
+        # Imports a copy of the benchmarked project; the copy is rolled back.
+        export = b''.join(self.client.get(export_url).streaming_content)
+        yield 'project_import', 'post', reverse('project_import'), lambda i: export, True
+
+        yield 'sync', 'get', f"{reverse('sync')}?cursor={context['sync_cursor']}", None, False
+        yield 'search', 'get', f"{reverse('search')}?q={task.title.split()[-1]}", None, False
+
+    def request(self, name, method, path, data, write, i):
+        # Auth endpoints replace or clear the session cookie, so they get a client of their own.
+        client = self.client
+        if name in ('signup', 'login', 'logout'):
+            client = Client(HTTP_HOST=self.host)
+            client.cookies['jwt'] = self.client.cookies['jwt'].value
+            # Measure the views, not the login throttles.
+            reset_throttles()
+        body = data(i) if data else None
+        if isinstance(body, bytes):
+            kwargs = {'data': body, 'content_type': CONTENT_TYPES['ndjson']}
+        else:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if data else {}
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method)(path, **kwargs)
+                # A stream's queries run as it is read.
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+            if write:
+                transaction.set_rollback(True)
+        return elapsed, len(queries), len(content), response.status_code
+
+    def summarize(self, name, method, samples):
+        timings = [sample[0] for sample in samples]
+        cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'endpoint': name,
+            'method': method.upper(),
+            'requests': len(samples),
+            'p50_ms': round(cuts[49] * 1000, 2),
+            'p95_ms': round(cuts[94] * 1000, 2),
+            'p99_ms': round(cuts[98] * 1000, 2),
+            'queries': statistics.median(sample[1] for sample in samples),
+            'queries_max': max(sample[1] for sample in samples),
+            'bytes': round(statistics.mean(sample[2] for sample in samples)),
+            'status': sorted({sample[3] for sample in samples}),
+        }
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'dataset': {
+                'users': User.objects.count(),
+                'projects': Project.objects.count(),
+                'tasks': Task.objects.count(),
+                'comments': Comment.objects.count(),
+            },
+        }
+
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        with open(path) as f:
+            return {(row['endpoint'], row['method']): row for row in json.load(f)['results']}
+
+    def print_table(self, results, baseline):
+        header = f"{'endpoint':<28}{'method':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'bytes':>9}  status"
+        self.stdout.write(header + ('  Δp50     Δqueries' if baseline else ''))
+        for row in results:
+            line = (
+                f"{row['endpoint']:<28}{row['method']:<8}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['queries']:>9g}{row['bytes']:>9}  {','.join(map(str, row['status']))}"
+            )
+            before = baseline.get((row['endpoint'], row['method']))
+            if before:
+                change = (row['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+                line += f"  {change:+6.1f}%  {row['queries'] - before['queries']:+g}"
+            self.stdout.write(line)
+        for name, reason in SKIPPED.items():
+            self.stdout.write(f'{name:<28}skipped ({reason})')
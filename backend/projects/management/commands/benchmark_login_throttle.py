@@ -0,0 +1,124 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from projects.throttling import reset_throttles
+from projects.views import LoginView
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure legitimate login latency while wrong-password logins arrive at a fixed rate '
+        'from a few addresses, with the login throttles off and on. Requests are queued on a '
+        'pool of threads standing in for the workers, so latency includes time spent waiting '
+        'behind the attack. Requests still queued when the run ends are dropped; legitimate '
+        'ones among them count as unanswered, with their wait so far as latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds per run.')
+        parser.add_argument('--rate', type=int, default=1000, help='Attack requests per second.')
+        parser.add_argument('--attack-ips', type=int, default=1, help='Addresses the attack is spread over.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between legitimate logins.')
+        parser.add_argument('--workers', type=int, default=2, help='Threads serving requests.')
+        parser.add_argument('--password', default='password', help='Password shared by the generated users.')
+        parser.add_argument('--json', action='store_true', help='Print machine-readable results.')
+
+    def handle(self, *args, **options):
+        # Each legitimate login is a different user from a different address, as in real traffic.
+        self.users = list(User.objects.exclude(email='').order_by('id').values_list('email', flat=True)[:250])
+        if not self.users or not User.objects.get(email=self.users[0]).check_password(options['password']):
+            raise CommandError('Need users with that password; run generate_dataset first or pass --password.')
+        self.path = reverse('login')
+
+        results = []
+        for throttled in (False, True):
+            reset_throttles()
+            view = LoginView.as_view() if throttled else LoginView.as_view(throttle_classes=[])
+            results.append({'throttled': throttled, **self.run(view, options)})
+        reset_throttles()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'throttle':<10}{'attack sent':>12}{'served':>8}{'rejected':>10}"
+            f"{'legit ok':>10}{'unanswered':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{'on' if row['throttled'] else 'off':<10}{row['attack_sent']:>12}{row['attack_served']:>8}"
+                f"{row['attack_rejected']:>10}{row['legit_ok']:>10}{row['legit_unanswered']:>12}"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            )
+
+    def run(self, view, options):
+        factory = RequestFactory()
+        ips = [f'203.0.113.{i % 250 + 1}' for i in range(options['attack_ips'])]
+        counts = {'served': 0, 'rejected': 0}
+        lock = threading.Lock()
+
+        def request(data, ip):
+            response = view(factory.post(self.path, data, content_type='application/json', REMOTE_ADDR=ip))
+            # As at the end of a real request: CONN_MAX_AGE=0 closes the connection.
+            connections.close_all()
+            return response.status_code
+
+        def attack(i):
+            status = request({'email': f'victim{i}@example.com', 'password': 'guess'}, ips[i % len(ips)])
+            with lock:
+                counts['rejected' if status == 429 else 'served'] += 1
+
+        def login(i, submitted):
+            data = {'email': self.users[i % len(self.users)], 'password': options['password']}
+            status = request(data, f'198.51.100.{i % 250 + 1}')
+            return status, time.perf_counter() - submitted
+
+        sent = 0
+        legit = []
+        pool = ThreadPoolExecutor(max_workers=options['workers'])
+        start = time.perf_counter()
+        next_legit = start
+        while (now := time.perf_counter()) - start < options['duration']:
+            # Open loop: submit everything that is due, however far behind the pool is.
+            due = int((now - start) * options['rate'])
+            for i in range(sent, due):
+                pool.submit(attack, i)
+            sent = due
+            if now >= next_legit:
+                legit.append((now, pool.submit(login, len(legit), now)))
+                next_legit += options['interval']
+            time.sleep(0.001)
+        end = time.perf_counter()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+        timings, ok, unanswered = [], 0, 0
+        for submitted, future in legit:
+            if future.cancelled():
+                unanswered += 1
+                timings.append(end - submitted)
+                continue
+            status, elapsed = future.result()
+            ok += status == 200
+            timings.append(elapsed)
+        cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'seconds': round(end - start, 3),
+            'attack_sent': sent,
+            'attack_served': counts['served'],
+            'attack_rejected': counts['rejected'],
+            'legit_sent': len(legit),
+            'legit_ok': ok,
+            'legit_unanswered': unanswered,
+            'p50_ms': round(cuts[49] * 1000, 1),
+            'p95_ms': round(cuts[94] * 1000, 1),
+            'p99_ms': round(cuts[98] * 1000, 1),
+        }
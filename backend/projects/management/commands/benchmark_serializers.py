@@ -0,0 +1,76 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from projects.models import Comment, Task
+from projects.renderers import FastJSONRenderer, orjson
+from projects.rows import CommentRowSerializer, TaskRowSerializer
+from projects.serializers import CommentSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows per second for the task and comment lists: ModelSerializer over model '
+        'instances rendered by DRF\'s JSONRenderer, against row serializers over .values() '
+        'rendered by FastJSONRenderer. Checks that both produce the same bytes. '
+        'Generate data first with generate_dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per list (at most).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the fastest is reported.')
+        parser.add_argument('--json', action='store_true', help='Print machine-readable results.')
+
+    def handle(self, *args, **options):
+        project_id = Task.objects.values('project_id').annotate(n=Count('id')).order_by('-n').values_list('project_id', flat=True).first()
+        task_id = Comment.objects.values('task_id').annotate(n=Count('id')).order_by('-n').values_list('task_id', flat=True).first()
+        if project_id is None or task_id is None:
+            raise CommandError('No tasks or comments to serialize; run generate_dataset first.')
+
+        lists = [
+            ('task_list', Task.objects.filter(project_id=project_id).select_related('project', 'assignee').order_by('created_at', 'id'),
+             TaskSerializer, TaskRowSerializer),
+            ('comment_list', Comment.objects.filter(task_id=task_id).select_related('commenter', 'task').order_by('posted_at', 'id'),
+             CommentSerializer, CommentRowSerializer),
+        ]
+        results = []
+        for name, queryset, serializer_class, row_serializer_class in lists:
+            queryset = queryset[:options['rows']]
+            before, before_bytes = self.best(options['repeat'], lambda: JSONRenderer().render(
+                serializer_class(list(queryset), many=True).data))
+            after, after_bytes = self.best(options['repeat'], lambda: FastJSONRenderer().render(
+                row_serializer_class().serialize(row_serializer_class().values(queryset))))
+            if before_bytes != after_bytes:
+                raise CommandError(f'{name}: the fast path changed the response body.')
+            rows = queryset.count()
+            results.append({
+                'endpoint': name,
+                'rows': rows,
+                'bytes': len(after_bytes),
+                'before_rows_per_s': round(rows / before),
+                'after_rows_per_s': round(rows / after),
+                'speedup': round(before / after, 2),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'orjson': orjson is not None, 'results': results}, indent=2))
+            return
+        self.stdout.write(f"JSON encoder: {'orjson' if orjson is not None else 'standard library'}")
+        self.stdout.write(f"{'endpoint':<14}{'rows':>7}{'before rows/s':>15}{'after rows/s':>14}{'speedup':>9}")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<14}{row['rows']:>7}{row['before_rows_per_s']:>15}"
+                f"{row['after_rows_per_s']:>14}{row['speedup']:>8}x"
+            )
+
+    def best(self, repeat, run):
+        """Fastest of ``repeat`` runs, including the queries, and the bytes it produced."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = run()
+            timings.append(time.perf_counter() - start)
+        return min(timings), body
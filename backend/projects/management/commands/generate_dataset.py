@@ -0,0 +1,133 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from projects.models import Comment, Project, ProjectMembership, Task
+
+VERBS = ['Design', 'Implement', 'Review', 'Test', 'Refactor', 'Document', 'Deploy', 'Fix', 'Plan', 'Measure']
+NOUNS = ['login flow', 'task board', 'API client', 'search page', 'release notes', 'database schema',
+         'onboarding', 'dashboard', 'notifications', 'settings page', 'CI pipeline', 'error handling']
+FIRST_NAMES = ['Ada', 'Grace', 'Alan', 'Linus', 'Barbara', 'Ken', 'Margaret', 'Dennis', 'Frances', 'Edsger']
+LAST_NAMES = ['Lovelace', 'Hopper', 'Turing', 'Torvalds', 'Liskov', 'Thompson', 'Hamilton', 'Ritchie', 'Allen', 'Dijkstra']
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic dataset for load testing with bulk inserts: users, '
+        'projects with skewed membership sizes, tasks per project and comments per task.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--tasks-per-project', type=int, default=50,
+                            help='Mean tasks per project; counts are exponentially distributed.')
+        parser.add_argument('--comments-per-task', type=int, default=3,
+                            help='Mean comments per task; counts are exponentially distributed.')
+        parser.add_argument('--max-members', type=int, default=50, help='Largest project membership.')
+        parser.add_argument('--skew', type=float, default=1.2,
+                            help='Pareto shape of membership sizes; lower means a longer tail of big projects.')
+        parser.add_argument('--prefix', default='load', help='Username prefix, so generated users are easy to find.')
+        parser.add_argument('--password', default='password', help='Password shared by every generated user.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed yields the same dataset.')
+        parser.add_argument('--batch-size', type=int, default=50, help='Projects written per transaction.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users named {prefix}* already exist; pass a different --prefix.')
+
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        users = self.create_users(options)
+        self.stdout.write(f'Users: {len(users)}')
+
+        totals = {'projects': 0, 'memberships': 0, 'tasks': 0, 'comments': 0}
+        for start in range(0, options['projects'], options['batch_size']):
+            count = min(options['batch_size'], options['projects'] - start)
+            with transaction.atomic():
+                for name, created in self.create_projects(users, start, count, options).items():
+                    totals[name] += created
+            self.stdout.write(f"Projects: {totals['projects']}/{options['projects']}")
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{created} {name}' for name, created in totals.items())))
+
+    def create_users(self, options):
+        # Hashing is deliberately slow, so every generated user shares one hash.
+        password = make_password(options['password'])
+        users = [
+            User(
+                username=f"{options['prefix']}{i}",
+                email=f"{options['prefix']}{i}@example.com",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for i in range(options['users'])
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        return list(User.objects.filter(username__startswith=options['prefix']).order_by('id').values_list('id', flat=True))
+
+    def create_projects(self, users, start, count, options):
+        projects, memberships, tasks, comment_plan = [], [], [], []
+        for i in range(start, start + count):
+            size = min(options['max_members'], len(users), int(self.rng.paretovariate(options['skew'])))
+            members = self.rng.sample(users, size)
+            project = Project(name=f"{options['prefix']} project {i}", description='Generated for load testing.',
+                              owner_id=members[0])
+            projects.append(project)
+            memberships.extend(
+                ProjectMembership(project=project, user_id=user_id, role='owner' if j == 0 else self.role())
+                for j, user_id in enumerate(members)
+            )
+
+            for _ in range(self.count(options['tasks_per_project'])):
+                task = self.task(project, members)
+                # bulk_create skips Task.save()/Comment.save(), so the counters are filled in here.
+                counter = Project.STATUS_COUNTERS[task.status]
+                setattr(project, counter, getattr(project, counter) + 1)
+                task.comment_count = self.count(options['comments_per_task'])
+                tasks.append(task)
+                comment_plan.append(members)
+
+        Project.objects.bulk_create(projects)
+        ProjectMembership.objects.bulk_create(memberships, batch_size=1000)
+        Task.append_ranks(tasks)
+        Task.objects.bulk_create(tasks, batch_size=1000)
+        comments = [
+            Comment(task=task, commenter_id=self.rng.choice(members), comment=self.sentence())
+            for task, members in zip(tasks, comment_plan)
+            for _ in range(task.comment_count)
+        ]
+        Comment.objects.bulk_create(comments, batch_size=1000)
+        for comment in comments:
+            comment.task.last_comment_at = comment.posted_at
+        Task.objects.bulk_update([task for task in tasks if task.comment_count], ['last_comment_at'], batch_size=1000)
+        return {'projects': len(projects), 'memberships': len(memberships), 'tasks': len(tasks), 'comments': len(comments)}
+
+    def task(self, project, members):
+        rng = self.rng
+        return Task(
+            project=project,
+            title=f'{rng.choice(VERBS)} {rng.choice(NOUNS)}',
+            description=self.sentence() if rng.random() < 0.7 else None,
+            status=rng.choices(['todo', 'in_progress', 'done'], weights=[4, 3, 3])[0],
+            priority=rng.choices(['low', 'medium', 'high'], weights=[5, 3, 2])[0],
+            assignee_id=rng.choice(members) if rng.random() < 0.8 else None,
+            due_date=(self.now + timedelta(days=rng.randint(-30, 60))).date() if rng.random() < 0.6 else None,
+        )
+
+    def role(self):
+        return 'admin' if self.rng.random() < 0.1 else 'member'
+
+    def count(self, mean):
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def sentence(self):
+        words = [self.rng.choice(NOUNS) for _ in range(self.rng.randint(2, 6))]
+        return f'{self.rng.choice(VERBS)} the {", then the ".join(words)}.'
@@ -0,0 +1,42 @@
+import sys
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.transfer import PARSERS, ImportFailed, ProjectImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Create a project from an NDJSON or CSV export (GET /api/projects/<id>/export/), '
+        'reading the file incrementally and writing it in batches. '
+        'Usernames in the export must exist here.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Export file, or - for standard input.")
+        parser.add_argument('--owner', required=True, help='Username of the new project\'s owner.')
+        parser.add_argument('--format', choices=sorted(PARSERS), help='Default: from the file extension, else ndjson.')
+        parser.add_argument('--batch-size', type=int, default=settings.PROJECT_TRANSFER_BATCH_SIZE,
+                            help='Records validated and written per transaction.')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['owner']}.")
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        importer = ProjectImporter(owner, options['batch_size'])
+        with (open(path, newline='', encoding='utf-8') if path != '-' else nullcontext(sys.stdin)) as lines:
+            try:
+                summary = importer.run(PARSERS[file_format](lines))
+            except ImportFailed as exc:
+                for error in exc.errors:
+                    self.stderr.write(f"line {error['line']}: {error['errors']}")
+                raise CommandError('Import failed; nothing was kept.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Project {summary['id']}: {summary['members']} members, {summary['tasks']} tasks, {summary['comments']} comments"))
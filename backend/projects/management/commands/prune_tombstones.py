@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention window, in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SYNC_TOMBSTONE_RETENTION_DAYS,
+                            help='Keep tombstones from the last DAYS days.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Tombstones deleted per statement.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        pruned = 0
+        while True:
+            batch = list(Tombstone.objects.filter(deleted_at__lt=cutoff).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            pruned += Tombstone.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Tombstones pruned: {pruned}'))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.deletion import purge_deleted_projects
+
+
+class Command(BaseCommand):
+    help = (
+        'Purge the comments, tasks and memberships of deleted projects, then the projects, '
+        'a bounded batch per statement. Safe to run alongside the in-process purge thread.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PROJECT_PURGE_BATCH_SIZE,
+                            help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_projects(options['batch_size'], self.progress)
+        self.stdout.write(self.style.SUCCESS(f'Projects purged: {purged}'))
+
+    def progress(self, project_id, table, deleted):
+        self.stdout.write(f'{project_id}: {deleted} {table} deleted')
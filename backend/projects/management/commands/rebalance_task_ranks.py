@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.rebalance import columns_to_rebalance, rebalance_column
+
+
+class Command(BaseCommand):
+    help = (
+        'Respace the task ranks of every (project, status) column that has a rank longer than '
+        '--max-length or two tasks with equal ranks, keeping each column in its current order. '
+        'Safe to run alongside the in-process rebalance thread.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-length', type=int, default=settings.TASK_RANK_REBALANCE_LENGTH,
+                            help='Longest rank left alone.')
+
+    def handle(self, *args, **options):
+        columns = columns_to_rebalance(options['max_length'])
+        for project_id, status in columns:
+            changed = rebalance_column(project_id, status)
+            self.stdout.write(f'{project_id} {status}: {changed} tasks re-ranked')
+        self.stdout.write(self.style.SUCCESS(f'Columns rebalanced: {len(columns)}'))
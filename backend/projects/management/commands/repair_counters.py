@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from projects.models import Comment, Project, Task
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized task and comment counters, fixing any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows recomputed and written per transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed = self.repair(Project, batch_size, self.project_counts, list(Project.STATUS_COUNTERS.values()))
+        self.stdout.write(self.style.SUCCESS(f'Projects repaired: {fixed}'))
+        fixed = self.repair(Task, batch_size, self.task_counts, ['comment_count', 'last_comment_at'])
+        self.stdout.write(self.style.SUCCESS(f'Tasks repaired: {fixed}'))
+
+    def repair(self, model, batch_size, compute, fields):
+        """Walk ``model`` in primary key order, one bounded batch per transaction."""
+        fixed = scanned = 0
+        last_pk = None
+        while True:
+            rows = model.objects.order_by('pk')
+            if last_pk is not None:
+                rows = rows.filter(pk__gt=last_pk)
+            batch = list(rows.only('pk', *fields)[:batch_size])
+            if not batch:
+                return fixed
+
+            with transaction.atomic():
+                expected = compute([obj.pk for obj in batch])
+                stale = []
+                for obj in batch:
+                    values = expected.get(obj.pk, {})
+                    if any(getattr(obj, field) != values.get(field, self.empty(field)) for field in fields):
+                        for field in fields:
+                            setattr(obj, field, values.get(field, self.empty(field)))
+                        stale.append(obj)
+                if stale:
+                    model.objects.bulk_update(stale, fields)
+
+            fixed += len(stale)
+            scanned += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'{model.__name__}: scanned {scanned}, repaired {fixed}')
+
+    def empty(self, field):
+        return None if field == 'last_comment_at' else 0
+
+    def project_counts(self, project_ids):
+        counts = {}
+        rows = Task.objects.filter(project_id__in=project_ids).values('project_id', 'status').annotate(n=Count('id'))
+        for row in rows:
+            counts.setdefault(row['project_id'], {})[Project.STATUS_COUNTERS[row['status']]] = row['n']
+        return counts
+
+    def task_counts(self, task_ids):
+        rows = Comment.objects.filter(task_id__in=task_ids).values('task_id').annotate(
+            n=Count('id'), latest=Max('posted_at'))
+        return {row['task_id']: {'comment_count': row['n'], 'last_comment_at': row['latest']} for row in rows}
@@ -0,0 +1,231 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Each thread writes to a shard of its own, so recording a sample takes no
+lock; shards are only merged when the metrics are read. With several
+worker processes, set METRICS_DIR to a directory they share: every worker
+periodically writes its totals there and /metrics sums all the files.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        return (self.name, tuple(str(labels[name]) for name in self.labelnames))
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Samples are stored as per-bucket counts followed by the sum; exposition makes them cumulative."""
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        sample = values.get(key)
+        if sample is None:
+            sample = values[key] = [0] * (len(self.buckets) + 2)
+        sample[bisect_left(self.buckets, value)] += 1
+        sample[-1] += value
+
+
+def merge(into, values):
+    for key, value in values.items():
+        current = into.get(key)
+        if isinstance(value, list):
+            if current is None:
+                into[key] = list(value)
+            else:
+                for i, part in enumerate(value):
+                    current[i] += part
+        else:
+            into[key] = (current or 0) + value
+    return into
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.reset()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered.')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def shard(self):
+        """The calling thread's values; only that thread ever writes to them."""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                # Fold in threads that have exited (ASGI starts one per request context).
+                alive = []
+                for thread, shard in self._shards:
+                    if thread.is_alive():
+                        alive.append((thread, shard))
+                    else:
+                        merge(self._retired, shard)
+                alive.append((threading.current_thread(), values))
+                self._shards = alive
+            return values
+
+    def snapshot(self):
+        """Totals of every thread in this process."""
+        with self._lock:
+            totals = merge({}, self._retired)
+            for _, shard in self._shards:
+                # dict() copies in one step, so a thread writing meanwhile cannot break the loop.
+                merge(totals, dict(shard))
+        return totals
+
+    def reset(self):
+        # Also runs in a freshly forked child, where another thread may have held the old locks.
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+        self._last_flush = time.monotonic()
+        self._process_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    # Multiprocess mode
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def path(self):
+        return os.path.join(self.directory(), f'metrics-{self._process_id}.json')
+
+    def maybe_flush(self):
+        """Write this process's totals if METRICS_FLUSH_INTERVAL has passed; called after each request."""
+        if not self.directory() or time.monotonic() - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        if self._flush_lock.acquire(blocking=False):
+            try:
+                self.flush()
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        if not self.directory():
+            return
+        self._last_flush = time.monotonic()
+        path = self.path()
+        temp = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump([[name, labels, value] for (name, labels), value in self.snapshot().items()], f)
+        os.replace(temp, path)
+
+    def collect(self):
+        """Totals across every process writing to METRICS_DIR, with this process's live."""
+        totals = self.snapshot()
+        directory = self.directory()
+        if not directory:
+            return totals
+        own = os.path.basename(self.path())
+        for filename in os.listdir(directory):
+            if filename == own or not filename.startswith('metrics-') or not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    rows = json.load(f)
+            except (OSError, ValueError):
+                continue
+            merge(totals, {(name, tuple(labels)): value for name, labels, value in rows})
+        return totals
+
+    def exposition(self):
+        """Render ``collect()`` in the Prometheus text format (version 0.0.4)."""
+        samples = {}
+        for (name, labels), value in self.collect().items():
+            samples.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(samples.get(name, [])):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{format_labels(pairs)} {format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(pairs + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(pairs)} {format_value(value[-1])}')
+                lines.append(f'{name}_count{format_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+# Forked workers (gunicorn --preload) start from zero rather than re-reporting the parent's totals.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset)
+atexit.register(registry.flush)
+
+REQUESTS = registry.counter(
+    'http_requests_total', 'Requests handled, by URL name, method and status.', ('view', 'method', 'status'))
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by URL name.', ('view',))
+DB_QUERIES = registry.counter('db_queries_total', 'Database queries run, by URL name.', ('view',))
+DB_DURATION = registry.counter('db_query_seconds_total', 'Time spent in database queries, by URL name.', ('view',))
+SERIALIZE_DURATION = registry.histogram(
+    'serialize_duration_seconds', 'View time outside auth and queries, mostly serialization, by URL name.', ('view',))
+AUTH_FAILURES = registry.counter('auth_failures_total', 'Rejected JWT authentications, by reason.', ('reason',))
+LOGIN_ATTEMPTS = registry.counter('login_attempts_total', 'Login attempts, by outcome.', ('outcome',))
@@ -1,22 +1,242 @@
-import jwt
+import json
+import logging
+from contextlib import contextmanager
+from types import MethodType
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
 from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import AuthenticationFailed
+from whitenoise.middleware import WhiteNoiseMiddleware
+from . import metrics
+from .profiling import current_profile, request_profile
+from .routers import SAFE_METHODS, current_request, pin
+from .utils import get_user_from_jwt
+
+slow_request_logger = logging.getLogger('projects.slow_requests')
 
 class JWTAuthenticationMiddleware(MiddlewareMixin):
+    """
+    Expose the JWT user as ``request.user`` on API paths.
+
+    Resolution is lazy and shared with ``JWTAuthentication``, so the cookie is
+    decoded at most once per request, and only when something reads the user.
+    """
     def process_request(self, request):
         public_paths = ['/api/register/', '/api/login/']
-        if request.path in public_paths:
+        if not request.path.startswith('/api/') or request.path in public_paths:
             return
-        
-        token = request.COOKIES.get(settings.JWT_COOKIE_NAME)
-
-        if token:
-            try:
-                payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=['HS256'])
-                user = User.objects.get(id=payload['user_id'])
-                request.user = user
-            except (jwt.ExpiredSignatureError, jwt.DecodeError, User.DoesNotExist):
-                request.user = None
+
+        request.user = SimpleLazyObject(lambda: _jwt_user_or_none(request))
+
+def _jwt_user_or_none(request):
+    try:
+        return get_user_from_jwt(request)
+    except AuthenticationFailed:
+        return None
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively in both sync (WSGI) and async
+    (ASGI) stacks, like Django's own, so an ASGI request is not moved to a
+    thread just to pass through it.
+
+    Subclasses implement ``scope(request)``, a context manager around the
+    rest of the stack, and ``finish(request, response, state)``, given what
+    the scope yielded. In an async stack, ``process_view`` and
+    ``process_template_response`` are exposed as coroutines too, so they
+    must not block.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            for name in ('process_view', 'process_template_response'):
+                if hasattr(self, name):
+                    setattr(self, name, _as_coroutine(self, getattr(self, name)))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self.scope(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with self.scope(request) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    def scope(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, state):
+        return response
+
+def _as_coroutine(middleware, method):
+    # Bound, because the handler names the middleware via ``__self__`` in errors.
+    async def hook(self, *args):
+        return method(*args)
+    return MethodType(hook, middleware)
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """
+    Make the request visible to ``projects.routers.ReplicaRouter`` while it is
+    handled, and pin clients that write to the primary database. Not used
+    unless DATABASE_REPLICAS is set.
+    """
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def scope(self, request):
+        # Context variables follow the request onto sync_to_async threads.
+        token = current_request.set(request)
+        try:
+            yield
+        finally:
+            current_request.reset(token)
+
+    def finish(self, request, response, state):
+        if request.method not in SAFE_METHODS:
+            pin(response)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, runnable natively in an async stack. WhiteNoise itself is
+    sync-only, so under ASGI every request, API calls included, would hop to
+    a thread just to learn it is not a static file. The lookup is a dict
+    access; only static hits (and lookups with WHITENOISE_AUTOREFRESH, which
+    read the disk) go to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
         else:
-            request.user = None
\ No newline at end of file
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ProfiledMiddleware(HybridMiddleware):
+    """
+    Base for middleware that reports on a request's ``RequestProfile``.
+
+    Subclasses implement ``report()``. When several are installed they
+    share one profile (see ``request_profile``).
+    """
+    setting = None
+
+    def __init__(self, get_response):
+        if not getattr(settings, self.setting, False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def scope(self, request):
+        return request_profile()
+
+    def finish(self, request, response, profile):
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        raise NotImplementedError
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current_profile.get()
+        if profile is not None:
+            match = request.resolver_match
+            profile.start_view(match.view_name if match and match.view_name else view_func.__qualname__)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that separately.
+        profile = current_profile.get()
+        if profile is not None:
+            profile.time_render(response)
+        return response
+
+
+class MetricsMiddleware(ProfiledMiddleware):
+    """
+    Feed request counts, latency, query counts and serialization time per
+    URL name into ``projects.metrics``; on unless METRICS_ENABLED is off.
+    """
+    setting = 'METRICS_ENABLED'
+
+    def report(self, request, response, profile):
+        view = profile.view_name or '<unmatched>'
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_DURATION.observe(profile.total, view=view)
+        metrics.DB_QUERIES.inc(len(profile.queries), view=view)
+        metrics.DB_DURATION.inc(profile.db_time, view=view)
+        if 'serialize' in profile.phases:
+            metrics.SERIALIZE_DURATION.observe(profile.phases['serialize'], view=view)
+        metrics.registry.maybe_flush()
+        return response
+
+
+class RequestProfilingMiddleware(ProfiledMiddleware):
+    """
+    Opt-in per-request profiling, enabled with the REQUEST_PROFILING setting.
+
+    Every response gets a ``Server-Timing`` header with the total time and
+    the auth, serialize (view code outside auth and queries), render and db
+    phases. Requests slower than REQUEST_PROFILING_SLOW_MS are logged to
+    ``projects.slow_requests`` as JSON, with the view name, per-fingerprint
+    query counts and times, and any query repeated often enough to suggest
+    an N+1.
+    """
+    setting = 'REQUEST_PROFILING'
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.slow_ms = settings.REQUEST_PROFILING_SLOW_MS
+        self.repeat_threshold = settings.REQUEST_PROFILING_REPEAT_THRESHOLD
+
+    def report(self, request, response, profile):
+        response.headers['Server-Timing'] = profile.server_timing()
+        if profile.total * 1000 >= self.slow_ms:
+            self.log_slow_request(request, response, profile)
+        return response
+
+    def log_slow_request(self, request, response, profile):
+        fingerprints = profile.fingerprints()
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': profile.view_name,
+            'status': response.status_code,
+            'total_ms': round(profile.total * 1000, 2),
+            'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in profile.phases.items()},
+            'db_ms': round(profile.db_time * 1000, 2),
+            'queries': len(profile.queries),
+            'fingerprints': fingerprints,
+            'repeated': [group for group in fingerprints if group['count'] >= self.repeat_threshold],
+        }
+        slow_request_logger.warning(json.dumps(entry), extra={'profile': entry})
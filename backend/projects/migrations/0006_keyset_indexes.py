@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_comment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', 'posted_at', 'id'], name='comment_task_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmembership',
+            index=models.Index(fields=['project', 'joined_at', 'id'], name='membership_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='task_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+        ),
+    ]
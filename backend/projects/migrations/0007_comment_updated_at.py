@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_posted_at(apps, schema_editor):
+    Comment = apps.get_model('projects', 'Comment')
+    Comment.objects.update(updated_at=models.F('posted_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_posted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_comment_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='medium', then=models.Value(1)), models.When(priority='high', then=models.Value(2)), default=models.Value(0)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'priority_rank'], name='task_status_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'due_date'], name='task_project_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('projects', 'Task')
+    Comment = apps.get_model('projects', 'Comment')
+
+    def task_count(status):
+        counts = Task.objects.filter(project=OuterRef('pk'), status=status).order_by().values(
+            'project').annotate(n=Count('id')).values('n')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Project.objects.update(
+        todo_count=task_count('todo'),
+        in_progress_count=task_count('in_progress'),
+        done_count=task_count('done'),
+    )
+
+    comments = Comment.objects.filter(task=OuterRef('pk')).order_by().values('task')
+    Task.objects.update(
+        comment_count=Coalesce(Subquery(comments.annotate(n=Count('id')).values('n'), output_field=IntegerField()), Value(0)),
+        last_comment_at=Subquery(comments.annotate(latest=Max('posted_at')).values('latest')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_task_priority_rank_and_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
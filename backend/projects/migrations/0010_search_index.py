@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# SQLite: external-content FTS5 tables keyed by the source row id, kept in
+# sync by triggers so bulk writes are indexed too.
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS projects_task_fts USING fts5(
+        title, description, content='projects_task', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS projects_task_fts_ai AFTER INSERT ON projects_task BEGIN
+        INSERT INTO projects_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_task_fts_ad AFTER DELETE ON projects_task BEGIN
+        INSERT INTO projects_task_fts(projects_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_task_fts_au AFTER UPDATE OF title, description ON projects_task BEGIN
+        INSERT INTO projects_task_fts(projects_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO projects_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO projects_task_fts(projects_task_fts) VALUES ('rebuild')",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS projects_comment_fts USING fts5(
+        comment, content='projects_comment', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_ai AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_comment_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_ad AFTER DELETE ON projects_comment BEGIN
+        INSERT INTO projects_comment_fts(projects_comment_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_au AFTER UPDATE OF comment ON projects_comment BEGIN
+        INSERT INTO projects_comment_fts(projects_comment_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+        INSERT INTO projects_comment_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+    "INSERT INTO projects_comment_fts(projects_comment_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS projects_task_fts_ai",
+    "DROP TRIGGER IF EXISTS projects_task_fts_ad",
+    "DROP TRIGGER IF EXISTS projects_task_fts_au",
+    "DROP TABLE IF EXISTS projects_task_fts",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_au",
+    "DROP TABLE IF EXISTS projects_comment_fts",
+]
+
+# PostgreSQL: stored tsvector columns computed by the database, with GIN indexes.
+POSTGRES_INSTALL = [
+    """ALTER TABLE projects_task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED""",
+    "CREATE INDEX projects_task_search_idx ON projects_task USING GIN (search_vector)",
+    """ALTER TABLE projects_comment ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(comment, ''))) STORED""",
+    "CREATE INDEX projects_comment_search_idx ON projects_comment USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "ALTER TABLE projects_task DROP COLUMN IF EXISTS search_vector",
+    "ALTER TABLE projects_comment DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}),
+            run_for_vendor({'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}),
+        ),
+    ]
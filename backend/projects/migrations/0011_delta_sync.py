@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:44
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_joined_at(apps, schema_editor):
+    ProjectMembership = apps.get_model('projects', 'ProjectMembership')
+    ProjectMembership.objects.update(updated_at=models.F('joined_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('comment', 'Comment'), ('membership', 'Membership')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('project_id', models.UUIDField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='projectmembership',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_joined_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_at'], name='comment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmembership',
+            index=models.Index(fields=['project', 'updated_at'], name='membership_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['project_id', 'deleted_at'], name='tombstone_project_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+    ]
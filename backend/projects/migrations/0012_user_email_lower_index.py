@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Expression index behind projects.backends.users_with_email: logins and
+    signup's duplicate check filter on LOWER(email).
+    """
+
+    dependencies = [
+        ('projects', '0011_delta_sync'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX IF EXISTS auth_user_email_lower_idx',
+        ),
+    ]
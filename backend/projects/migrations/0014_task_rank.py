@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:39
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+
+from projects.ranking import spread_ranks
+
+search_index = import_module('projects.migrations.0010_search_index')
+
+# On SQLite, adding the column rebuilds projects_task, which drops its full-text search triggers.
+restore_search_triggers = search_index.run_for_vendor({'sqlite': [
+    statement for statement in search_index.SQLITE_INSTALL if 'CREATE TRIGGER IF NOT EXISTS projects_task_fts' in statement
+]})
+
+
+def backfill_ranks(apps, schema_editor):
+    # Existing columns keep their creation order, evenly spaced.
+    Task = apps.get_model('projects', 'Task')
+    columns = Task.objects.order_by().values_list('project_id', 'status').distinct()
+    for project_id, status in list(columns):
+        tasks = list(Task.objects.filter(project_id=project_id, status=status).order_by('created_at', 'id').only('id'))
+        for task, rank in zip(tasks, spread_ranks(len(tasks))):
+            task.rank = rank
+        Task.objects.bulk_update(tasks, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_project_deleted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'rank'], name='task_status_rank_idx'),
+        ),
+    ]
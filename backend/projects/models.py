@@ -1,9 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest, Now
 from django.contrib.auth import get_user_model
 import uuid
 
+from .events import publish_event
+from .ranking import rank_between
+from .response_cache import bump, project_version_key
+
 User = get_user_model()
-    
+
+
+class LiveProjectManager(models.Manager):
+    """Projects not marked deleted. ``Project.all_objects`` includes those awaiting purge."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Project(models.Model):
     id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
     name = models.CharField(max_length=255, db_index=True)
@@ -13,9 +26,48 @@ class Project(models.Model):
     users = models.ManyToManyField(User, through='ProjectMembership', related_name='projects')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_projects", null=True, blank=True)
 
+    # Denormalized task counts by status, maintained by Task.save()/delete() and
+    # the bulk task endpoint; `manage.py repair_counters` recomputes them.
+    todo_count = models.PositiveIntegerField(default=0, editable=False)
+    in_progress_count = models.PositiveIntegerField(default=0, editable=False)
+    done_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Set when the project is deleted; projects.deletion purges its rows in the background.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveProjectManager()
+    all_objects = models.Manager()
+
+    STATUS_COUNTERS = {
+        'todo': 'todo_count',
+        'in_progress': 'in_progress_count',
+        'done': 'done_count',
+    }
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+            models.Index(fields=['deleted_at'], name='project_deleted_idx', condition=models.Q(deleted_at__isnull=False)),
+        ]
+
     def __str__(self):
         return f"{self.name}"
 
+    @property
+    def task_count(self):
+        return self.todo_count + self.in_progress_count + self.done_count
+
+    @classmethod
+    def adjust_task_counts(cls, project_id, deltas):
+        """Apply ``{status: delta}`` to a project's counters in a single UPDATE."""
+        changes = {
+            cls.STATUS_COUNTERS[status]: Greatest(F(cls.STATUS_COUNTERS[status]) + delta, 0)
+            for status, delta in deltas.items() if delta
+        }
+        if changes:
+            cls.objects.filter(pk=project_id).update(updated_at=Now(), **changes)
+
 class ProjectMembership(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
@@ -25,9 +77,14 @@ class ProjectMembership(models.Model):
         ('member', 'Member'),
     ], default='member')
     joined_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('user', 'project')
+        indexes = [
+            models.Index(fields=['project', 'joined_at', 'id'], name='membership_joined_idx'),
+            models.Index(fields=['project', 'updated_at'], name='membership_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.project.name} ({self.role})"
@@ -51,19 +108,167 @@ class Task(models.Model):
         ('medium', 'Medium'),
         ('high', 'High'),
     ], default='low')
+    # Sortable ordinal of ``priority`` (low=0, medium=1, high=2), computed by the database.
+    priority_rank = models.GeneratedField(
+        expression=models.Case(
+            models.When(priority='medium', then=models.Value(1)),
+            models.When(priority='high', then=models.Value(2)),
+            default=models.Value(0),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateField(null=True, blank=True)
 
+    # Denormalized from Comment, maintained by Comment.save()/delete().
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Manual order within the (project, status) column; see projects.ranking.
+    # New tasks, and tasks whose status changes, go to the end of their column.
+    rank = models.CharField(max_length=64, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id'], name='task_project_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+            models.Index(fields=['project', 'status', 'priority_rank'], name='task_status_priority_idx'),
+            models.Index(fields=['project', 'due_date'], name='task_project_due_idx'),
+            models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+            models.Index(fields=['project', 'status', 'rank'], name='task_status_rank_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
+
+    @classmethod
+    def append_ranks(cls, tasks):
+        """
+        Rank each of ``tasks`` that has no rank after everything already in
+        its column, in list order. One query, for the columns' last ranks.
+        """
+        columns = {(task.project_id, task.status) for task in tasks if not task.rank}
+        if not columns:
+            return
+        last = dict(((project_id, status), rank) for project_id, status, rank in cls.objects.filter(
+            project_id__in={project_id for project_id, _ in columns}, status__in={status for _, status in columns},
+        ).order_by().values('project_id', 'status').annotate(last=Max('rank')).values_list('project_id', 'status', 'last'))
+        for task in tasks:
+            key = (task.project_id, task.status)
+            if task.rank:
+                last[key] = max(last.get(key) or '', task.rank)
+        for task in tasks:
+            if not task.rank:
+                key = (task.project_id, task.status)
+                task.rank = last[key] = rank_between(last.get(key) or None, None)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can move the project counters.
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        stored_status = getattr(self, '_stored_status', None)
+        with transaction.atomic():
+            if stored_status is not None and stored_status != self.status:
+                self.rank = ''
+            Task.append_ranks([self])
+            super().save(*args, **kwargs)
+            if adding:
+                Project.adjust_task_counts(self.project_id, {self.status: 1})
+            elif stored_status is not None and stored_status != self.status:
+                Project.adjust_task_counts(self.project_id, {stored_status: -1, self.status: 1})
+            publish_event(self.project_id, 'task.created' if adding else 'task.updated', id=self.pk)
+        self._stored_status = self.status
+
+    def delete(self, *args, **kwargs):
+        status = getattr(self, '_stored_status', None) or self.status
+        with transaction.atomic():
+            pk = self.pk
+            result = super().delete(*args, **kwargs)
+            Project.adjust_task_counts(self.project_id, {status: -1})
+            Tombstone.objects.create(kind='task', object_id=pk, project_id=self.project_id)
+            bump(project_version_key(self.project_id))
+            publish_event(self.project_id, 'task.deleted', id=pk)
+        return result
     
 class Comment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     commenter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     comment = models.TextField()
     posted_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'posted_at', 'id'], name='comment_task_posted_idx'),
+            models.Index(fields=['updated_at'], name='comment_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.commenter.username} on {self.task.title}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Task.objects.filter(pk=self.task_id).update(
+                    comment_count=F('comment_count') + 1,
+                    last_comment_at=self.posted_at,
+                    updated_at=Now(),
+                )
+            event_type = 'comment.created' if adding else 'comment.updated'
+            publish_event(self.task.project_id, event_type, id=self.pk, task_id=self.task_id)
+
+    def delete(self, *args, **kwargs):
+        pk, project_id = self.pk, self.task.project_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            latest = Comment.objects.filter(task_id=OuterRef('pk')).order_by('-posted_at').values('posted_at')[:1]
+            Task.objects.filter(pk=self.task_id).update(
+                comment_count=Greatest(F('comment_count') - 1, 0),
+                last_comment_at=Subquery(latest),
+                updated_at=Now(),
+            )
+            Tombstone.objects.create(kind='comment', object_id=pk, project_id=project_id)
+            bump(project_version_key(project_id))
+            publish_event(project_id, 'comment.deleted', id=pk, task_id=self.task_id)
+        return result
+
+class Tombstone(models.Model):
+    """
+    Record of a hard delete, so delta sync can tell clients what to drop.
+
+    Deleting a task implies its comments, and a membership tombstone for the
+    requesting user means the whole project is gone for them, so neither
+    cascade is logged row by row. ``user_id`` is the member a membership
+    tombstone is about; it keeps the tombstone visible to that user after
+    they have lost access to the project.
+    """
+    kind = models.CharField(max_length=20, choices=[
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+        ('membership', 'Membership'),
+    ])
+    object_id = models.PositiveBigIntegerField()
+    project_id = models.UUIDField()
+    user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'deleted_at'], name='tombstone_project_idx'),
+            models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.commenter.username} on {self.task.title}"
\ No newline at end of file
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
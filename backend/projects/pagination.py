@@ -0,0 +1,177 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a stable composite ordering.
+
+    The cursor carries the ordering values of the last row on the page, so
+    fetching page N is a single indexed range scan no matter how deep it is.
+    Unless ``always_paginate`` is set, a plain list is returned to clients
+    that pass neither ``cursor`` nor ``page_size``.
+
+    Views may override the ordering with ``get_ordering()``; every key must
+    share one direction and end in a unique column. NULLs sort last.
+    """
+    ordering = ('created_at', 'id')
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    always_paginate = False
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of paginate_queryset() for native async views."""
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The unevaluated query for this page (plus one row), or None if not paginating."""
+        params = request.query_params
+        if not self.always_paginate and self.cursor_query_param not in params \
+                and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = view.get_ordering() if hasattr(view, 'get_ordering') else self.ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+        self.descending = ordering[0].startswith('-')
+
+        model = queryset.model
+        queryset = queryset.order_by(*[self.order_expression(model, name) for name in self.fields])
+        encoded = params.get(self.cursor_query_param)
+        if encoded:
+            position = self.decode_cursor(encoded, model, self.fields)
+            queryset = queryset.filter(self.position_filter(model, self.fields, position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_position = [self.position_value(self.page[-1], name) for name in self.fields] if self.has_next else None
+        return self.page
+
+    @staticmethod
+    def position_value(row, name):
+        # Pages are model instances, or dicts when a row serializer lists .values().
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def order_expression(self, model, name):
+        if not model._meta.get_field(name).null:
+            return F(name).desc() if self.descending else F(name).asc()
+        return F(name).desc(nulls_last=True) if self.descending else F(name).asc(nulls_last=True)
+
+    def position_filter(self, model, fields, position):
+        """Rows strictly after ``position``: (a > x) OR (a = x AND b > y) ..."""
+        op = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for i, name in enumerate(fields):
+            value = position[i]
+            if value is None:
+                # NULLs sort last, so nothing comes after NULL on this key.
+                continue
+            term = Q(**{f'{name}__{op}': value})
+            if model._meta.get_field(name).null:
+                term |= Q(**{f'{name}__isnull': True})
+            for prev_name, prev_value in zip(fields[:i], position[:i]):
+                if prev_value is None:
+                    term &= Q(**{f'{prev_name}__isnull': True})
+                else:
+                    term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, position):
+        raw = json.dumps([None if value is None else str(value) for value in position])
+        return b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, encoded, model, fields):
+        try:
+            raw = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(raw, list) or len(raw) != len(fields):
+                raise ValueError
+            position = []
+            for name, value in zip(fields, raw):
+                field = model._meta.get_field(name)
+                if getattr(field, 'generated', False):
+                    field = field.output_field
+                position.append(None if value is None else field.to_python(value))
+            return position
+        except (TypeError, ValueError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ProjectPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class TaskPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class MyTaskPagination(KeysetPagination):
+    """Cross-project task listings are always paginated, newest first."""
+    ordering = ('-created_at', '-id')
+    always_paginate = True
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ('posted_at', 'id')
+
+
+class MembershipPagination(KeysetPagination):
+    ordering = ('joined_at', 'id')
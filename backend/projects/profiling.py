@@ -0,0 +1,147 @@
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# The profile of the request being handled, if profiling or metrics are on (see projects.middleware).
+current_profile = ContextVar('current_profile', default=None)
+
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)')
+WHITESPACE = re.compile(r'\s+')
+
+def fingerprint(sql):
+    """Normalize a query so repeats that differ only in parameters or IN-list length group together."""
+    return WHITESPACE.sub(' ', IN_LIST.sub('IN (...)', sql)).strip()
+
+def phase(name):
+    """Time a block as ``name`` in the current request's profile; a no-op when not profiling."""
+    profile = current_profile.get()
+    return profile.phase(name) if profile is not None else nullcontext()
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper on every connection: record the query in the current request's profile, if any."""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Installed per connection rather than per request, because under ASGI
+    # queries run on other threads than the middleware, with other connection
+    # objects; the profile reaches them through the context variable.
+    # The signal fires again on every reconnect of the same wrapper object.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+@contextmanager
+def request_profile():
+    """
+    Profile the enclosed request, or join the profile an outer middleware
+    already started, so stacked middleware share one profile.
+    """
+    profile = current_profile.get()
+    if profile is not None:
+        yield profile
+        return
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        profile.end_view()
+        profile.finish()
+
+
+class RequestProfile:
+    """
+    Timings and queries for one request.
+
+    Called by ``record_query`` so every query's SQL and duration is recorded. Phases may nest and overlap (auth includes its
+    own query time), so they are reported side by side, not summed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.phases = defaultdict(float)
+        self.queries = []
+        self.db_time = 0.0
+        self.view_name = None
+        self._view_start = None
+        self._render_timed = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append((sql, duration))
+            self.db_time += duration
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def start_view(self, view_name):
+        if self.view_name is not None:
+            return
+        self.view_name = view_name
+        self._view_start = (time.perf_counter(), self.db_time, self.phases['auth'])
+
+    def end_view(self):
+        """Attribute the view's time not spent authenticating or querying to serialization."""
+        if self._view_start is None:
+            return
+        start, db_time, auth_time = self._view_start
+        self._view_start = None
+        elapsed = time.perf_counter() - start
+        self.phases['serialize'] += max(elapsed - (self.db_time - db_time) - (self.phases['auth'] - auth_time), 0.0)
+
+    def time_render(self, response):
+        """Time a deferred (DRF/template) response's rendering as the render phase."""
+        self.end_view()
+        if self._render_timed:
+            return
+        self._render_timed = True
+        render_start = time.perf_counter()
+
+        def rendered(response):
+            self.phases['render'] += time.perf_counter() - render_start
+
+        response.add_post_render_callback(rendered)
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def fingerprints(self):
+        """``[{'sql', 'count', 'ms'}]`` per distinct query shape, slowest first."""
+        groups = {}
+        for sql, duration in self.queries:
+            group = groups.setdefault(fingerprint(sql), {'sql': fingerprint(sql), 'count': 0, 'ms': 0.0})
+            group['count'] += 1
+            group['ms'] += duration * 1000
+        for group in groups.values():
+            group['ms'] = round(group['ms'], 2)
+        return sorted(groups.values(), key=lambda group: group['ms'], reverse=True)
+
+    def server_timing(self):
+        entries = [f'total;dur={self.total * 1000:.1f}']
+        for name, seconds in self.phases.items():
+            entries.append(f'{name};dur={seconds * 1000:.1f}')
+        entries.append(f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries"')
+        return ', '.join(entries)
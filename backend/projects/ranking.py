@@ -0,0 +1,77 @@
+"""
+Lexicographic rank keys for manual task ordering.
+
+A rank is a base-36 fraction written without the leading ``0.``: ``'i'`` is
+18/36, ``'i5'`` sits between ``'i'`` and ``'i6'``. Ranks never end in
+``'0'``, so string order is numeric order and there is always room for a
+key strictly between two different ranks. Only digits and lowercase letters
+are used, which sort the same under byte-wise and the usual locale collations.
+
+Appending and prepending step the first RANK_WIDTH digits by one, so a
+column grown one task at a time keeps short ranks. Moving a task between two
+neighbours takes the midpoint, which grows by a digit every few moves into
+the same gap; ``projects.rebalance`` respaces a column whose ranks get long.
+"""
+import re
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+RANK_WIDTH = 6
+RANK_RE = re.compile(r'^[0-9a-z]*[1-9a-z]$')
+
+
+def is_valid_rank(value):
+    return isinstance(value, str) and bool(RANK_RE.match(value))
+
+def _encode(number, width):
+    digits = []
+    for _ in range(width):
+        number, digit = divmod(number, BASE)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits)).rstrip('0')
+
+def _head(rank):
+    """The first RANK_WIDTH digits of ``rank`` as an integer."""
+    return int(rank[:RANK_WIDTH].ljust(RANK_WIDTH, '0'), BASE)
+
+def _midpoint(low, high):
+    """A key strictly between ``low`` ('' for the start) and ``high`` (None for the end)."""
+    if high is not None:
+        # Keep the common prefix, reading ``low`` as padded with zeros.
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else '0') == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if high is not None and len(high) > 1:
+        # Adjacent first digits: ``high``'s first digit alone is already below it.
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+def rank_between(before, after):
+    """
+    A rank that sorts after ``before`` and before ``after``; either may be
+    None for the start or end of the column. Raises ValueError unless
+    ``before < after``.
+    """
+    if before is not None and after is not None:
+        if not before < after:
+            raise ValueError(f'{before!r} does not sort before {after!r}')
+        return _midpoint(before, after)
+    if before is not None:
+        head = _head(before) + 1
+        return _encode(head, RANK_WIDTH) if head < BASE ** RANK_WIDTH else _midpoint(before, None)
+    if after is not None:
+        # A longer rank is above its own first RANK_WIDTH digits.
+        head = _head(after) - (len(after) <= RANK_WIDTH)
+        return _encode(head, RANK_WIDTH) if head > 0 else _midpoint('', after)
+    return DIGITS[BASE // 2]
+
+def spread_ranks(count):
+    """``count`` ascending ranks of at most RANK_WIDTH digits, evenly spaced."""
+    step = BASE ** RANK_WIDTH // (count + 1)
+    return [_encode(step * (i + 1), RANK_WIDTH) for i in range(count)]
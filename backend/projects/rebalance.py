@@ -0,0 +1,83 @@
+"""
+Respacing task ranks when moves have made them long.
+
+Each move into the same gap adds a digit every few moves (see
+projects.ranking). When a move leaves a rank longer than
+TASK_RANK_REBALANCE_LENGTH, ``schedule_rebalance()`` has a daemon thread
+in the same process give the column evenly spaced short ranks in its
+current order (TASK_RANK_REBALANCE_IN_PROCESS). ``manage.py
+rebalance_task_ranks`` does the same for every column that needs it, and
+also separates tasks that ended up with equal ranks.
+"""
+import logging
+import threading
+
+from django.db import connections, transaction
+from django.db.models import Count
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .events import publish_event
+from .models import Task
+from .ranking import spread_ranks
+from .response_cache import bump, project_version_key
+
+logger = logging.getLogger('projects.rebalance')
+
+
+def rebalance_column(project_id, status):
+    """Respace the ranks of one (project, status) column. Returns how many tasks changed."""
+    with transaction.atomic():
+        # Locks the column, so a concurrent move waits and then places itself among the new ranks.
+        rows = list(Task.objects.select_for_update().filter(project_id=project_id, status=status)
+                    .order_by('rank', 'id').values_list('id', 'rank'))
+        now = timezone.now()
+        # updated_at moves so delta sync clients pick up the new ranks.
+        changed = [
+            Task(id=task_id, rank=rank, updated_at=now)
+            for (task_id, old_rank), rank in zip(rows, spread_ranks(len(rows))) if rank != old_rank
+        ]
+        Task.objects.bulk_update(changed, ['rank', 'updated_at'], batch_size=1000)
+        if changed:
+            bump(project_version_key(project_id))
+            publish_event(project_id, 'task.rebalanced', status=status)
+    return len(changed)
+
+def columns_to_rebalance(max_length):
+    """(project_id, status) of every column with a rank over ``max_length`` or two equal ranks."""
+    long_ranks = Task.objects.annotate(length=Length('rank')).filter(length__gt=max_length)
+    ties = Task.objects.values('project_id', 'status', 'rank').annotate(n=Count('id')).filter(n__gt=1)
+    columns = set(long_ranks.order_by().values_list('project_id', 'status').distinct())
+    columns.update(ties.order_by().values_list('project_id', 'status'))
+    return sorted(columns, key=str)
+
+
+_worker = None
+_pending = set()
+_worker_lock = threading.Lock()
+
+def schedule_rebalance(project_id, status):
+    """Queue a column for this process's rebalance thread, starting it if it is not running."""
+    global _worker
+    with _worker_lock:
+        _pending.add((project_id, status))
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name='task-rank-rebalance', daemon=True)
+            _worker.start()
+
+def _run_worker():
+    global _worker
+    try:
+        while True:
+            with _worker_lock:
+                if not _pending:
+                    _worker = None
+                    return
+                project_id, status = _pending.pop()
+            rebalance_column(project_id, status)
+    except Exception:
+        logger.exception('Task rank rebalance failed; rebalance_task_ranks will retry it.')
+        with _worker_lock:
+            _worker = None
+    finally:
+        connections.close_all()
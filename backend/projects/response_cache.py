@@ -0,0 +1,130 @@
+"""
+Versioned response cache for the project, task and member list endpoints.
+
+Entries live in the Django cache (RESPONSE_CACHE_ALIAS) and are keyed by
+the requesting user, the full URL and version counters kept in the same
+cache: one per project, bumped when the project, its tasks, comments or
+memberships change, or a user it shows is renamed, and one per user, bumped
+when their memberships change (see projects.signals). The task and comment
+validators include the project version too, because their payloads embed
+names that the rows' own timestamps do not follow. A bump orphans every entry built from the old
+version, so nothing is deleted explicitly; orphans expire after
+RESPONSE_CACHE_TIMEOUT seconds or are evicted.
+
+With read replicas, a response read from a replica within
+DATABASE_PIN_SECONDS of a bump may predate the write, so it is not cached.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import set_validators
+from .routers import reading_from_replica
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+def project_version_key(project_id):
+    return f'response:v:project:{project_id}'
+
+def user_version_key(user_id):
+    return f'response:v:user:{user_id}'
+
+def get_versions(keys):
+    """Current value of each version counter, starting missing ones from the clock."""
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # An evicted counter restarts above any value it had before, so old entries stay orphaned.
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+def version_tag(*keys):
+    """
+    The current versions of ``keys`` as a string, for the validator seed of a
+    payload that embeds rows its own timestamps do not follow.
+    """
+    return ':'.join(map(str, get_versions(keys)))
+
+def bump(*keys):
+    """
+    Move version counters on now, and again on commit: a response rebuilt
+    from the old rows before the transaction commits is orphaned as well.
+    """
+    _increment(keys)
+    transaction.on_commit(lambda: _increment(keys))
+
+def _increment(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set_many(dict.fromkeys(map(recent_key, keys), True), settings.DATABASE_PIN_SECONDS)
+
+def recent_key(key):
+    return f'{key}:recent'
+
+def may_be_stale(keys):
+    """Whether this request reads from a replica that may not have the latest bump's write yet."""
+    return reading_from_replica() and bool(get_cache().get_many(list(map(recent_key, keys))))
+
+def get_or_set_versioned(name, version_keys, default):
+    """``default()``, cached until any of ``version_keys`` is bumped."""
+    cache = get_cache()
+    key = f'response:{name}:' + ':'.join(map(str, get_versions(version_keys)))
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        if not may_be_stale(version_keys):
+            cache.set(key, value, settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+def cached_response(method):
+    """
+    Cache a view's 200 responses under its ``get_cache_versions()``.
+
+    Apply above ``conditional_get``: a hit skips the validator query too and
+    answers conditional requests from the stored ETag. The response data is
+    cached before rendering, so content negotiation still applies. Runs after
+    authentication and permission checks, and the user is part of the key.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return method(self, request, *args, **kwargs)
+
+        cache = get_cache()
+        version_keys = self.get_cache_versions()
+        versions = get_versions(version_keys)
+        raw = f'{request.user.pk}|{request.build_absolute_uri()}|{versions}'
+        key = 'response:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+        entry = cache.get(key)
+        if entry is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK and not may_be_stale(version_keys):
+                timestamp = parse_http_date_safe(response.headers.get('Last-Modified', ''))
+                cache.set(key, (response.data, response.headers.get('ETag'), timestamp), settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        data, etag, timestamp = entry
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = Response(data)
+        return set_validators(response, etag, timestamp) if etag else response
+    return wrapper
@@ -0,0 +1,79 @@
+"""
+Read-replica routing with read-your-writes.
+
+``ReplicaPinMiddleware`` marks each request as current for the duration of
+the view. Reads made during a GET, HEAD or OPTIONS to a view with
+``read_from_replica`` set go to one of DATABASE_REPLICAS, chosen once per
+request so its queries see one replica's state. Everything else reads from
+and writes to default, including reads in requests that write.
+
+A client that sends a write gets a cookie pinning its reads to default
+until DATABASE_PIN_SECONDS have passed, so a replica that has not caught up
+yet cannot hide what it just wrote from it.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE_NAME = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+current_request = ContextVar('current_request', default=None)
+
+
+def is_pinned(request):
+    """Whether the request's client wrote within the last DATABASE_PIN_SECONDS."""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+def pin(response):
+    """Pin the client that will receive ``response`` to default."""
+    seconds = settings.DATABASE_PIN_SECONDS
+    response.set_cookie(
+        PIN_COOKIE_NAME,
+        str(int(time.time()) + seconds),
+        max_age=seconds,
+        httponly=True,
+        secure=settings.JWT_COOKIE_SECURE,
+        samesite=settings.JWT_COOKIE_SAMESITE,
+    )
+
+def read_database(request):
+    """The alias ``request`` reads from: a replica, or None for default."""
+    if hasattr(request, '_read_database'):
+        return request._read_database
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Not routed to a view yet (e.g. authentication in middleware).
+        return None
+    view_class = getattr(match.func, 'view_class', None)
+    replicas = settings.DATABASE_REPLICAS
+    alias = None
+    if (replicas and request.method in SAFE_METHODS and getattr(view_class, 'read_from_replica', False)
+            and not is_pinned(request)):
+        alias = random.choice(replicas)
+    request._read_database = alias
+    return alias
+
+def reading_from_replica():
+    """Whether the current request, if any, reads from a replica."""
+    request = current_request.get()
+    return request is not None and read_database(request) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        request = current_request.get()
+        return None if request is None else read_database(request)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default.
+        return True
@@ -0,0 +1,118 @@
+"""
+Read-only list serializers built from ``.values()`` rows.
+
+Each row serializer returns exactly what its ModelSerializer counterpart
+in serializers.py would (same keys, order and formatting) without
+instantiating a model or a serializer field per row. Keep the two in step;
+the tests compare their output.
+"""
+from django.utils import timezone
+from rest_framework.response import Response
+
+
+def datetime_formatter():
+    """DRF's default ISO 8601 DateTimeField output, in the current time zone."""
+    tz = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+def format_date(value):
+    return None if value is None else value.isoformat()
+
+def user_columns(prefix):
+    return (f'{prefix}_id', f'{prefix}__username', f'{prefix}__email', f'{prefix}__first_name', f'{prefix}__last_name')
+
+
+class RowSerializer:
+    columns = ()
+
+    def __init__(self):
+        self.format_datetime = datetime_formatter()
+
+    def values(self, queryset, extra=()):
+        """``queryset`` as rows of ``columns``, plus ``extra`` (e.g. keyset ordering) columns."""
+        return queryset.values(*self.columns, *[name for name in extra if name not in self.columns])
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    @staticmethod
+    def user(row, prefix):
+        """UserSerializer output for a user joined in as ``prefix__*`` columns."""
+        if row[f'{prefix}_id'] is None:
+            return None
+        return {
+            'username': row[f'{prefix}__username'],
+            'email': row[f'{prefix}__email'],
+            'first_name': row[f'{prefix}__first_name'],
+            'last_name': row[f'{prefix}__last_name'],
+            'user_id': row[f'{prefix}_id'],
+        }
+
+
+class TaskRowSerializer(RowSerializer):
+    """Mirrors TaskSerializer."""
+    columns = (
+        'id', 'title', 'description', 'status', 'priority', 'project_id', 'project__name',
+        'created_at', 'updated_at', 'due_date', 'comment_count', 'last_comment_at', 'rank',
+    ) + user_columns('assignee')
+
+    def to_representation(self, row):
+        format_datetime = self.format_datetime
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'assignee': self.user(row, 'assignee'),
+            'project': row['project_id'],
+            'project_name': row['project__name'],
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+            'due_date': format_date(row['due_date']),
+            'comment_count': row['comment_count'],
+            'last_comment_at': format_datetime(row['last_comment_at']),
+            'rank': row['rank'],
+        }
+
+
+class CommentRowSerializer(RowSerializer):
+    """Mirrors CommentSerializer."""
+    columns = ('comment', 'id', 'task_id', 'task__title', 'posted_at') + user_columns('commenter')
+
+    def to_representation(self, row):
+        return {
+            'comment': row['comment'],
+            'id': row['id'],
+            'commenter': self.user(row, 'commenter'),
+            'task': row['task_id'],
+            'task_title': row['task__title'],
+            'posted_at': self.format_datetime(row['posted_at']),
+        }
+
+
+class RowListMixin:
+    """
+    ``list()`` through ``row_serializer_class`` instead of ``serializer_class``,
+    which still handles writes. Pagination must be a KeysetPagination.
+    """
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.row_serializer_class()
+        paginator = self.paginator
+        page = paginator.page_queryset(queryset, request, view=self) if paginator is not None else None
+        if page is None:
+            return Response(serializer.serialize(serializer.values(queryset)))
+        rows = paginator.set_page(list(serializer.values(page, paginator.fields)))
+        return paginator.get_paginated_response(serializer.serialize(rows))
@@ -0,0 +1,141 @@
+import re
+from html import escape
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Comment, Task
+
+# Snippet highlight delimiters. Control characters cannot be typed into a
+# task or comment, so they survive HTML escaping and are swapped for <mark>.
+START, STOP = '\x02', '\x03'
+
+MEMBER_PROJECTS = (
+    'SELECT m.project_id FROM projects_projectmembership m JOIN projects_project p ON p.id = m.project_id '
+    'WHERE m.user_id = %s AND p.deleted_at IS NULL'
+)
+
+SQLITE_HITS = f"""
+    SELECT 'task' AS kind, f.rowid AS object_id, f.rowid AS task_id, bm25(projects_task_fts, 10.0, 1.0) AS rank
+    FROM projects_task_fts f JOIN projects_task t ON t.id = f.rowid
+    WHERE projects_task_fts MATCH %s AND t.project_id IN ({MEMBER_PROJECTS})
+    UNION ALL
+    SELECT 'comment', f.rowid, c.task_id, bm25(projects_comment_fts)
+    FROM projects_comment_fts f
+    JOIN projects_comment c ON c.id = f.rowid
+    JOIN projects_task t ON t.id = c.task_id
+    WHERE projects_comment_fts MATCH %s AND t.project_id IN ({MEMBER_PROJECTS})
+    ORDER BY rank, kind, object_id
+    LIMIT %s OFFSET %s
+"""
+
+SQLITE_SNIPPETS = {
+    'task': "SELECT rowid, snippet(projects_task_fts, -1, char(2), char(3), '…', 16) "
+            "FROM projects_task_fts WHERE projects_task_fts MATCH %s AND rowid IN ({ids})",
+    'comment': "SELECT rowid, snippet(projects_comment_fts, 0, char(2), char(3), '…', 16) "
+               "FROM projects_comment_fts WHERE projects_comment_fts MATCH %s AND rowid IN ({ids})",
+}
+
+POSTGRES_HITS = f"""
+    WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+    hits AS (
+        SELECT 'task' AS kind, t.id AS object_id, t.id AS task_id, ts_rank(t.search_vector, q.query) AS rank,
+               concat_ws(' ', t.title, t.description) AS body
+        FROM projects_task t, q
+        WHERE t.search_vector @@ q.query AND t.project_id IN ({MEMBER_PROJECTS})
+        UNION ALL
+        SELECT 'comment', c.id, c.task_id, ts_rank(c.search_vector, q.query), c.comment
+        FROM projects_comment c JOIN projects_task t ON t.id = c.task_id, q
+        WHERE c.search_vector @@ q.query AND t.project_id IN ({MEMBER_PROJECTS})
+        ORDER BY rank DESC, kind, object_id
+        LIMIT %s OFFSET %s
+    )
+    SELECT hits.kind, hits.object_id, hits.task_id, hits.rank,
+           ts_headline('english', hits.body, q.query, %s)
+    FROM hits, q
+    ORDER BY hits.rank DESC, hits.kind, hits.object_id
+"""
+
+POSTGRES_HEADLINE_OPTIONS = f'StartSel={START}, StopSel={STOP}, MaxWords=24, MinWords=8, MaxFragments=1'
+
+def fts5_query(text):
+    """Quote each word so user input can never be parsed as FTS5 syntax; the last word matches as a prefix."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    quoted = ['"{}"'.format(word.replace('"', '""')) for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def highlight(snippet):
+    return escape(snippet or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+def search(user, text, limit, offset):
+    """
+    Ranked task and comment hits in the user's projects, best first.
+
+    Returns dicts with ``type``, ``id``, ``task_id``, ``project_id``,
+    ``task_title`` and an HTML ``snippet`` whose only markup is ``<mark>``.
+    Uses FTS5 on SQLite and tsvector/GIN on PostgreSQL (see migration 0010).
+    """
+    if connection.vendor == 'sqlite':
+        hits = _search_sqlite(user, text, limit, offset)
+    elif connection.vendor == 'postgresql':
+        hits = _search_postgres(user, text, limit, offset)
+    else:
+        hits = _search_fallback(user, text, limit, offset)
+
+    tasks = Task.objects.filter(id__in={hit['task_id'] for hit in hits}).values('id', 'title', 'project_id')
+    tasks = {task['id']: task for task in tasks}
+    for hit in hits:
+        task = tasks[hit['task_id']]
+        hit['project_id'] = task['project_id']
+        hit['task_title'] = task['title']
+    return hits
+
+def _search_sqlite(user, text, limit, offset):
+    match = fts5_query(text)
+    if match is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_HITS, [match, user.pk, match, user.pk, limit, offset])
+        hits = [
+            {'type': kind, 'id': object_id, 'task_id': task_id, 'rank': -rank}
+            for kind, object_id, task_id, rank in cursor.fetchall()
+        ]
+
+        # Snippets are only built for the rows on this page.
+        snippets = {}
+        for kind, sql in SQLITE_SNIPPETS.items():
+            ids = [hit['id'] for hit in hits if hit['type'] == kind]
+            if ids:
+                cursor.execute(sql.format(ids=', '.join(['%s'] * len(ids))), [match, *ids])
+                snippets.update({(kind, rowid): snippet for rowid, snippet in cursor.fetchall()})
+
+    for hit in hits:
+        hit['snippet'] = highlight(snippets.get((hit['type'], hit['id'])))
+    return hits
+
+def _search_postgres(user, text, limit, offset):
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_HITS, [text, user.pk, user.pk, limit, offset, POSTGRES_HEADLINE_OPTIONS])
+        return [
+            {'type': kind, 'id': object_id, 'task_id': task_id, 'rank': rank, 'snippet': highlight(snippet)}
+            for kind, object_id, task_id, rank, snippet in cursor.fetchall()
+        ]
+
+def _search_fallback(user, text, limit, offset):
+    """Unranked substring matching for databases without a supported full-text index."""
+    projects = Q(project__projectmembership__user=user, project__deleted_at__isnull=True)
+    tasks = Task.objects.filter(projects, Q(title__icontains=text) | Q(description__icontains=text))
+    comments = Comment.objects.filter(task__project__projectmembership__user=user, task__project__deleted_at__isnull=True,
+                                      comment__icontains=text)
+    hits = [
+        {'type': 'task', 'id': task.id, 'task_id': task.id, 'rank': 0.0, 'snippet': highlight(task.title)}
+        for task in tasks.order_by('id')[:offset + limit]
+    ] + [
+        {'type': 'comment', 'id': comment.id, 'task_id': comment.task_id, 'rank': 0.0, 'snippet': highlight(comment.comment)}
+        for comment in comments.order_by('id')[:offset + limit]
+    ]
+    return hits[offset:offset + limit]
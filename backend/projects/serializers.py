@@ -1,6 +1,14 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q, Value
+from django.db.models.functions import Cast, NullIf, Substr
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Project, Task, ProjectMembership, Comment
+from .backends import users_with_email
+from .permissions import get_project_role
+from .ranking import is_valid_rank
 from django.contrib.auth.models import User
 
 
@@ -31,37 +39,47 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         }
 
     def validate_email(self, value):
-        """Ensure email is unique."""
-        if User.objects.filter(email=value).exists():
+        """Ensure email is unique, ignoring case."""
+        if users_with_email(value).exists():
             raise serializers.ValidationError("A user with this email already exists.")
         return value
 
     def create(self, validated_data):
         """Create a user with an auto-generated username and return JWT token."""
         email = validated_data['email']
-        first_name = validated_data['first_name']
-        last_name = validated_data['last_name']
-        password = validated_data['password']
-
-        username = email.split('@')[0]
-        
-        counter = 1
-        base_username = username
-        while User.objects.filter(username=username).exists():
-            username = f"{base_username}{counter}"
-            counter += 1
-
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            first_name=first_name,
-            last_name=last_name,
-            password=password
-        )
-        user.is_staff = False
-        user.is_superuser = False
-        user.save()
-        return user
+        base_username = email.split('@')[0]
+
+        # Another signup may claim the same username between allocating and inserting it.
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    return User.objects.create_user(
+                        username=allocate_username(base_username),
+                        email=email,
+                        first_name=validated_data['first_name'],
+                        last_name=validated_data['last_name'],
+                        password=validated_data['password'],
+                    )
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+
+
+def allocate_username(base):
+    """
+    ``base`` if it is free, otherwise ``base`` plus one more than the largest
+    numeric suffix in use ("john", "john1", "john7" -> "john8"), in one query.
+    """
+    suffix = NullIf(Substr('username', len(base) + 1), Value(''))
+    taken = User.objects.filter(
+        username__startswith=base, username__regex=rf'^{re.escape(base)}[0-9]{{0,18}}$'
+    ).aggregate(
+        base_taken=Count('id', filter=Q(username=base)),
+        top=Max(Cast(suffix, BigIntegerField())),
+    )
+    if not taken['base_taken']:
+        return base
+    return f"{base}{(taken['top'] or 0) + 1}"
 
 
 class ProjectMembershipSerializer(serializers.ModelSerializer):
@@ -76,14 +94,27 @@ class ProjectMembershipSerializer(serializers.ModelSerializer):
         fields = ['user', 'user_email', 'first_name', 'last_name', 'user_id', 'role', 'joined_at']
 
 
+class SyncMembershipSerializer(ProjectMembershipSerializer):
+    """Memberships sent outside their project's payload carry the project id."""
+    project = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(ProjectMembershipSerializer.Meta):
+        fields = ProjectMembershipSerializer.Meta.fields + ['project', 'updated_at']
+
+
 class ProjectSerializer(serializers.ModelSerializer):
     """Serialize projects with nested owner and members."""
     owner = UserSerializer(read_only=True)
     members = ProjectMembershipSerializer(source='projectmembership_set', many=True, read_only=True)
+    task_count = serializers.ReadOnlyField()
 
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'owner', 'members', 'created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'description', 'owner', 'members',
+            'task_count', 'todo_count', 'in_progress_count', 'done_count',
+            'created_at', 'updated_at'
+        ]
         read_only_fields = ['created_at', 'updated_at']
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -98,7 +129,8 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'status', 'priority',
             'assignee', 'assignee_username',
-            'project', 'project_name', 'created_at', 'updated_at', 'due_date'
+            'project', 'project_name', 'created_at', 'updated_at', 'due_date',
+            'comment_count', 'last_comment_at', 'rank'
         ]
         read_only_fields = ['created_at', 'updated_at', 'project']
 
@@ -115,9 +147,7 @@ class TaskSerializer(serializers.ModelSerializer):
         if not project_id:
             raise serializers.ValidationError("Cannot resolve project.")
 
-        project = Project.objects.get(id=project_id)
-
-        if not ProjectMembership.objects.filter(project=project, user=user).exists():
+        if get_project_role(user, project_id) is None:
             raise serializers.ValidationError("Assignee must be a member of the project.")
 
         return user
@@ -134,6 +164,58 @@ class TaskSerializer(serializers.ModelSerializer):
             instance.assignee = assignee
         return super().update(instance, validated_data)
     
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """Validate a single task in a bulk request. Assignees are resolved in bulk by the view."""
+    assignee_username = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'status', 'priority', 'due_date', 'assignee_username']
+
+class TaskMoveSerializer(serializers.Serializer):
+    """Where to put a task: between ``after`` and ``before`` (task ids), optionally in another ``status`` column."""
+    status = serializers.ChoiceField(choices=Task._meta.get_field('status').choices, required=False)
+    after = serializers.IntegerField(required=False, allow_null=True)
+    before = serializers.IntegerField(required=False, allow_null=True)
+
+class ImportProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['name', 'description']
+
+class ImportMemberSerializer(serializers.ModelSerializer):
+    """One member record of a project import (see projects.transfer)."""
+    username = serializers.CharField()
+
+    class Meta:
+        model = ProjectMembership
+        fields = ['username', 'role']
+
+class ImportTaskSerializer(serializers.ModelSerializer):
+    """One task record of a project import. ``id`` is the exporter's, for comments to refer to."""
+    id = serializers.IntegerField(required=False, allow_null=True)
+    assignee = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    created_at = serializers.DateTimeField(required=False, allow_null=True)
+    rank = serializers.CharField(required=False, allow_null=True, allow_blank=True, max_length=64)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'status', 'priority', 'assignee', 'due_date', 'created_at', 'rank']
+
+    def validate_rank(self, rank):
+        if rank and not is_valid_rank(rank):
+            raise serializers.ValidationError('Not a valid rank.')
+        return rank or ''
+
+class ImportCommentSerializer(serializers.ModelSerializer):
+    task = serializers.IntegerField()
+    commenter = serializers.CharField()
+    posted_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    class Meta:
+        model = Comment
+        fields = ['task', 'commenter', 'comment', 'posted_at']
+
 class CommentSerializer(serializers.ModelSerializer):
     commenter = UserSerializer(read_only=True)
     task = serializers.PrimaryKeyRelatedField(read_only=True)
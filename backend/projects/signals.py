@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .events import publish_event
+from .models import Comment, Project, ProjectMembership, Task, Tombstone
+from .permissions import role_cache, role_cache_key
+from .response_cache import bump, project_version_key, user_version_key
+from .utils import user_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached auth record so the next request reloads the user."""
+    user_cache.pop(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def invalidate_cached_role(sender, instance, **kwargs):
+    role_cache.pop(role_cache_key(instance.user_id, instance.project_id))
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def touch_project(sender, instance, **kwargs):
+    """Projects embed their members, so a membership change is a project change."""
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=ProjectMembership)
+def record_membership_tombstone(sender, instance, **kwargs):
+    # Tells delta sync clients of the removed user to drop the whole project.
+    Tombstone.objects.create(
+        kind='membership', object_id=instance.user_id,
+        project_id=instance.project_id, user_id=instance.user_id,
+    )
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def publish_membership_event(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_delete:
+        event_type = 'membership.deleted'
+    else:
+        event_type = 'membership.created' if created else 'membership.updated'
+    publish_event(instance.project_id, event_type, user_id=instance.user_id, role=instance.role)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_cached_project_roles(sender, instance, created=False, **kwargs):
+    # A new project has no cached roles yet; otherwise the owner may have changed.
+    if not created:
+        project_id = str(instance.pk)
+        role_cache.discard_where(lambda key: key[1] == project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def publish_project_event(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_delete:
+        publish_event(instance.pk, 'project.deleted')
+    elif not created:
+        publish_event(instance.pk, 'project.updated')
+
+
+# Cached responses (projects.response_cache). Task and Comment deletes bump from
+# their delete() instead: a delete receiver would stop cascades from fast-deleting them.
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_version(sender, instance, **kwargs):
+    bump(project_version_key(instance.pk))
+
+
+@receiver(post_save, sender=Task)
+def bump_task_project_version(sender, instance, **kwargs):
+    bump(project_version_key(instance.project_id))
+
+
+@receiver(post_save, sender=Comment)
+def bump_comment_project_version(sender, instance, **kwargs):
+    bump(project_version_key(instance.task.project_id))
+
+
+# The user fields that project, member, task and comment payloads embed.
+DISPLAYED_USER_FIELDS = {'username', 'email', 'first_name', 'last_name'}
+
+@receiver(post_save, sender=User)
+def touch_user_projects(sender, instance, created, update_fields=None, **kwargs):
+    """
+    A user's new name is a change to every project that shows them, as owner,
+    member, assignee or commenter: touched for the validators that follow
+    Project.updated_at, and bumped for cached responses and the task and
+    comment validators.
+    """
+    if created or (update_fields is not None and not DISPLAYED_USER_FIELDS.intersection(update_fields)):
+        return
+    project_ids = list(Project.objects.filter(
+        Q(owner=instance)
+        | Exists(ProjectMembership.objects.filter(project=OuterRef('pk'), user=instance))
+        | Exists(Task.objects.filter(project=OuterRef('pk'), assignee=instance))
+        | Exists(Comment.objects.filter(task__project=OuterRef('pk'), commenter=instance))
+    ).values_list('pk', flat=True))
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(updated_at=timezone.now())
+        bump(*map(project_version_key, project_ids))
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def bump_membership_versions(sender, instance, **kwargs):
+    """The project's payload embeds its members, and the user's project list gains or loses it."""
+    bump(project_version_key(instance.project_id), user_version_key(instance.user_id))
@@ -0,0 +1,70 @@
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Project, Task
+
+STATUSES = [value for value, _ in Task._meta.get_field('status').choices]
+PRIORITIES = [value for value, _ in Task._meta.get_field('priority').choices]
+OPEN_STATUSES = [value for value in STATUSES if value != 'done']
+
+def _count_columns(prefix=''):
+    """Count(filter=...) columns for totals, statuses, priorities and overdue tasks."""
+    task_id = f'{prefix}id'
+    columns = {'total': Count(task_id)}
+    for value in STATUSES:
+        columns[f'status_{value}'] = Count(task_id, filter=Q(**{f'{prefix}status': value}))
+    for value in PRIORITIES:
+        columns[f'priority_{value}'] = Count(task_id, filter=Q(**{f'{prefix}priority': value}))
+    columns['overdue'] = Count(task_id, filter=Q(**{
+        f'{prefix}due_date__lt': timezone.localdate(),
+        f'{prefix}status__in': OPEN_STATUSES,
+    }))
+    return columns
+
+def _shape(row):
+    total = row['total']
+    done = row['status_done']
+    return {
+        'total': total,
+        'by_status': {value: row[f'status_{value}'] for value in STATUSES},
+        'by_priority': {value: row[f'priority_{value}'] for value in PRIORITIES},
+        'overdue': row['overdue'],
+        'completion': round(done * 100 / total, 1) if total else 0.0,
+    }
+
+def project_stats(project_id):
+    """
+    Task counts for one project, with per-assignee load, from a single query.
+
+    Rows are grouped by assignee and the project totals are summed from the
+    groups, so the result size depends on the number of assignees, not tasks.
+    """
+    columns = _count_columns()
+    rows = list(
+        Task.objects.filter(project_id=project_id)
+        .values('assignee_id', 'assignee__username')
+        .annotate(**columns)
+        .order_by(F('assignee__username').asc(nulls_last=True))
+    )
+
+    totals = {name: sum(row[name] for row in rows) for name in columns}
+    stats = _shape(totals)
+    stats['assignees'] = [
+        {
+            'user_id': row['assignee_id'],
+            'username': row['assignee__username'],
+            'total': row['total'],
+            'open': row['total'] - row['status_done'],
+            'overdue': row['overdue'],
+        }
+        for row in rows
+    ]
+    return stats
+
+def projects_stats(user, project_ids=None):
+    """Task counts for every project the user belongs to, from a single query."""
+    projects = Project.objects.filter(projectmembership__user=user)
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+    rows = projects.values('id').annotate(**_count_columns('tasks__')).order_by('created_at', 'id')
+    return [{'project_id': row['id'], **_shape(row)} for row in rows]
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Prefetch, Q
+
+from .models import Comment, Project, ProjectMembership, Task, Tombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def encode_cursor(moment):
+    """Cursors are opaque to clients: microseconds since the epoch."""
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+def decode_cursor(cursor):
+    """Raises ValueError for anything encode_cursor() could not have produced."""
+    micros = int(cursor)
+    if micros < 0:
+        raise ValueError(cursor)
+    return EPOCH + timedelta(microseconds=micros)
+
+def page_end(stamps, limit):
+    """
+    The latest time a page can end at so that it holds at most ``limit`` of
+    the sorted ``stamps``, or the first stamp if more than ``limit`` share it.
+    A page never ends between two rows with the same timestamp, or the cursor
+    would skip one of them.
+    """
+    end = stamps[limit - 1]
+    if stamps[limit] == end:
+        earlier = [stamp for stamp in stamps[:limit] if stamp < end]
+        if earlier:
+            return earlier[-1]
+    return end
+
+def changes_since(user, since, until, limit=None):
+    """
+    Rows visible to ``user`` that were created or updated in (since, until],
+    and tombstones for rows deleted in that window.
+
+    Each query is a range scan on an ``updated_at`` index, so the cost follows
+    the number of changes. Projects the user joined after ``since`` are sent
+    in full, since their older rows are new to the client. ``since=None``
+    returns a full snapshot with no tombstones.
+
+    With a ``limit``, each query reads at most ``limit + 1`` rows and the
+    window is cut short at the page_end() of everything read, so about
+    ``limit`` changes come back; ``until`` in the result is where the page
+    ends and ``has_more`` says whether anything is left after it.
+
+    Clients should apply ``deleted`` before upserting the other lists.
+    """
+    projects = ProjectMembership.objects.filter(user=user, project__deleted_at__isnull=True).values('project_id')
+    joined = []
+    if since is not None:
+        joined = list(ProjectMembership.objects.filter(user=user, joined_at__gt=since).values_list('project_id', flat=True))
+
+    def changed(project_field):
+        window = Q(updated_at__lte=until)
+        if since is None:
+            return window
+        return window & (Q(updated_at__gt=since) | Q(**{f'{project_field}__in': joined}))
+
+    querysets = {
+        'projects': Project.objects.filter(changed('id'), id__in=projects).select_related('owner').prefetch_related(
+            Prefetch('projectmembership_set', queryset=ProjectMembership.objects.select_related('user'))
+        ).order_by('updated_at', 'id'),
+        'tasks': Task.objects.filter(changed('project_id'), project_id__in=projects).select_related(
+            'project', 'assignee').order_by('updated_at', 'id'),
+        'comments': Comment.objects.filter(changed('task__project_id'), task__project_id__in=projects).select_related(
+            'commenter', 'task').order_by('updated_at', 'id'),
+        'memberships': ProjectMembership.objects.filter(changed('project_id'), project_id__in=projects).select_related(
+            'user').order_by('updated_at', 'id'),
+    }
+
+    stamp_field = {name: 'updated_at' for name in querysets}
+    if since is not None:
+        querysets['deleted'] = Tombstone.objects.filter(
+            Q(project_id__in=projects) | Q(user_id=user.pk),
+            deleted_at__gt=since, deleted_at__lte=until,
+        ).order_by('deleted_at', 'id')
+        stamp_field['deleted'] = 'deleted_at'
+
+    has_more = False
+    if limit is None:
+        changes = {name: list(queryset) for name, queryset in querysets.items()}
+    else:
+        changes = {name: list(queryset[:limit + 1]) for name, queryset in querysets.items()}
+        stamps = sorted(getattr(row, stamp_field[name]) for name, rows in changes.items() for row in rows)
+        if len(stamps) > limit:
+            has_more = True
+            until = page_end(stamps, limit)
+            for name, rows in changes.items():
+                field = stamp_field[name]
+                if len(rows) > limit and getattr(rows[-1], field) <= until:
+                    # Only when more than ``limit`` rows share one timestamp.
+                    rows = querysets[name].filter(**{f'{field}__lte': until})
+                changes[name] = [row for row in rows if getattr(row, field) <= until]
+
+    changes['deleted'] = [
+        {'type': tombstone.kind, 'id': tombstone.object_id, 'project_id': tombstone.project_id}
+        for tombstone in changes.get('deleted', [])
+    ]
+    changes.update(until=until, has_more=has_more)
+    return changes
@@ -1,3 +1,1757 @@
-from django.test import TestCase
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from .async_views import (
+    AsyncCommentListView, AsyncMeView, AsyncProfileView, AsyncProjectListView, AsyncTaskListView
+)
+from . import metrics
+from .deletion import purge_project
+from .events import get_broadcaster
+from .middleware import RequestProfilingMiddleware
+from .models import Project, ProjectMembership, Task, Comment, Tombstone
+from .permissions import role_cache
+from .profiling import fingerprint
+from .ranking import rank_between, spread_ranks
+from .renderers import FastJSONRenderer
+from .rows import CommentRowSerializer, TaskRowSerializer
+from .serializers import CommentSerializer, TaskSerializer
+from .throttling import CacheWindowStore, LocalBucketStore, reset_throttles
+from .utils import generate_jwt, user_cache
+
+
+class ProjectAPITestCase(TestCase):
+    """
+    An owner (``user``) with one project, and a client signed in as the owner
+    with the user, role and response caches empty. Subclasses add what their
+    tests need in setUpTestData after calling super().
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.project = Project.objects.create(name='Project', owner=cls.user)
+        ProjectMembership.objects.create(user=cls.user, project=cls.project, role='owner')
+
+    def setUp(self):
+        user_cache.clear()
+        role_cache.clear()
+        cache.clear()
+        self.login(self.user)
+
+    def login(self, user):
+        """Send ``user``'s JWT from the test client and async client."""
+        self.client.cookies['jwt'] = generate_jwt(user)
+        self.async_client.cookies['jwt'] = generate_jwt(user)
+
+    def client_for(self, user):
+        """A separate client signed in as ``user``."""
+        client = Client()
+        client.cookies['jwt'] = generate_jwt(user)
+        return client
+
+
+# Budgets are for building a response; ResponseCacheTests covers cache hits.
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryBudgetTests(ProjectAPITestCase):
+    """Every list and detail endpoint must run a fixed number of queries, however much data exists."""
+
+    PROJECTS = 15
+    MEMBERS_PER_PROJECT = 8
+    TASKS = 60
+    COMMENTS = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        members = User.objects.bulk_create([
+            User(username=f'member{i}', email=f'member{i}@example.com', first_name='Member', last_name=str(i))
+            for i in range(cls.MEMBERS_PER_PROJECT - 1)
+        ])
+        projects = [cls.project] + Project.objects.bulk_create([
+            Project(name=f'Project {i}', owner=cls.user) for i in range(1, cls.PROJECTS)
+        ])
+        memberships = []
+        for project in projects:
+            if project is not cls.project:
+                memberships.append(ProjectMembership(user=cls.user, project=project, role='owner'))
+            memberships.extend(ProjectMembership(user=member, project=project) for member in members)
+        ProjectMembership.objects.bulk_create(memberships)
+
+        tasks = Task.objects.bulk_create([
+            Task(project=cls.project, title=f'Task {i}', assignee=members[i % len(members)])
+            for i in range(cls.TASKS)
+        ])
+        cls.task = tasks[0]
+        Comment.objects.bulk_create([
+            Comment(task=cls.task, commenter=members[i % len(members)], comment=f'Comment {i}')
+            for i in range(cls.COMMENTS)
+        ])
+        cls.member = members[0]
+
+    def setUp(self):
+        super().setUp()
+        # Budgets are for warm users, whose authentication costs no queries.
+        self.client.get(reverse('me'))
+
+    def grow(self):
+        """Double every collection the endpoints return, with users not seen before."""
+        users = User.objects.bulk_create([
+            User(username=f'extra{i}', email=f'extra{i}@example.com') for i in range(self.MEMBERS_PER_PROJECT)
+        ])
+        projects = Project.objects.bulk_create([
+            Project(name=f'Extra project {i}', owner=self.user) for i in range(self.PROJECTS)
+        ])
+        ProjectMembership.objects.bulk_create(
+            [ProjectMembership(user=self.user, project=project, role='owner') for project in projects]
+            + [ProjectMembership(user=user, project=project) for project in projects + [self.project] for user in users]
+        )
+        Task.objects.bulk_create([
+            Task(project=self.project, title=f'Extra task {i}', assignee=users[i % len(users)]) for i in range(self.TASKS)
+        ])
+        Comment.objects.bulk_create([
+            Comment(task=self.task, commenter=users[i % len(users)], comment=f'Extra comment {i}')
+            for i in range(self.COMMENTS)
+        ])
+
+    def assertQueryBudget(self, budget, url, warm_role=False):
+        """Assert ``budget`` queries for ``url``, then again with the data doubled. Returns both responses."""
+        responses = []
+        for grown in (False, True):
+            if grown:
+                self.grow()
+            role_cache.clear()
+            if warm_role:
+                self.client.get(url)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response)
+        return responses
+
+    def assertSizes(self, responses, size):
+        self.assertEqual([len(response.json()) for response in responses], [size, 2 * size])
+
+    def test_project_list(self):
+        self.assertSizes(self.assertQueryBudget(3, reverse('project_list_create')), self.PROJECTS)
+
+    def test_project_detail(self):
+        self.assertQueryBudget(3, reverse('project_detail', args=[self.project.id]))
+
+    def test_task_list(self):
+        self.assertSizes(self.assertQueryBudget(3, reverse('task_list_create', args=[self.project.id])), self.TASKS)
+
+    def test_task_detail(self):
+        self.assertQueryBudget(3, reverse('task_detail', args=[self.project.id, self.task.id]))
+
+    def test_my_tasks(self):
+        responses = self.assertQueryBudget(1, reverse('my_tasks') + '?page_size=200')
+        self.assertEqual([len(response.json()['results']) for response in responses], [self.TASKS, 2 * self.TASKS])
+
+    def test_member_list(self):
+        self.assertSizes(
+            self.assertQueryBudget(3, reverse('project_membership', args=[self.project.id])), self.MEMBERS_PER_PROJECT)
+
+    def test_member_detail(self):
+        self.assertQueryBudget(2, reverse('project_membership_detail', args=[self.project.id, self.member.id]))
+
+    def test_comment_list(self):
+        self.assertSizes(self.assertQueryBudget(4, reverse('comment', args=[self.project.id, self.task.id])), self.COMMENTS)
+
+    def test_warm_role_needs_no_authorization_query(self):
+        self.assertQueryBudget(2, reverse('task_list_create', args=[self.project.id]), warm_role=True)
+
+    def test_comment_detail(self):
+        comment = self.task.comments.first()
+        self.assertQueryBudget(
+            3, reverse('comment_detail', args=[self.project.id, self.task.id, comment.id]))
+
+
+class KeysetPaginationTests(ProjectAPITestCase):
+    """Opt-in cursor pages cover every row once and cost the same at any depth."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Identical timestamps force the id tie-breaker to do its job.
+        tasks = Task.objects.bulk_create([Task(project=cls.project, title=f'Task {i}') for i in range(25)])
+        Task.objects.filter(id__in=[task.id for task in tasks]).update(created_at=tasks[0].created_at)
+        cls.task_ids = sorted(task.id for task in tasks)
+
+    def setUp(self):
+        super().setUp()
+        # Warm the auth and role caches so every page below costs the same.
+        self.client.get(reverse('task_list_create', args=[self.project.id]))
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(reverse('task_list_create', args=[self.project.id]))
+        self.assertEqual([task['id'] for task in response.json()], self.task_ids)
+
+    def test_pages_walk_every_row_at_constant_cost(self):
+        url = reverse('task_list_create', args=[self.project.id]) + '?page_size=10'
+        seen = []
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(task['id'] for task in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(seen, self.task_ids)
+
+    @override_settings(SECURE_PROXY_SSL_HEADER=('HTTP_X_FORWARDED_PROTO', 'https'), USE_X_FORWARDED_HOST=True)
+    def test_next_link_behind_tls_proxy(self):
+        # What settings configure when NUM_PROXIES is set.
+        url = reverse('task_list_create', args=[self.project.id]) + '?page_size=10'
+        response = self.client.get(url, headers={'X-Forwarded-Proto': 'https', 'X-Forwarded-Host': 'collabflow-xzeb.onrender.com'})
+        self.assertTrue(response.json()['next'].startswith(f'https://collabflow-xzeb.onrender.com{url.split("?")[0]}?'))
+
+    def test_invalid_cursor(self):
+        url = reverse('task_list_create', args=[self.project.id]) + '?cursor=garbage'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class JWTAuthenticationTests(ProjectAPITestCase):
+    """The JWT cookie is resolved once per request and cached across requests."""
+
+    def test_cold_then_warm(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('me')).json()['username'], 'owner')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('me'))
+
+    def test_user_save_invalidates(self):
+        self.client.get(reverse('me'))
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('me')).json()['first_name'], 'Renamed')
+
+    def test_entries_expire(self):
+        ttl, user_cache.ttl = user_cache.ttl, 0.01
+        try:
+            self.client.get(reverse('me'))
+            # As if another worker handled the write: no signal reaches this cache.
+            User.objects.filter(pk=self.user.pk).update(first_name='Elsewhere')
+            time.sleep(0.02)
+            self.assertEqual(self.client.get(reverse('me')).json()['first_name'], 'Elsewhere')
+        finally:
+            user_cache.ttl = ttl
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(reverse('me'))
+        self.user.delete()
+        self.assertEqual(self.client.get(reverse('me')).status_code, 403)
+
+    def test_invalid_token(self):
+        self.client.cookies['jwt'] = 'not-a-token'
+        self.assertEqual(self.client.get(reverse('me')).status_code, 403)
+
+
+class SignupLoginTests(TestCase):
+    """Login is one indexed email lookup and signup costs the same however common the name is."""
+
+    def setUp(self):
+        reset_throttles()
+
+    def signup(self, email):
+        return Client().post(reverse('signup'), {
+            'email': email, 'first_name': 'John', 'last_name': 'Smith', 'password': 'correct horse',
+        }, content_type='application/json')
+
+    def login(self, email, password='correct horse'):
+        return Client().post(reverse('login'), {'email': email, 'password': password}, content_type='application/json')
+
+    def test_username_takes_next_free_suffix(self):
+        User.objects.bulk_create([User(username=name) for name in ['john', 'john1', 'john7', 'johnny', 'john8x']])
+        with CaptureQueriesContext(connection) as first:
+            self.signup('john@example.com')
+        self.assertTrue(User.objects.filter(username='john8', email='john@example.com').exists())
+
+        User.objects.bulk_create([User(username=f'jane{i}') for i in range(1, 50)] + [User(username='jane')])
+        with CaptureQueriesContext(connection) as common:
+            self.signup('jane@example.com')
+        self.assertTrue(User.objects.filter(username='jane50').exists())
+        self.assertEqual(len(common), len(first))
+
+        self.signup('solo@example.com')
+        self.assertTrue(User.objects.filter(username='solo').exists())
+
+    def test_email_is_case_insensitive(self):
+        self.assertEqual(self.signup('John@Example.com').status_code, 201)
+        self.assertEqual(self.signup('john@example.COM').status_code, 400)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login('JOHN@example.com').status_code, 200)
+        self.assertEqual(self.login('john@example.com', 'wrong').status_code, 401)
+        self.assertEqual(self.login('nobody@example.com').status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThrottleTests(TestCase):
+    """Login floods are turned away per address and per email before any query or password hash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+
+    def setUp(self):
+        reset_throttles()
+
+    def login(self, email, password='wrong', ip='192.0.2.1'):
+        return Client(REMOTE_ADDR=ip).post(reverse('login'), {'email': email, 'password': password},
+                                           content_type='application/json')
+
+    def test_email_is_throttled_across_addresses(self):
+        for i in range(5):
+            self.assertEqual(self.login('owner@example.com', ip=f'192.0.2.{i}').status_code, 401)
+        throttled = metrics.registry.snapshot().get(metrics.LOGIN_ATTEMPTS.key({'outcome': 'throttled'}), 0)
+        with self.assertNumQueries(0):
+            response = self.login('OWNER@example.com', 'password', ip='192.0.2.99')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '12')
+        self.assertEqual(metrics.registry.snapshot()[metrics.LOGIN_ATTEMPTS.key({'outcome': 'throttled'})], throttled + 1)
+        # Other accounts are unaffected.
+        self.assertEqual(self.login('other@example.com', ip='192.0.2.99').status_code, 401)
+
+    def test_address_is_throttled_across_emails(self):
+        for i in range(10):
+            self.assertEqual(self.login(f'user{i}@example.com').status_code, 401)
+        self.assertEqual(self.login('owner@example.com', 'password').status_code, 429)
+        self.assertEqual(Client(REMOTE_ADDR='192.0.2.1').post(reverse('signup'), {
+            'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User', 'password': 'password',
+        }, content_type='application/json').status_code, 429)
+        self.assertEqual(self.login('owner@example.com', 'password', ip='192.0.2.2').status_code, 200)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        statuses = [
+            Client(REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR=f'198.51.100.{i}').post(
+                reverse('login'), {'email': f'user{i}@example.com', 'password': 'wrong'}, content_type='application/json'
+            ).status_code
+            for i in range(11)
+        ]
+        self.assertEqual(statuses, [401] * 10 + [429])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_forwarded_for_behind_a_proxy(self):
+        def login(forwarded_for, email):
+            return Client(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for).post(
+                reverse('login'), {'email': email, 'password': 'wrong'}, content_type='application/json')
+
+        for i in range(10):
+            login(f'198.51.100.{i}, 192.0.2.1', f'user{i}@example.com')
+        # The proxy appends the address it saw; whatever the client put before it does not matter.
+        self.assertEqual(login('203.0.113.9, 192.0.2.1', 'other@example.com').status_code, 429)
+        self.assertEqual(login('192.0.2.2', 'other@example.com').status_code, 401)
+
+    def test_address_rejections_do_not_spend_email_tokens(self):
+        for i in range(10):
+            self.login(f'user{i}@example.com')
+        for _ in range(5):
+            self.assertEqual(self.login('owner@example.com').status_code, 429)
+        self.assertEqual(self.login('owner@example.com', 'password', ip='192.0.2.2').status_code, 200)
+
+    def test_local_buckets_refill_and_evict(self):
+        store = LocalBucketStore(maxsize=2)
+        self.assertEqual([store.consume('a', 2, 60, 0) for _ in range(2)], [0, 0])
+        self.assertEqual(store.consume('a', 2, 60, 0), 30)
+        self.assertEqual(store.consume('a', 2, 60, 15), 15)
+        self.assertEqual(store.consume('a', 2, 60, 30), 0)
+        store.consume('b', 2, 60, 30)
+        store.consume('c', 2, 60, 30)
+        self.assertNotIn('a', store._buckets)
+
+    def test_cache_windows_slide(self):
+        store = CacheWindowStore('default')
+        self.assertEqual([store.consume('a', 2, 60, 600) for _ in range(2)], [0, 0])
+        self.assertEqual(store.consume('a', 2, 60, 630), 30)
+        # Half the previous window still counts at the next window's midpoint.
+        self.assertEqual(store.consume('a', 2, 60, 690), 0)
+        self.assertEqual(store.consume('a', 2, 60, 690), 30)
+
+
+class ProjectRoleTests(ProjectAPITestCase):
+    """Cached project roles follow membership changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+
+    def setUp(self):
+        super().setUp()
+        self.login(self.member)
+        self.url = reverse('task_list_create', args=[self.project.id])
+
+    def test_membership_changes_invalidate_role(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        membership = ProjectMembership.objects.create(user=self.member, project=self.project)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        membership.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_unknown_project(self):
+        url = reverse('task_list_create', args=['00000000-0000-0000-0000-000000000000'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_only_owner_and_admins_add_members(self):
+        ProjectMembership.objects.create(user=self.member, project=self.project)
+        url = reverse('project_membership', args=[self.project.id])
+        self.assertEqual(self.client.post(url, {'username': 'owner'}).status_code, 403)
+
+        self.login(self.user)
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        response = self.client.post(url, {'username': other.username, 'role': 'admin'})
+        self.assertEqual(response.status_code, 201)
+
+
+class TaskBulkTests(ProjectAPITestCase):
+    """Bulk task operations validate up front and write in a handful of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'password')
+        ProjectMembership.objects.create(user=cls.member, project=cls.project)
+        cls.tasks = Task.objects.bulk_create([Task(project=cls.project, title=f'Task {i}') for i in range(500)])
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('task_bulk', args=[self.project.id])
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def test_reprioritize_500_tasks(self):
+        body = {'update': [{'id': task.id, 'priority': 'high', 'assignee_username': 'member'} for task in self.tasks]}
+        with self.assertNumQueries(10):
+            response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['updated']), 500)
+        self.assertEqual(Task.objects.filter(priority='high', assignee=self.member).count(), 500)
+
+    def test_mixed_operations(self):
+        response = self.post({
+            'create': [{'title': 'New', 'assignee_username': 'member'}],
+            'update': [{'id': self.tasks[0].id, 'status': 'done'}],
+            'delete': [self.tasks[1].id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'][0]['assignee']['username'], 'member')
+        self.assertEqual(response.json()['updated'][0]['status'], 'done')
+        self.assertEqual(response.json()['deleted'], [self.tasks[1].id])
+        self.assertFalse(Task.objects.filter(id=self.tasks[1].id).exists())
+
+    def test_any_invalid_item_writes_nothing(self):
+        response = self.post({
+            'create': [{'title': 'Valid'}, {'title': 'Bad', 'assignee_username': 'outsider'}],
+            'update': [{'id': 0, 'status': 'done'}],
+            'delete': [self.tasks[0].id],
+        })
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors['create'][0], {})
+        self.assertIn('assignee_username', errors['create'][1])
+        self.assertIn('id', errors['update'][0])
+        self.assertEqual(Task.objects.count(), 500)
+
+    def test_duplicate_ids_are_rejected(self):
+        first, second = self.tasks[0].id, self.tasks[1].id
+        response = self.post({
+            'update': [{'id': first, 'status': 'done'}, {'id': first, 'status': 'done'}],
+            'delete': [second, second, first],
+        })
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors['update'][0], {})
+        self.assertEqual(errors['update'][1], {'id': ['Task is updated more than once.']})
+        self.assertEqual(errors['delete'], [
+            {}, {'id': ['Task is deleted more than once.']}, {'id': ['Task is also updated.']},
+        ])
+        self.assertEqual(Task.objects.filter(status='done').count(), 0)
+
+    def test_owner_without_membership_can_be_assigned(self):
+        ProjectMembership.objects.filter(user=self.user).delete()
+        self.login(self.member)
+        response = self.post({'create': [{'title': 'Mine', 'assignee_username': 'owner'}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'][0]['assignee']['username'], 'owner')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ConditionalGetTests(ProjectAPITestCase):
+    """Unchanged collections answer 304 from the validator query alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tasks = Task.objects.bulk_create([Task(project=cls.project, title=f'Task {i}') for i in range(3)])
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('task_list_create', args=[self.project.id])
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.revalidate(self.url, etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_and_delete_change_the_validator(self):
+        etag = self.client.get(self.url)['ETag']
+        self.tasks[0].save()
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        self.tasks[1].delete()
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    def test_if_modified_since_after_delete(self):
+        comment = Comment.objects.create(task=self.tasks[0], commenter=self.user, comment='Hi')
+        other = Project.objects.create(name='Other', owner=self.user)
+        ProjectMembership.objects.create(user=self.user, project=other, role='owner')
+        since = http_date(time.time() + 60)
+        cases = [
+            (self.url, lambda: self.tasks[2].delete()),
+            (reverse('comment', args=[self.project.id, self.tasks[0].id]), lambda: comment.delete()),
+            (reverse('project_list_create'), lambda: ProjectMembership.objects.filter(project=other).delete()),
+        ]
+        for url, delete in cases:
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            delete()
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_membership_change_invalidates_project_and_members(self):
+        urls = [reverse('project_detail', args=[self.project.id]),
+                reverse('project_membership', args=[self.project.id])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        ProjectMembership.objects.create(user=other, project=self.project)
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+
+class TaskFilterTests(ProjectAPITestCase):
+    """Task lists filter and sort on the server, including by priority ordinal."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        cls.high = Task.objects.create(project=cls.project, title='High', priority='high', assignee=cls.user,
+                                       due_date=today - timedelta(days=1))
+        cls.low = Task.objects.create(project=cls.project, title='Low', priority='low', status='done',
+                                      due_date=today - timedelta(days=2))
+        cls.medium = Task.objects.create(project=cls.project, title='Medium', priority='medium')
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('task_list_create', args=[self.project.id])
+
+    def titles(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [task['title'] for task in (data['results'] if 'results' in data else data)]
+
+    def test_priority_sorts_by_ordinal(self):
+        self.assertEqual(self.titles('?ordering=priority'), ['Low', 'Medium', 'High'])
+        self.assertEqual(self.titles('?ordering=-priority'), ['High', 'Medium', 'Low'])
+
+    def test_filters(self):
+        self.assertEqual(self.titles('?priority=high,medium&ordering=title'), ['High', 'Medium'])
+        self.assertEqual(self.titles('?assignee=me'), ['High'])
+        self.assertEqual(self.titles('?overdue=true'), ['High'])
+        self.assertEqual(self.titles('?status=done'), ['Low'])
+
+    def test_paginated_ordering_with_null_due_dates(self):
+        url = '?ordering=due_date&page_size=1'
+        titles = []
+        while url:
+            response = self.client.get(self.url + url if url.startswith('?') else url)
+            titles.extend(task['title'] for task in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(titles, ['Low', 'High', 'Medium'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url + '?ordering=secret').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '?due_before=tomorrow').status_code, 400)
+
+
+class MyTaskFilterTests(ProjectAPITestCase):
+    """The cross-project task list applies every filter, and rejects malformed ones with a 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.other = Project.objects.create(name='Other', owner=cls.member)
+        hidden = Project.objects.create(name='Hidden', owner=cls.member)
+        ProjectMembership.objects.create(user=cls.user, project=cls.other, role='member')
+        for project in (cls.project, cls.other):
+            ProjectMembership.objects.create(user=cls.member, project=project, role='member')
+        today = timezone.localdate()
+        Task.objects.create(project=cls.project, title='Mine overdue', priority='high', assignee=cls.user,
+                            due_date=today - timedelta(days=3))
+        Task.objects.create(project=cls.project, title='Done overdue', priority='medium', status='done',
+                            due_date=today - timedelta(days=3))
+        Task.objects.create(project=cls.other, title='Theirs', priority='low', status='in_progress',
+                            assignee=cls.member, due_date=today + timedelta(days=3))
+        Task.objects.create(project=cls.other, title='Unassigned', priority='medium')
+        Task.objects.create(project=hidden, title='Not mine', assignee=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def get(self, query):
+        return self.client.get(reverse('my_tasks') + query)
+
+    def titles(self, query=''):
+        response = self.get(query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(task['title'] for task in response.json()['results'])
+
+    def test_only_tasks_of_the_users_projects(self):
+        self.assertEqual(self.titles(), ['Done overdue', 'Mine overdue', 'Theirs', 'Unassigned'])
+
+    def test_project_status_and_priority(self):
+        self.assertEqual(self.titles(f'?project={self.other.id}'), ['Theirs', 'Unassigned'])
+        self.assertEqual(self.titles('?status=done,in_progress'), ['Done overdue', 'Theirs'])
+        self.assertEqual(self.titles('?priority=high,low'), ['Mine overdue', 'Theirs'])
+        self.assertEqual(self.titles(f'?project={self.other.id}&priority=medium'), ['Unassigned'])
+
+    def test_assignee(self):
+        self.assertEqual(self.titles('?assignee=me'), ['Mine overdue'])
+        self.assertEqual(self.titles('?assignee=none'), ['Done overdue', 'Unassigned'])
+        self.assertEqual(self.titles(f'?assignee={self.member.id}'), ['Theirs'])
+
+    def test_due_dates_and_overdue(self):
+        self.assertEqual(self.titles(f'?due_after={self.today}'), ['Theirs'])
+        self.assertEqual(self.titles(f'?due_before={self.today - timedelta(days=3)}'), ['Done overdue', 'Mine overdue'])
+        self.assertEqual(self.titles(f'?due_after={self.today}&due_before={self.today}'), [])
+        self.assertEqual(self.titles('?overdue=true'), ['Mine overdue'])
+        self.assertEqual(self.titles('?overdue=false'), ['Done overdue', 'Theirs', 'Unassigned'])
+
+    def test_invalid_parameters(self):
+        for query, field in [
+            ('?due_after=yesterday', 'due_after'),
+            ('?due_before=2024-13-01', 'due_before'),
+            ('?project=not-a-uuid', 'project'),
+            ('?assignee=someone', 'assignee'),
+            ('?overdue=maybe', 'overdue'),
+        ]:
+            response = self.get(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn(field, response.json())
+
+
+class ProjectStatsTests(ProjectAPITestCase):
+    """Statistics come from one aggregate query whatever the task count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.empty = Project.objects.create(name='Empty', owner=cls.user)
+        ProjectMembership.objects.create(user=cls.user, project=cls.empty, role='owner')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Task.objects.bulk_create(
+            [Task(project=cls.project, title='Done', status='done', assignee=cls.user) for _ in range(3)]
+            + [Task(project=cls.project, title='Late', priority='high', due_date=yesterday)]
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.get(reverse('me'))
+
+    def test_project_stats(self):
+        with self.assertNumQueries(2):
+            stats = self.client.get(reverse('project_stats', args=[self.project.id])).json()
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual(stats['by_status'], {'todo': 1, 'in_progress': 0, 'done': 3})
+        self.assertEqual(stats['by_priority']['high'], 1)
+        self.assertEqual(stats['overdue'], 1)
+        self.assertEqual(stats['completion'], 75.0)
+        self.assertEqual(
+            [(row['username'], row['total'], row['open']) for row in stats['assignees']],
+            [('owner', 3, 0), (None, 1, 1)])
+
+    def test_summary_includes_empty_projects(self):
+        with self.assertNumQueries(1):
+            summary = self.client.get(reverse('project_stats_summary')).json()
+        self.assertEqual([row['total'] for row in summary], [4, 0])
+
+
+class CounterTests(ProjectAPITestCase):
+    """Denormalized counters follow writes and can be repaired."""
+
+    def counts(self):
+        self.project.refresh_from_db()
+        return self.project.todo_count, self.project.in_progress_count, self.project.done_count
+
+    def test_task_status_counters(self):
+        task = Task.objects.create(project=self.project, title='Task')
+        Task.objects.create(project=self.project, title='Other', status='done')
+        self.assertEqual(self.counts(), (1, 0, 1))
+        task.status = 'in_progress'
+        task.save()
+        self.assertEqual(self.counts(), (0, 1, 1))
+        Task.objects.get(pk=task.pk).delete()
+        self.assertEqual(self.counts(), (0, 0, 1))
+
+    def test_comment_counters(self):
+        task = Task.objects.create(project=self.project, title='Task')
+        first = Comment.objects.create(task=task, commenter=self.user, comment='First')
+        second = Comment.objects.create(task=task, commenter=self.user, comment='Second')
+        task.refresh_from_db()
+        self.assertEqual((task.comment_count, task.last_comment_at), (2, second.posted_at))
+        second.delete()
+        task.refresh_from_db()
+        self.assertEqual((task.comment_count, task.last_comment_at), (1, first.posted_at))
+
+    def test_repair_counters(self):
+        task = Task.objects.create(project=self.project, title='Task')
+        Comment.objects.create(task=task, commenter=self.user, comment='Comment')
+        Project.objects.update(todo_count=7, done_count=3)
+        Task.objects.update(comment_count=0, last_comment_at=None)
+        call_command('repair_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0, 0))
+        task.refresh_from_db()
+        self.assertEqual(task.comment_count, 1)
+
+
+class SearchTests(ProjectAPITestCase):
+    """Search is ranked, highlighted, index-maintained and scoped to memberships."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Deploy <pipeline>', description='Ship the release')
+        Comment.objects.create(task=cls.task, commenter=cls.user, comment='The pipeline deploys nightly')
+        hidden = Project.objects.create(name='Hidden', owner=cls.user)
+        Task.objects.create(project=hidden, title='Pipeline secrets')
+
+    def results(self, text):
+        response = self.client.get(reverse('search'), {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_ranked_scoped_hits_with_highlights(self):
+        hits = self.results('pipeline')
+        self.assertEqual([hit['type'] for hit in hits], ['task', 'comment'])
+        self.assertEqual(hits[0]['snippet'], 'Deploy &lt;<mark>pipeline</mark>&gt;')
+        self.assertEqual(hits[1]['task_title'], 'Deploy <pipeline>')
+
+    def test_index_follows_writes(self):
+        self.task.title = 'Renamed'
+        self.task.save()
+        self.assertEqual([hit['type'] for hit in self.results('deploy')], ['comment'])
+        self.task.delete()
+        self.assertEqual(self.results('pipeline'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.results('pipe" OR NOT (x'), [])
+        self.assertEqual(len(self.results('pipe')), 2)
+
+
+class ProjectEventsTests(ProjectAPITestCase):
+    """The per-project change feed streams committed changes to current members only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'password')
+        cls.membership = ProjectMembership.objects.create(user=cls.member, project=cls.project)
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('project_events', args=[self.project.id])
+        self.login(self.member)
+
+    async def open_stream(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def next_event(self, stream):
+        message = (await anext(stream)).decode()
+        return json.loads(message.split('data: ', 1)[1])
+
+    def commit(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            return action()
+
+    async def test_requires_membership(self):
+        self.login(self.outsider)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+        del self.async_client.cookies['jwt']
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_membership_is_rechecked_on_subscribe(self):
+        # A stale cached role must not let a removed member subscribe.
+        role_cache.set((self.outsider.pk, str(self.project.id)), 'member')
+        self.login(self.outsider)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_task_and_comment_events(self):
+        stream = await self.open_stream()
+        try:
+            task = await sync_to_async(self.commit)(
+                lambda: Task.objects.create(project=self.project, title='Write docs'))
+            event = await self.next_event(stream)
+            self.assertEqual(event['type'], 'task.created')
+            self.assertEqual(event['id'], task.id)
+            self.assertEqual(event['project_id'], str(self.project.id))
+
+            comment = await sync_to_async(self.commit)(
+                lambda: Comment.objects.create(task=task, commenter=self.user, comment='On it'))
+            event = await self.next_event(stream)
+            self.assertEqual((event['type'], event['id'], event['task_id']), ('comment.created', comment.id, task.id))
+        finally:
+            await stream.aclose()
+
+    async def test_stream_ends_when_member_is_removed(self):
+        stream = await self.open_stream()
+        await sync_to_async(self.commit)(self.membership.delete)
+        event = await self.next_event(stream)
+        self.assertEqual((event['type'], event['user_id']), ('membership.deleted', self.member.pk))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertFalse(get_broadcaster()._subscribers)
+
+
+class SyncTests(ProjectAPITestCase):
+    """Delta sync returns only what changed since the cursor, plus tombstones for deletions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        ProjectMembership.objects.create(user=cls.member, project=cls.project)
+        cls.tasks = [Task.objects.create(project=cls.project, title=f'Task {i}') for i in range(5)]
+        Comment.objects.create(task=cls.tasks[0], commenter=cls.user, comment='First')
+
+    def sync(self, cursor=None):
+        response = self.client.get(reverse('sync'), {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def rewind(self, cursor):
+        # Step past the overlap window so only changes made after this point come back.
+        with self.settings(SYNC_CURSOR_OVERLAP=0):
+            return self.sync(cursor)['cursor']
+
+    def test_snapshot_then_delta(self):
+        snapshot = self.sync()
+        self.assertEqual(len(snapshot['projects']), 1)
+        self.assertEqual(len(snapshot['tasks']), 5)
+        self.assertEqual(len(snapshot['comments']), 1)
+        self.assertEqual(len(snapshot['memberships']), 2)
+
+        cursor = self.rewind(None)
+        task = self.tasks[1]
+        task.status = 'done'
+        task.save()
+        deleted_id = self.tasks[2].id
+        self.tasks[2].delete()
+
+        with self.settings(SYNC_CURSOR_OVERLAP=0):
+            delta = self.sync(cursor)
+        self.assertEqual([t['id'] for t in delta['tasks']], [task.id])
+        self.assertEqual([p['id'] for p in delta['projects']], [str(self.project.id)])
+        self.assertEqual(delta['comments'], [])
+        self.assertEqual(delta['deleted'], [
+            {'type': 'task', 'id': deleted_id, 'project_id': str(self.project.id)},
+        ])
+        self.assertGreaterEqual(int(delta['cursor']), int(cursor))
+
+    def test_bulk_deletes_leave_tombstones(self):
+        cursor = self.rewind(None)
+        ids = [self.tasks[3].id, self.tasks[4].id]
+        response = self.client.post(reverse('task_bulk', args=[self.project.id]), {'delete': ids}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        deleted = self.sync(cursor)['deleted']
+        self.assertEqual(sorted(d['id'] for d in deleted if d['type'] == 'task'), ids)
+
+    def test_removed_member_sees_membership_tombstone(self):
+        self.login(self.member)
+        cursor = self.rewind(None)
+        ProjectMembership.objects.get(user=self.member).delete()
+        delta = self.sync(cursor)
+        self.assertEqual(delta['projects'], [])
+        self.assertEqual(delta['deleted'], [
+            {'type': 'membership', 'id': self.member.pk, 'project_id': str(self.project.id)},
+        ])
+
+    def test_new_member_receives_project_in_full(self):
+        newcomer = User.objects.create_user('newcomer', 'newcomer@example.com', 'password')
+        self.login(newcomer)
+        cursor = self.rewind(None)
+        ProjectMembership.objects.create(user=newcomer, project=self.project)
+        delta = self.sync(cursor)
+        self.assertEqual(len(delta['tasks']), 5)
+        self.assertEqual(len(delta['comments']), 1)
+
+    def test_cost_follows_changes(self):
+        cursor = self.rewind(None)
+        with self.settings(SYNC_CURSOR_OVERLAP=0), self.assertNumQueries(6):
+            delta = self.sync(cursor)
+        self.assertEqual(delta['tasks'], [])
+
+    def test_pages_through_a_large_backlog(self):
+        cursor = self.rewind(None)
+        tasks = Task.objects.bulk_create([Task(project=self.project, title=f'Backlog {i}') for i in range(40)])
+        # More rows than fit on a page share one timestamp; they must come back together.
+        Task.objects.filter(pk__in=[task.pk for task in tasks[5:12]]).update(updated_at=tasks[5].updated_at)
+        deleted_id = tasks[-1].pk
+        tasks[-1].delete()
+
+        seen, deleted, pages = [], [], 0
+        with self.settings(SYNC_PAGE_SIZE=6, SYNC_CURSOR_OVERLAP=0):
+            while True:
+                page = self.sync(cursor)
+                pages += 1
+                self.assertLessEqual(len(page['tasks']) + len(page['projects']) + len(page['deleted']), 7)
+                seen += [task['id'] for task in page['tasks']]
+                deleted += [tombstone['id'] for tombstone in page['deleted']]
+                self.assertGreater(int(page['cursor']), int(cursor))
+                cursor = page['cursor']
+                if not page['has_more']:
+                    break
+        self.assertGreater(pages, 5)
+        self.assertEqual(sorted(seen), sorted(task.pk for task in tasks[:-1]))
+        self.assertEqual(deleted, [deleted_id])
+
+    def test_rejects_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get(reverse('sync'), {'cursor': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('sync'), {'cursor': '1'}).status_code, 410)
+
+    def test_prune_tombstones(self):
+        self.tasks[0].delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class AsyncReadViewTests(ProjectAPITestCase):
+    """The async read views must answer exactly as the DRF views they stand in for."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'password')
+        other = Project.objects.create(name='Other', owner=cls.user)
+        ProjectMembership.objects.create(user=cls.user, project=other, role='owner')
+        cls.tasks = [
+            Task.objects.create(project=cls.project, title=f'Task {i}', priority=priority, assignee=cls.user if i % 2 else None)
+            for i, priority in enumerate(['low', 'high', 'medium', 'high', 'low'])
+        ]
+        for i in range(3):
+            Comment.objects.create(task=cls.tasks[0], commenter=cls.user, comment=f'Comment {i}')
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        super().setUp()
+
+    def login(self, user):
+        super().login(user)
+        self.factory.cookies['jwt'] = generate_jwt(user)
+
+    async def assertSameResponse(self, view, url, headers=None, **kwargs):
+        expected = await sync_to_async(self.client.get)(url, headers=headers)
+        response = await view.as_view()(self.factory.get(url, headers=headers), **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    async def test_me_and_profile(self):
+        await self.assertSameResponse(AsyncMeView, reverse('me'))
+        await self.assertSameResponse(AsyncProfileView, reverse('profile', args=['owner']), username='owner')
+        await self.assertSameResponse(AsyncProfileView, reverse('profile', args=['nobody']), username='nobody')
+
+    async def test_project_list(self):
+        url = reverse('project_list_create')
+        await self.assertSameResponse(AsyncProjectListView, url)
+        await self.assertSameResponse(AsyncProjectListView, url + '?page_size=1')
+
+    async def test_task_list(self):
+        url = reverse('task_list_create', args=[self.project.id])
+        kwargs = {'project_id': self.project.id}
+        for query in ['', '?page_size=2', '?ordering=-priority&page_size=2', '?assignee=me', '?status=bogus']:
+            await self.assertSameResponse(AsyncTaskListView, url + query, **kwargs)
+
+    async def test_comment_list(self):
+        url = reverse('comment', args=[self.project.id, self.tasks[0].id])
+        await self.assertSameResponse(AsyncCommentListView, url, project_id=self.project.id, task_id=self.tasks[0].id)
+        url = reverse('comment', args=[self.project.id, 0])
+        await self.assertSameResponse(AsyncCommentListView, url, project_id=self.project.id, task_id=0)
+
+    async def test_permissions(self):
+        url = reverse('task_list_create', args=[self.project.id])
+        self.login(self.outsider)
+        response = await self.assertSameResponse(AsyncTaskListView, url, project_id=self.project.id)
+        self.assertEqual(response.status_code, 403)
+
+        del self.client.cookies['jwt']
+        del self.factory.cookies['jwt']
+        response = await self.assertSameResponse(AsyncMeView, reverse('me'))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_conditional_get(self):
+        url = reverse('task_list_create', args=[self.project.id])
+        etag = (await sync_to_async(self.client.get)(url))['ETag']
+        response = await self.assertSameResponse(
+            AsyncTaskListView, url, headers={'If-None-Match': etag}, project_id=self.project.id)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_writes_fall_through_to_sync_view(self):
+        request = self.factory.post(
+            reverse('task_list_create', args=[self.project.id]), {'title': 'New'}, content_type='application/json')
+        response = await AsyncTaskListView.as_view()(request, project_id=self.project.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Task.objects.filter(title='New').aexists())
+
+
+class BenchmarkToolingTests(TestCase):
+    """The dataset generator and endpoint benchmark must keep working as the API grows."""
+
+    def test_generated_dataset_is_consistent(self):
+        call_command('generate_dataset', users=20, projects=6, tasks_per_project=8, comments_per_task=2,
+                     batch_size=4, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Project.objects.count(), 6)
+        self.assertEqual(Project.objects.filter(projectmembership__role='owner').count(), 6)
+
+        out = StringIO()
+        call_command('repair_counters', stdout=out)
+        self.assertIn('Projects repaired: 0', out.getvalue())
+        self.assertIn('Tasks repaired: 0', out.getvalue())
+
+    def test_benchmark_report(self):
+        call_command('generate_dataset', users=10, projects=3, tasks_per_project=5, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_endpoints', requests=2, warmup=0, only=['task', 'comment'], json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        endpoints = {(row['endpoint'], row['method']) for row in report['results']}
+        self.assertIn(('task_list_create', 'GET'), endpoints)
+        self.assertIn(('task_detail', 'DELETE'), endpoints)
+        self.assertIn(('task_move', 'POST'), endpoints)
+        out = StringIO()
+        call_command('benchmark_endpoints', requests=2, warmup=0, only=['project_export', 'project_import'], json=True, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual([(row['endpoint'], row['status']) for row in results],
+                         [('project_export', [200]), ('project_export', [200]), ('project_import', [201])])
+        self.assertTrue(all(row['bytes'] for row in results))
+        for row in report['results']:
+            self.assertTrue(all(200 <= code < 300 for code in row['status']), row)
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        # Writes were rolled back.
+        self.assertEqual(Task.objects.filter(title__startswith='Benchmark').count(), 0)
+
+    def test_serializer_benchmark(self):
+        call_command('generate_dataset', users=10, projects=3, tasks_per_project=5, comments_per_task=3, stdout=StringIO())
+        out = StringIO()
+        # Fails if the fast path's bytes differ from the DRF path's.
+        call_command('benchmark_serializers', repeat=1, json=True, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual([row['endpoint'] for row in results], ['task_list', 'comment_list'])
+
+
+class RequestProfilingTests(ProjectAPITestCase):
+    """Opt-in profiling adds Server-Timing headers and logs slow requests with their query shapes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Task.objects.create(project=cls.project, title='Task')
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('task_list_create', args=[self.project.id])
+
+    def get(self):
+        return self.client.get(self.url)
+
+    def test_off_by_default(self):
+        self.assertNotIn('Server-Timing', self.get())
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_server_timing_header(self):
+        timing = self.get()['Server-Timing']
+        names = [entry.split(';')[0] for entry in timing.split(', ')]
+        self.assertEqual(names, ['total', 'auth', 'serialize', 'render', 'db'])
+        self.assertIn('desc="4 queries"', timing)
+
+    @override_settings(REQUEST_PROFILING=True)
+    async def test_server_timing_header_under_asgi(self):
+        # The ORM runs on another thread than the middleware here; its queries must still count.
+        response = await self.async_client.get(self.url)
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_runs_natively_in_async_stack(self):
+        async def view(request):
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_view))
+        self.assertFalse(iscoroutinefunction(RequestProfilingMiddleware(lambda request: HttpResponse())))
+
+    @override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SLOW_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('projects.slow_requests', 'WARNING') as logs:
+            self.get()
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'task_list_create')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['queries'], 4)
+        self.assertEqual(sum(group['count'] for group in entry['fingerprints']), 4)
+        self.assertEqual(entry['repeated'], [])
+
+    @override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SLOW_MS=0, REQUEST_PROFILING_REPEAT_THRESHOLD=3)
+    def test_repeated_queries_are_flagged(self):
+        def n_plus_one(request):
+            for task in Task.objects.all():
+                Project.objects.get(pk=task.project_id)
+            for _ in range(3):
+                User.objects.get(pk=self.user.pk)
+            return HttpResponse()
+
+        with self.assertLogs('projects.slow_requests', 'WARNING') as logs:
+            RequestProfilingMiddleware(n_plus_one)(RequestFactory().get('/'))
+        repeated = json.loads(logs.records[0].getMessage())['repeated']
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 3)
+
+    def test_fingerprint_ignores_in_list_length(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT 1  FROM t\nWHERE id IN (%s)'),
+        )
+
+
+class MetricsTests(ProjectAPITestCase):
+    """Requests, auth failures and logins are counted per thread and merged, across processes too."""
+
+    def setUp(self):
+        super().setUp()
+        reset_throttles()
+
+    def value(self, metric, **labels):
+        return metrics.registry.snapshot().get(metric.key(labels), 0)
+
+    def test_request_is_counted_by_url_name(self):
+        labels = {'view': 'task_list_create', 'method': 'GET', 'status': 200}
+        before = self.value(metrics.REQUESTS, **labels)
+        queries_before = self.value(metrics.DB_QUERIES, view='task_list_create')
+        self.client.get(reverse('task_list_create', args=[self.project.id]))
+
+        self.assertEqual(self.value(metrics.REQUESTS, **labels), before + 1)
+        self.assertEqual(self.value(metrics.DB_QUERIES, view='task_list_create'), queries_before + 4)
+        self.assertGreater(self.value(metrics.REQUEST_DURATION, view='task_list_create')[-1], 0)
+
+    def test_auth_failures_and_logins(self):
+        failures = self.value(metrics.AUTH_FAILURES, reason='Invalid or expired token')
+        client = Client()
+        client.cookies['jwt'] = 'not-a-token'
+        client.get(reverse('me'))
+        self.assertEqual(self.value(metrics.AUTH_FAILURES, reason='Invalid or expired token'), failures + 1)
+
+        outcomes = ['success', 'failure']
+        before = [self.value(metrics.LOGIN_ATTEMPTS, outcome=outcome) for outcome in outcomes]
+        for email, password in [('owner@example.com', 'password'), ('owner@example.com', 'wrong'), ('nobody@example.com', 'x')]:
+            Client().post(reverse('login'), {'email': email, 'password': password}, content_type='application/json')
+        after = [self.value(metrics.LOGIN_ATTEMPTS, outcome=outcome) for outcome in outcomes]
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 2])
+
+    def test_exited_threads_are_kept(self):
+        registry = metrics.Registry()
+        counter = registry.counter('jobs_total', 'Jobs.', ('kind',))
+        threads = [threading.Thread(target=counter.inc, kwargs={'kind': 'a'}) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        counter.inc(2, kind='a')
+        self.assertEqual(registry.snapshot(), {('jobs_total', ('a',)): 7})
+
+    def test_exposition_format(self):
+        registry = metrics.Registry()
+        registry.counter('jobs_total', 'Jobs.', ('kind',)).inc(kind='say "hi"')
+        registry.histogram('job_seconds', 'Job time.', buckets=(0.1, 1.0)).observe(0.5)
+        self.assertEqual(registry.exposition(), '\n'.join([
+            '# HELP jobs_total Jobs.',
+            '# TYPE jobs_total counter',
+            'jobs_total{kind="say \\"hi\\""} 1',
+            '# HELP job_seconds Job time.',
+            '# TYPE job_seconds histogram',
+            'job_seconds_bucket{le="0.1"} 0',
+            'job_seconds_bucket{le="1.0"} 1',
+            'job_seconds_bucket{le="+Inf"} 1',
+            'job_seconds_sum 0.5',
+            'job_seconds_count 1',
+        ]) + '\n')
+
+    def test_multiprocess_directory(self):
+        # Two registries stand in for two worker processes sharing METRICS_DIR.
+        workers = [metrics.Registry(), metrics.Registry()]
+        counters = [worker.counter('jobs_total', 'Jobs.') for worker in workers]
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            counters[0].inc(3)
+            workers[0].flush()
+            counters[1].inc(4)
+            workers[1].flush()
+            counters[1].inc(1)
+            self.assertEqual(workers[1].collect(), {('jobs_total', ()): 8})
+            self.assertEqual(workers[0].collect(), {('jobs_total', ()): 7})
+
+    def test_endpoint(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE http_requests_total counter', response.content)
+
+    def test_endpoint_needs_token(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(Client().get('/metrics').status_code, 401)
+            self.assertEqual(Client().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+
+        # Without a token it is only served while debugging.
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(Client().get('/metrics').status_code, 404)
+            with self.settings(DEBUG=True):
+                self.assertEqual(Client().get('/metrics').status_code, 200)
+
+
+class ResponseCacheTests(ProjectAPITestCase):
+    """Cached list responses are per user and invalidated by every write that changes them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'password')
+        ProjectMembership.objects.create(user=cls.member, project=cls.project, role='member')
+        cls.task = Task.objects.create(project=cls.project, title='Task')
+
+    def setUp(self):
+        super().setUp()
+        self.task_url = reverse('task_list_create', args=[self.project.id])
+
+    def test_hit_runs_no_queries(self):
+        client = self.client_for(self.user)
+        first = client.get(self.task_url)
+        with self.assertNumQueries(0):
+            second = client.get(self.task_url)
+        self.assertEqual(second.content, first.content)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(self.task_url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        client.get(reverse('project_list_create'))
+        with self.assertNumQueries(0):
+            client.get(reverse('project_list_create'))
+
+    def test_task_and_comment_writes_invalidate(self):
+        client = self.client_for(self.user)
+        client.get(self.task_url)
+        self.task.title = 'Renamed'
+        self.task.save()
+        self.assertEqual(client.get(self.task_url).json()[0]['title'], 'Renamed')
+
+        Comment.objects.create(task=self.task, commenter=self.user, comment='Hi')
+        self.assertEqual(client.get(self.task_url).json()[0]['comment_count'], 1)
+
+        client.post(reverse('task_bulk', args=[self.project.id]), {'delete': [self.task.id]}, content_type='application/json')
+        self.assertEqual(client.get(self.task_url).json(), [])
+
+    def test_membership_changes_invalidate_each_affected_user(self):
+        owner, member, outsider = (self.client_for(user) for user in (self.user, self.member, self.outsider))
+        projects_url = reverse('project_list_create')
+        self.assertEqual(outsider.get(projects_url).json(), [])
+        self.assertEqual(len(owner.get(projects_url).json()[0]['members']), 2)
+        self.assertEqual(len(member.get(projects_url).json()), 1)
+
+        ProjectMembership.objects.create(user=self.outsider, project=self.project, role='member')
+        self.assertEqual(len(outsider.get(projects_url).json()), 1)
+        self.assertEqual(len(owner.get(projects_url).json()[0]['members']), 3)
+
+        ProjectMembership.objects.filter(user=self.member).delete()
+        self.assertEqual(member.get(projects_url).json(), [])
+        self.assertEqual(member.get(self.task_url).status_code, 403)
+
+    def test_renames_invalidate_payloads_that_embed_them(self):
+        client = self.client_for(self.user)
+        Task.objects.filter(pk=self.task.pk).update(assignee=self.member)
+        Comment.objects.create(task=self.task, commenter=self.member, comment='Hi')
+        comment_url = reverse('comment', args=[self.project.id, self.task.id])
+
+        def fetch(url):
+            response = client.get(url)
+            data = response.json()
+            return (data['results'] if 'results' in data else data)[0], response['ETag']
+
+        def assert_changed(url, etag, field, value):
+            item, new_etag = fetch(url)
+            self.assertEqual(field(item), value)
+            self.assertNotEqual(new_etag, etag)
+
+        tasks, comments = fetch(self.task_url)[1], fetch(comment_url)[1]
+        self.member.first_name = 'Renamed'
+        self.member.save()
+        assert_changed(self.task_url, tasks, lambda task: task['assignee']['first_name'], 'Renamed')
+        assert_changed(comment_url, comments, lambda comment: comment['commenter']['first_name'], 'Renamed')
+
+        tasks = fetch(self.task_url)[1]
+        self.project.name = 'New name'
+        self.project.save()
+        assert_changed(self.task_url, tasks, lambda task: task['project_name'], 'New name')
+
+        comments = fetch(comment_url)[1]
+        self.task.title = 'New title'
+        self.task.save()
+        assert_changed(comment_url, comments, lambda comment: comment['task_title'], 'New title')
+
+
+class FastSerializationTests(ProjectAPITestCase):
+    """Row serializers and the orjson renderer must produce the same bytes as the DRF path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        User.objects.filter(pk=cls.user.pk).update(first_name='Zoë')
+        Project.objects.filter(pk=cls.project.pk).update(name='Projet \u2028 été')
+        cls.tasks = [
+            Task.objects.create(project=cls.project, title='Plain'),
+            Task.objects.create(project=cls.project, title='Assigned \u2029', assignee=cls.user, priority='high',
+                                due_date=timezone.localdate(), description='Über'),
+        ]
+        Comment.objects.create(task=cls.tasks[1], commenter=cls.user, comment='Hi ✓')
+
+    def assertSameBytes(self, queryset, serializer_class, row_serializer_class):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = row_serializer_class().serialize(row_serializer_class().values(queryset))
+        self.assertEqual(FastJSONRenderer().render(rows), expected)
+
+    def test_row_serializers_match_model_serializers(self):
+        tasks = Task.objects.filter(project=self.project).select_related('project', 'assignee').order_by('id')
+        self.assertSameBytes(tasks, TaskSerializer, TaskRowSerializer)
+        comments = Comment.objects.filter(task__project=self.project).select_related('commenter', 'task')
+        self.assertSameBytes(comments, CommentSerializer, CommentRowSerializer)
+        with timezone.override('UTC'):
+            self.assertSameBytes(tasks, TaskSerializer, TaskRowSerializer)
+
+    def test_renderer_matches_drf(self):
+        data = {
+            'id': uuid.uuid4(), 'when': timezone.now(), 'day': timezone.localdate(), 'amount': Decimal('1.50'),
+            1: 'int key', 'text': 'line\u2028separator ünïcode', 'nested': [{'a': None}, (1, 2.5, True)],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+
+    def test_paginated_row_list(self):
+        url = reverse('task_list_create', args=[self.project.id]) + '?ordering=-priority&page_size=1'
+        first = self.client.get(url).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([first['results'][0]['title'], second['results'][0]['title']], ['Assigned \u2029', 'Plain'])
+        self.assertIsNone(second['next'])
+
+
+class ProjectTransferTests(ProjectAPITestCase):
+    """Exports stream in batches and import into an equivalent project; a bad record keeps nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Project.objects.filter(pk=cls.project.pk).update(description='Moving out')
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.importer = User.objects.create_user('importer', 'importer@example.com', 'password')
+        ProjectMembership.objects.create(user=cls.member, project=cls.project, role='member')
+        for i in range(3):
+            task = Task.objects.create(project=cls.project, title=f'Task {i}', status=['todo', 'done', 'done'][i],
+                                       assignee=cls.member if i else None, due_date=timezone.localdate() if i else None)
+            for j in range(i):
+                Comment.objects.create(task=task, commenter=cls.user if j else cls.member, comment=f'Comment {j}, "quoted"\nline')
+
+    def export(self, file_format='ndjson'):
+        response = self.client.get(reverse('project_export', args=[self.project.id]), {'as': file_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def import_(self, body, content_type='application/x-ndjson'):
+        return self.client_for(self.importer).post(reverse('project_import'), body, content_type=content_type)
+
+    def snapshot(self, project):
+        tasks = Task.objects.filter(project=project).order_by('created_at')
+        return {
+            'project': Project.objects.filter(pk=project.pk).values('name', 'description', 'todo_count', 'done_count').get(),
+            'tasks': list(tasks.values_list('title', 'status', 'assignee__username', 'due_date', 'created_at',
+                                            'comment_count', 'last_comment_at')),
+            'comments': list(Comment.objects.filter(task__project=project).order_by('posted_at').values_list(
+                'task__title', 'commenter__username', 'comment', 'posted_at')),
+        }
+
+    def test_round_trip(self):
+        expected = self.snapshot(self.project)
+        for file_format, content_type in [('ndjson', 'application/x-ndjson'), ('csv', 'text/csv')]:
+            with self.settings(PROJECT_TRANSFER_BATCH_SIZE=2):
+                response = self.import_(self.export(file_format), content_type)
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.json()['tasks'], 3)
+            self.assertEqual(response.json()['comments'], 3)
+            copy = Project.objects.get(pk=response.json()['id'])
+            self.assertEqual(self.snapshot(copy), expected)
+            self.assertEqual(dict(copy.projectmembership_set.values_list('user__username', 'role')),
+                             {'importer': 'owner', 'owner': 'admin', 'member': 'member'})
+
+        records = [json.loads(line) for line in self.export().decode().splitlines()]
+        self.assertEqual([record['type'] for record in records], ['project'] + ['member'] * 2 + ['task'] * 3 + ['comment'] * 3)
+
+    def test_invalid_record_keeps_nothing(self):
+        lines = self.export().decode().splitlines()
+        lines[-1] = lines[-1].replace('"commenter":"owner"', '"commenter":"stranger"')
+        projects = Project.objects.count()
+        with self.settings(PROJECT_TRANSFER_BATCH_SIZE=2):
+            response = self.import_('\n'.join(lines))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'line': len(lines), 'errors': {'commenter': ['No user named stranger.']}}])
+        self.assertEqual(Project.objects.count(), projects)
+        # The batches written before the bad record are left to the purge.
+        partial = Project.all_objects.get(deleted_at__isnull=False)
+        self.assertTrue(Task.objects.filter(project=partial).exists())
+        purge_project(partial.pk, 100)
+        self.assertEqual(Project.all_objects.count(), projects)
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_usernames_are_resolved_per_batch(self):
+        body = self.export()
+        with CaptureQueriesContext(connection) as small, self.settings(PROJECT_TRANSFER_BATCH_SIZE=2):
+            self.import_(body)
+        with CaptureQueriesContext(connection) as large, self.settings(PROJECT_TRANSFER_BATCH_SIZE=100):
+            self.import_(body)
+        self.assertLess(len(large), len(small))
+
+    async def test_export_streams_batches_under_asgi(self):
+        expected = await sync_to_async(self.export)()
+        with self.settings(PROJECT_TRANSFER_BATCH_SIZE=2):
+            response = await self.async_client.get(reverse('project_export', args=[self.project.id]))
+            # An async iterator, so Django sends each batch instead of listing them all first.
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(b''.join(chunks), expected)
+
+    def test_export_needs_membership_and_import_command(self):
+        response = self.client_for(self.importer).get(reverse('project_export', args=[self.project.id]))
+        self.assertEqual(response.status_code, 403)
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as f:
+            f.write(self.export('csv'))
+            f.flush()
+            out = StringIO()
+            call_command('import_project', f.name, owner='importer', stdout=out)
+        self.assertIn('2 members, 3 tasks, 3 comments', out.getvalue())
+
+
+class ProjectDeletionTests(ProjectAPITestCase):
+    """A deleted project vanishes at once at constant cost; its rows are purged later in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.other = Project.objects.create(name='Kept', owner=cls.user)
+        ProjectMembership.objects.create(user=cls.user, project=cls.other, role='owner')
+        for project in (cls.project, cls.other):
+            ProjectMembership.objects.create(user=cls.member, project=project)
+            for i in range(3):
+                task = Task.objects.create(project=project, title=f'{project.name} findme {i}', assignee=cls.member)
+                Comment.objects.create(task=task, commenter=cls.user, comment='Comment')
+
+    def setUp(self):
+        super().setUp()
+        self.login(self.member)
+
+    def delete_project(self):
+        self.login(self.user)
+        with self.settings(SYNC_CURSOR_OVERLAP=0):
+            cursor = self.client.get(reverse('sync')).json()['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.delete(reverse('project_detail', args=[self.project.id])).status_code, 204)
+        return cursor, len(queries)
+
+    def test_delete_hides_project_at_once(self):
+        self.client.get(reverse('task_list_create', args=[self.project.id]))  # warm the role and response caches
+        cursor, _ = self.delete_project()
+        self.login(self.member)
+
+        self.assertEqual([p['name'] for p in self.client.get(reverse('project_list_create')).json()], ['Kept'])
+        self.assertEqual(self.client.get(reverse('project_detail', args=[self.project.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('task_list_create', args=[self.project.id])).status_code, 404)
+        self.assertEqual({t['project'] for t in self.client.get(reverse('my_tasks')).json()['results']}, {str(self.other.id)})
+        hits = self.client.get(reverse('search'), {'q': 'findme'}).json()['results']
+        self.assertTrue(hits and all(hit['snippet'].startswith('Kept') for hit in hits if hit['type'] == 'task'))
+        delta = self.client.get(reverse('sync'), {'cursor': cursor}).json()
+        self.assertEqual(delta['projects'], [])
+        self.assertIn({'type': 'membership', 'id': self.member.pk, 'project_id': str(self.project.id)}, delta['deleted'])
+        # Nothing was deleted yet.
+        self.assertEqual(Task.objects.filter(project_id=self.project.id).count(), 3)
+
+    def test_delete_cost_does_not_grow_with_tasks(self):
+        _, small = self.delete_project()
+        Project.all_objects.filter(pk=self.project.pk).update(deleted_at=None)
+        Task.objects.bulk_create([Task(project=self.project, title=f'Task {i}') for i in range(50)])
+        _, large = self.delete_project()
+        self.assertEqual(large, small)
+
+    def test_purge_in_batches(self):
+        self.delete_project()
+        progress = []
+        deleted = purge_project(self.project.id, 2, lambda project_id, table, count: progress.append((table, count)))
+        self.assertEqual(deleted, {'comments': 3, 'tasks': 3, 'memberships': 2})
+        self.assertEqual(progress, [('comments', 2), ('comments', 3), ('tasks', 2), ('tasks', 3), ('memberships', 2)])
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertEqual(Task.objects.filter(project=self.other).count(), 3)
+        self.assertEqual(Comment.objects.filter(task__project=self.other).count(), 3)
+        # Tombstones stay for delta sync.
+        self.assertTrue(Tombstone.objects.filter(project_id=self.project.id, kind='membership').exists())
+
+    def test_purge_command_and_task_delete(self):
+        self.delete_project()
+        out = StringIO()
+        call_command('purge_deleted_projects', batch_size=2, stdout=out)
+        self.assertIn('Projects purged: 1', out.getvalue())
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+
+        task = Task.objects.filter(project=self.other).first()
+        Comment.objects.bulk_create([Comment(task=task, commenter=self.user, comment='More') for _ in range(5)])
+        with self.settings(PROJECT_PURGE_BATCH_SIZE=2):
+            response = self.client.delete(reverse('task_detail', args=[self.other.id, task.id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Comment.objects.filter(task_id=task.id).exists())
+        self.assertEqual(Project.objects.get(pk=self.other.pk).todo_count, 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PIN_SECONDS=60)
+class ReplicaRoutingTests(ProjectAPITestCase):
+    """Reads from a replica in a second SQLite file that never catches up unless told to."""
+
+    @classmethod
+    def setUpClass(cls):
+        # A copy of the empty test database's schema, registered as an extra alias.
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.replica_dir.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as target:
+            connection.connection.backup(target)
+        target.close()
+        connections.settings['replica'] = {**connection.settings_dict, 'NAME': path}
+        # Added here rather than on the class, which the runner checks before the alias exists.
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = User.objects.create_user(username='reader', email='reader@example.com', password='x')
+        memberships = [
+            ProjectMembership.objects.get(user=cls.user, project=cls.project),
+            ProjectMembership.objects.create(user=cls.reader, project=cls.project, role='member'),
+        ]
+        cls.task = Task.objects.create(project=cls.project, title='Fresh')
+        # The replica has the same rows, but an older title for the task.
+        for obj in [cls.user, cls.reader, cls.project, *memberships, cls.task]:
+            replica_copy = copy.copy(obj)
+            if isinstance(obj, Task):
+                replica_copy.title = 'Stale'
+            type(obj)._base_manager.using('replica').bulk_create([replica_copy])
+
+    def setUp(self):
+        super().setUp()
+        self.tasks_url = reverse('task_list_create', args=[self.project.id])
+
+    def titles(self, client=None):
+        return [task['title'] for task in (client or self.client).get(self.tasks_url).json()]
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.titles(), ['Stale'])
+        detail = self.client.get(reverse('task_detail', args=[self.project.id, self.task.id]))
+        self.assertEqual(detail.json()['title'], 'Stale')
+        self.assertNotIn('db_pin', detail.cookies)
+        # Views that do not opt in read from the primary.
+        export = self.client.get(reverse('project_export', args=[self.project.id]))
+        self.assertIn('Fresh', b''.join(export.streaming_content).decode())
+
+    def test_writer_reads_its_own_writes(self):
+        response = self.client.patch(
+            reverse('task_detail', args=[self.project.id, self.task.id]), {'title': 'Edited'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db_pin', response.cookies)
+        self.assertEqual(self.titles(), ['Edited'])
+
+        # Other clients keep reading from the replica, and do not cache what it returned during the pin window.
+        reader = self.client_for(self.reader)
+        self.assertEqual(self.titles(reader), ['Stale'])
+        Task.objects.using('replica').filter(pk=self.task.pk).update(title='Edited')
+        self.assertEqual(self.titles(reader), ['Edited'])
+
+    async def test_routes_under_asgi(self):
+        response = await self.async_client.get(self.tasks_url)
+        self.assertEqual([task['title'] for task in response.json()], ['Stale'])
+        response = await self.async_client.patch(
+            reverse('task_detail', args=[self.project.id, self.task.id]), {'title': 'Edited'}, content_type='application/json')
+        self.assertIn('db_pin', response.cookies)
+
+    def test_pin_expires(self):
+        self.client.cookies['db_pin'] = str(int(timezone.now().timestamp()) - 1)
+        self.assertEqual(self.titles(), ['Stale'])
+        # A real pin follows a write, which bumps the cache versions.
+        cache.clear()
+        self.client.cookies['db_pin'] = str(int(timezone.now().timestamp()) + 60)
+        self.assertEqual(self.titles(), ['Fresh'])
+
+
+@override_settings(TASK_RANK_REBALANCE_IN_PROCESS=False)
+class TaskRankTests(ProjectAPITestCase):
+    """Board order: new tasks go last, a move writes one row, and long ranks are respaced."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        tasks = [Task(project=cls.project, title=f'Task {i}') for i in range(200)]
+        Task.append_ranks(tasks)
+        cls.tasks = Task.objects.bulk_create(tasks)
+        Project.adjust_task_counts(cls.project.pk, {'todo': len(tasks)})
+
+    def column(self, status='todo'):
+        response = self.client.get(reverse('task_list_create', args=[self.project.id]), {'status': status, 'ordering': 'rank'})
+        return [task['id'] for task in response.json()]
+
+    def move(self, task, **body):
+        return self.client.post(reverse('task_move', args=[self.project.id, task.id]), body, content_type='application/json')
+
+    def test_ranks_stay_ordered_and_short(self):
+        ranks = [rank_between(None, None)]
+        for _ in range(1000):
+            ranks.append(rank_between(ranks[-1], None))
+        ranks.insert(0, rank_between(None, ranks[0]))
+        self.assertEqual(ranks, sorted(set(ranks)))
+        self.assertLessEqual(max(map(len, ranks)), 6)
+        # Repeated moves into one gap: a digit every few moves.
+        low, high = ranks[0], ranks[1]
+        for _ in range(20):
+            high = rank_between(low, high)
+            self.assertTrue(low < high < ranks[1])
+        self.assertLessEqual(len(high), 12)
+        self.assertEqual(spread_ranks(3), sorted(spread_ranks(3)))
+        with self.assertRaises(ValueError):
+            rank_between('b', 'a')
+
+    def test_move_writes_one_row(self):
+        first, second, last = self.tasks[0], self.tasks[1], self.tasks[-1]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(last, after=first.id, before=second.id)
+        self.assertEqual(response.status_code, 200)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('"projects_task"', writes[0])
+        self.assertEqual(self.column()[:3], [first.id, last.id, second.id])
+
+        # To the top, and with no neighbours to the end.
+        self.move(second, before=first.id)
+        self.move(first)
+        self.assertEqual(self.column()[:2], [second.id, last.id])
+        self.assertEqual(self.column()[-1], first.id)
+
+    def test_move_with_one_neighbour_into_the_middle(self):
+        a, b, c, d = self.tasks[:4]
+        self.assertEqual(self.move(c, after=a.id).status_code, 200)
+        self.assertEqual(self.column()[:4], [a.id, c.id, b.id, d.id])
+        self.assertEqual(self.move(a, before=d.id).status_code, 200)
+        self.assertEqual(self.column()[:4], [c.id, b.id, a.id, d.id])
+        ranks = list(Task.objects.filter(project=self.project).values_list('rank', flat=True))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_move_across_columns_and_conflicts(self):
+        done = Task.objects.create(project=self.project, title='Done', status='done')
+        response = self.move(self.tasks[5], status='done', after=done.id)
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertEqual(self.column('done'), [done.id, self.tasks[5].id])
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.todo_count, project.done_count), (199, 2))
+
+        # Created and re-statused tasks go last.
+        created = self.client.post(reverse('task_list_create', args=[self.project.id]), {'title': 'New'}).json()
+        self.assertEqual(self.column()[-1], created['id'])
+        self.client.patch(reverse('task_detail', args=[self.project.id, done.id]), {'status': 'todo'}, content_type='application/json')
+        self.assertEqual(self.column()[-1], done.id)
+
+        # Neighbours out of order, in another column or the task itself.
+        self.assertEqual(self.move(self.tasks[9], after=self.tasks[2].id, before=self.tasks[1].id).status_code, 409)
+        self.assertEqual(self.move(self.tasks[9], after=self.tasks[5].id).status_code, 400)
+        self.assertEqual(self.move(self.tasks[9], before=self.tasks[9].id).status_code, 400)
+
+    def test_rebalance_long_and_equal_ranks(self):
+        first, second = self.tasks[0], self.tasks[1]
+        for task in self.tasks[2:40]:
+            self.move(task, after=first.id, before=second.id)
+            second = task
+        Task.objects.filter(pk=self.tasks[-1].pk).update(rank=Task.objects.get(pk=self.tasks[-2].pk).rank)
+        before = self.column()
+        self.assertGreater(max(len(rank) for rank in Task.objects.values_list('rank', flat=True)), 6)
+        # Equal neighbours cannot have a task put between them.
+        self.assertEqual(self.move(self.tasks[50], after=self.tasks[-2].id, before=self.tasks[-1].id).status_code, 409)
+
+        out = StringIO()
+        call_command('rebalance_task_ranks', max_length=6, stdout=out)
+        self.assertIn('Columns rebalanced: 1', out.getvalue())
+        cache.clear()
+        self.assertEqual(self.column(), before)
+        ranks = list(Task.objects.order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(len(set(ranks)), len(ranks))
+        self.assertLessEqual(max(map(len, ranks)), 6)
@@ -0,0 +1,167 @@
+"""
+Login and signup throttling, per client IP and per email address.
+
+Both views hash a password, which is deliberately slow, so a credential
+stuffing burst could otherwise occupy every worker. The throttles run in
+``APIView.initial()``, before the view touches the database or the hasher,
+per address first and stopping at the first rejection.
+
+By default each worker keeps token buckets in process memory: a burst of
+up to the rate's request count is allowed, refilled continuously over its
+period. With LOGIN_THROTTLE_CACHE naming a cache alias, workers share
+sliding-window counters in that cache instead, since a bucket's read,
+refill and write cannot be done atomically there but ``incr`` can.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalBucketStore:
+    """Token buckets as ``key -> (tokens, updated_at)``, least recently used evicted first."""
+    # Buckets never leave the process, so a clock that cannot jump will do.
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now):
+        """Take a token; return 0 if one was available, else seconds until one will be."""
+        rate = capacity / period
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheWindowStore:
+    """
+    Sliding-window counters in a shared cache: this period's count plus the
+    previous period's, weighted by how much of it still overlaps the window.
+    """
+    # Window numbers are shared across processes and hosts, whose monotonic
+    # clocks each count from their own boot.
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def consume(self, key, capacity, period, now):
+        cache = caches[self.alias]
+        window, offset = divmod(now, period)
+        current_key = f'throttle:{key}:{int(window)}'
+        cache.add(current_key, 0, period * 2)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr(); start the window again.
+            cache.set(current_key, 1, period * 2)
+            count = 1
+        previous = cache.get(f'throttle:{key}:{int(window) - 1}', 0)
+        weight = 1 - offset / period
+        if previous * weight + count <= capacity:
+            return 0.0
+
+        # Rejected attempts do not count, so they cannot extend the lockout.
+        cache.decr(current_key)
+        count -= 1
+        if count >= capacity or not previous:
+            return period - offset
+        # Wait until enough of the previous window has slid out to admit one more.
+        return max(period * (1 - (capacity - count - 1) / previous) - offset, 1.0)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            alias = settings.LOGIN_THROTTLE_CACHE
+            _store = CacheWindowStore(alias) if alias else LocalBucketStore(settings.LOGIN_THROTTLE_CACHE_SIZE)
+        return _store
+
+def reset_throttles():
+    """Forget every bucket or counter, and re-read the store settings."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.clear()
+        _store = None
+
+
+class StoreRateThrottle(SimpleRateThrottle):
+    """A SimpleRateThrottle that counts in ``get_store()`` rather than request histories."""
+
+    def __init__(self):
+        # Read at use, not import, so changes to REST_FRAMEWORK apply.
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        super().__init__()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        store = get_store()
+        self.wait_seconds = store.consume(key, self.num_requests, self.duration, store.clock())
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class FirstRejectionMixin:
+    """
+    Check ``throttle_classes`` in order and stop at the first that rejects.
+    DRF asks every throttle, so a request the IP throttle turned away would
+    still spend one of the email's tokens, and one address could lock an
+    account out of logins from anywhere else.
+    """
+
+    def check_throttles(self, request):
+        for throttle in self.get_throttles():
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+
+
+class LoginIPThrottle(StoreRateThrottle):
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:{self.get_ident(request)}'
+
+
+class LoginEmailThrottle(StoreRateThrottle):
+    """Throttle attempts per account, however many addresses they come from."""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return f'{self.scope}:{email.strip().lower()}'
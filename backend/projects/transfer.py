@@ -0,0 +1,293 @@
+"""
+Whole-project export and import, as NDJSON or CSV.
+
+An export is a flat stream of records: the project, then its members,
+tasks and comments, each tagged with a ``type``. NDJSON has one JSON
+object per line; CSV has one row per record under ``CSV_FIELDS``, with
+empty cells for fields the record type does not use. Both directions read
+and write in batches of PROJECT_TRANSFER_BATCH_SIZE records, so memory does
+not grow with the project (on import, apart from a map of task ids).
+
+Tasks and comments refer to users by username, and comments to tasks by
+the exporter's task id, so an export can be imported into another
+deployment that has the same usernames.
+"""
+import csv
+import json
+from collections import Counter
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+from rest_framework import serializers as drf_serializers
+
+from .deletion import mark_project_deleted
+from .models import Comment, Project, ProjectMembership, Task
+from .response_cache import bump, project_version_key, user_version_key
+from .serializers import ImportCommentSerializer, ImportMemberSerializer, ImportProjectSerializer, ImportTaskSerializer
+
+FORMAT_VERSION = 1
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_FIELDS = [
+    'type', 'version', 'id', 'name', 'description', 'username', 'role', 'title', 'status', 'priority',
+    'assignee', 'due_date', 'created_at', 'rank', 'task', 'commenter', 'comment', 'posted_at',
+]
+
+
+def isoformat(value):
+    return None if value is None else value.isoformat()
+
+def export_records(project_id, chunk_size):
+    """
+    Yield the project's records in import order. Reads one chunk of rows at a
+    time, inside one transaction so that every record comes from the same snapshot.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+        project = Project.objects.values('name', 'description').get(pk=project_id)
+        yield {'type': 'project', 'version': FORMAT_VERSION, **project}
+
+        members = ProjectMembership.objects.filter(project_id=project_id).order_by('joined_at', 'id')
+        for username, role in members.values_list('user__username', 'role').iterator(chunk_size=chunk_size):
+            yield {'type': 'member', 'username': username, 'role': role}
+
+        tasks = Task.objects.filter(project_id=project_id).order_by('created_at', 'id').values_list(
+            'id', 'title', 'description', 'status', 'priority', 'assignee__username', 'due_date', 'created_at', 'rank')
+        for task_id, title, description, status, priority, assignee, due_date, created_at, rank in tasks.iterator(chunk_size=chunk_size):
+            yield {
+                'type': 'task', 'id': task_id, 'title': title, 'description': description, 'status': status,
+                'priority': priority, 'assignee': assignee, 'due_date': isoformat(due_date), 'created_at': isoformat(created_at),
+                'rank': rank,
+            }
+
+        comments = Comment.objects.filter(task__project_id=project_id).order_by('task_id', 'posted_at', 'id').values_list(
+            'task_id', 'commenter__username', 'comment', 'posted_at')
+        for task_id, commenter, comment, posted_at in comments.iterator(chunk_size=chunk_size):
+            yield {'type': 'comment', 'task': task_id, 'commenter': commenter, 'comment': comment, 'posted_at': isoformat(posted_at)}
+
+def render_ndjson(records, chunk_size):
+    """Encode ``records`` as NDJSON, ``chunk_size`` lines per yielded chunk."""
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        yield ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in chunk)
+
+class _Lines:
+    """A file-like object that returns what csv.writer writes to it."""
+    def write(self, value):
+        return value
+
+def render_csv(records, chunk_size):
+    writer = csv.DictWriter(_Lines(), CSV_FIELDS)
+    yield writer.writeheader()
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        yield ''.join(writer.writerow(record) for record in chunk)
+
+RENDERERS = {'ndjson': render_ndjson, 'csv': render_csv}
+
+async def async_chunks(chunks):
+    """
+    Yield ``chunks`` to an ASGI response one at a time. Given a sync
+    iterator, Django's ASGI handler reads all of it into a list before
+    sending anything; this pulls each chunk, and so each batch of rows,
+    in the thread that holds the database connection.
+    """
+    chunks = iter(chunks)
+    done = object()
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        yield chunk
+
+
+def parse_ndjson(lines):
+    """Yield ``(line number, record)`` from an iterable of text lines."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record
+
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Cells a record type does not use are empty; treat them as absent.
+        yield reader.line_num, {field: value for field, value in row.items() if field and value not in ('', None)}
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+class ImportFailed(Exception):
+    """The import stopped at an invalid record; ``errors`` lists each problem by line."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class ProjectImporter:
+    """
+    Create a project owned by ``owner`` from parsed export records.
+
+    Records are validated and written ``batch_size`` at a time, each batch in
+    its own transaction with one query to resolve the usernames it names.
+    If any record is invalid, the batch is not written, the partly imported
+    project is marked deleted and purged as in ``projects.deletion``, and
+    ImportFailed is raised.
+
+    The owner's own member record is skipped; any other ``owner`` becomes an
+    ``admin``. Timestamps other than task ``created_at`` and comment
+    ``posted_at`` are those of the import, so delta sync clients pick it up.
+    """
+    serializer_classes = {
+        'member': ImportMemberSerializer,
+        'task': ImportTaskSerializer,
+        'comment': ImportCommentSerializer,
+    }
+
+    def __init__(self, owner, batch_size):
+        self.owner = owner
+        self.batch_size = batch_size
+        # One instance per record type, reused for every record.
+        self.serializers = {kind: serializer_class() for kind, serializer_class in self.serializer_classes.items()}
+        self.user_ids = {owner.username: owner.pk}
+        self.member_ids = {owner.pk}
+        self.task_ids = {}
+        self.counts = Counter()
+        self.project = None
+
+    def run(self, records):
+        records = iter(records)
+        try:
+            self.create_project(next(records, (1, None)))
+            while batch := list(islice(records, self.batch_size)):
+                self.import_batch(batch)
+        except ImportFailed:
+            if self.project is not None:
+                # Batches already committed; the purge removes them without holding one long transaction.
+                mark_project_deleted(self.project)
+            raise
+        return {'id': self.project.pk, 'members': self.counts['member'], 'tasks': self.counts['task'], 'comments': self.counts['comment']}
+
+    def create_project(self, line):
+        number, record = line
+        if not isinstance(record, dict) or record.get('type') != 'project':
+            raise ImportFailed([{'line': number, 'errors': {'type': ['The first record must be the project.']}}])
+        if str(record.get('version', FORMAT_VERSION)) != str(FORMAT_VERSION):
+            raise ImportFailed([{'line': number, 'errors': {'version': [f'Unsupported version; expected {FORMAT_VERSION}.']}}])
+        serializer = ImportProjectSerializer(data=record)
+        if not serializer.is_valid():
+            raise ImportFailed([{'line': number, 'errors': serializer.errors}])
+        with transaction.atomic():
+            self.project = serializer.save(owner=self.owner)
+            ProjectMembership.objects.create(user=self.owner, project=self.project, role='owner')
+
+    def import_batch(self, batch):
+        validated, errors = [], []
+        for number, record in batch:
+            kind = record.get('type') if isinstance(record, dict) else None
+            if kind not in self.serializers:
+                errors.append({'line': number, 'errors': {'type': ['Expected a member, task or comment record.']}})
+                continue
+            try:
+                validated.append((number, kind, self.serializers[kind].run_validation(record)))
+            except drf_serializers.ValidationError as exc:
+                errors.append({'line': number, 'errors': exc.detail})
+
+        self.resolve_usernames(data.get(field) for _, kind, data in validated for field in ('username', 'assignee', 'commenter'))
+        members, tasks, comments = [], [], []
+        batch_task_ids = set()
+        for number, kind, data in validated:
+            if kind == 'member':
+                self.add_member(number, data, members, errors)
+            elif kind == 'task':
+                self.add_task(number, data, tasks, batch_task_ids, errors)
+            else:
+                self.add_comment(number, data, comments, batch_task_ids, errors)
+        if errors:
+            raise ImportFailed(errors)
+
+        with transaction.atomic():
+            self.write(members, tasks, comments)
+
+    def resolve_usernames(self, usernames):
+        """Look up every username not seen before in one query."""
+        missing = {name for name in usernames if name and name not in self.user_ids}
+        if missing:
+            self.user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+
+    def user_id(self, number, field, username, errors):
+        if not username:
+            return None
+        if username not in self.user_ids:
+            errors.append({'line': number, 'errors': {field: [f'No user named {username}.']}})
+        return self.user_ids.get(username)
+
+    def add_member(self, number, data, members, errors):
+        user_id = self.user_id(number, 'username', data['username'], errors)
+        if user_id is None or user_id in self.member_ids:
+            return
+        self.member_ids.add(user_id)
+        role = 'admin' if data['role'] == 'owner' else data['role']
+        members.append(ProjectMembership(project=self.project, user_id=user_id, role=role))
+
+    def add_task(self, number, data, tasks, batch_task_ids, errors):
+        source_id = data.pop('id', None)
+        if source_id is not None:
+            if source_id in self.task_ids or source_id in batch_task_ids:
+                errors.append({'line': number, 'errors': {'id': ['Duplicate task id.']}})
+            batch_task_ids.add(source_id)
+        assignee_id = self.user_id(number, 'assignee', data.pop('assignee', None), errors)
+        created_at = data.pop('created_at', None)
+        tasks.append((source_id, created_at, Task(project=self.project, assignee_id=assignee_id, **data)))
+
+    def add_comment(self, number, data, comments, batch_task_ids, errors):
+        if data['task'] not in self.task_ids and data['task'] not in batch_task_ids:
+            errors.append({'line': number, 'errors': {'task': ['No task with this id before this comment.']}})
+        commenter_id = self.user_id(number, 'commenter', data['commenter'], errors)
+        comments.append((data['task'], data.get('posted_at'), Comment(commenter_id=commenter_id, comment=data['comment'])))
+
+    def write(self, members, tasks, comments):
+        """Insert one validated batch. Bulk inserts skip save() and signals, so do their work here."""
+        project_id = self.project.pk
+        ProjectMembership.objects.bulk_create(members)
+
+        # Tasks exported without a rank go to the end of their column, in file order.
+        Task.append_ranks([task for _, _, task in tasks])
+        created = Task.objects.bulk_create([task for _, _, task in tasks])
+        # auto_now_add overrides the exported timestamps on insert; put them back.
+        Task.objects.bulk_update(self.restore(tasks, 'created_at'), ['created_at'])
+        self.task_ids.update((source_id, task.pk) for source_id, _, task in tasks if source_id is not None)
+        Project.adjust_task_counts(project_id, Counter(task.status for task in created))
+
+        for source_id, _, comment in comments:
+            comment.task_id = self.task_ids[source_id]
+        Comment.objects.bulk_create([comment for _, _, comment in comments])
+        Comment.objects.bulk_update(self.restore(comments, 'posted_at'), ['posted_at'])
+        if comments:
+            task_comments = Comment.objects.filter(task=OuterRef('pk')).order_by()
+            Task.objects.filter(pk__in={comment.task_id for _, _, comment in comments}).update(
+                comment_count=Coalesce(Subquery(task_comments.values('task').annotate(n=Count('id')).values('n')), 0),
+                last_comment_at=Subquery(task_comments.order_by('-posted_at').values('posted_at')[:1]),
+                updated_at=Now(),
+            )
+
+        bump(project_version_key(project_id), *[user_version_key(member.user_id) for member in members])
+        self.counts.update(member=len(members), task=len(tasks), comment=len(comments))
+
+    @staticmethod
+    def restore(rows, field):
+        """Objects of ``(ref, timestamp, obj)`` rows that carried a timestamp, with it set on ``field``."""
+        restored = []
+        for _, timestamp, obj in rows:
+            if timestamp is not None:
+                setattr(obj, field, timestamp)
+                restored.append(obj)
+        return restored
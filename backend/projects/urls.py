@@ -1,27 +1,47 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+
+def read_view(sync_view, async_view):
+    """Serve hot GET endpoints from native async views when deployed with ASYNC_READ_VIEWS under ASGI."""
+    return (async_view if settings.ASYNC_READ_VIEWS else sync_view).as_view()
 
 urlpatterns = [
     # User endpoints
     path('signup/', views.UserRegistrationView.as_view(), name='signup'), 
     path('login/', views.LoginView.as_view(), name='login'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
-    path('me/', views.MeView.as_view(), name='me'),
-    path('users/<str:username>/', views.ProfileView.as_view(), name='profile'),
+    path('me/', read_view(views.MeView, async_views.AsyncMeView), name='me'),
+    path('users/<str:username>/', read_view(views.ProfileView, async_views.AsyncProfileView), name='profile'),
 
     # Project endpoints
-    path('projects/', views.ProjectListCreateView.as_view(), name='project_list_create'),  # List & create projects
+    path('projects/', read_view(views.ProjectListCreateView, async_views.AsyncProjectListView), name='project_list_create'),  # List & create projects
     path('projects/<uuid:pk>/', views.ProjectDetailView.as_view(), name='project_detail'),  # Retrieve, update, delete a project
+    path('projects/<uuid:project_id>/stats/', views.ProjectStatsView.as_view(), name='project_stats'),  # Task statistics for a project
+    path('projects/<uuid:project_id>/events/', views.ProjectEventsView.as_view(), name='project_events'),  # Live change feed (Server-Sent Events)
+    path('projects/stats/', views.ProjectStatsSummaryView.as_view(), name='project_stats_summary'),  # Task statistics for all of the user's projects
+    path('projects/<uuid:project_id>/export/', views.ProjectExportView.as_view(), name='project_export'),  # Stream the whole project as NDJSON or CSV
+    path('projects/import/', views.ProjectImportView.as_view(), name='project_import'),  # Create a project from an export
 
     # Task endpoints
-    path('projects/<uuid:project_id>/tasks/', views.TaskListCreateView.as_view(), name='task_list_create'),  # List & create tasks for a project
+    path('projects/<uuid:project_id>/tasks/', read_view(views.TaskListCreateView, async_views.AsyncTaskListView), name='task_list_create'),  # List & create tasks for a project
     path('projects/<uuid:project_id>/tasks/<int:pk>/', views.TaskDetailView.as_view(), name='task_detail'),  # Retrieve, update, delete a task
+    path('projects/<uuid:project_id>/tasks/<int:pk>/move/', views.TaskMoveView.as_view(), name='task_move'),  # Reorder a task on the board
+    path('projects/<uuid:project_id>/tasks/bulk/', views.TaskBulkView.as_view(), name='task_bulk'),  # Create, update and delete many tasks at once
+    path('tasks/', views.MyTaskListView.as_view(), name='my_tasks'),  # List tasks across all of the user's projects
 
     # Project membership endpoints
     path('projects/<uuid:project_id>/members/', views.ProjectMembershipView.as_view(), name='project_membership'),  # List and add members
     path('projects/<uuid:project_id>/members/<int:user_id>/', views.ProjectMembershipDetailView.as_view(), name='project_membership_detail'), # Update or delete member
 
     # Comment endpoints
-    path('projects/<uuid:project_id>/tasks/<int:task_id>/comments/', views.CommentListCreateView.as_view(), name='comment'), # List and add comments
+    path('projects/<uuid:project_id>/tasks/<int:task_id>/comments/', read_view(views.CommentListCreateView, async_views.AsyncCommentListView), name='comment'), # List and add comments
     path('projects/<uuid:project_id>/tasks/<int:task_id>/comments/<int:pk>/', views.CommentDetailView.as_view(), name='comment_detail'), # Retrieve or delete a comment
+
+    # Sync endpoints
+    path('sync/', views.SyncView.as_view(), name='sync'),  # Everything changed since a cursor, with tombstones for deletions
+
+    # Search endpoints
+    path('search/', views.SearchView.as_view(), name='search'),  # Full-text search over tasks and comments
 ]
\ No newline at end of file
@@ -1,8 +1,19 @@
+import copy
 import jwt
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework.exceptions import AuthenticationFailed
+from .cache import LRUCache
+from .profiling import phase
+
+# user_id -> (token claims, User); invalidated by projects.signals on User
+# save/delete. The TTL bounds staleness in worker processes that did not
+# handle the write, e.g. a deactivated or renamed user.
+user_cache = LRUCache(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 30),
+)
 
 def generate_jwt(user):
     payload = {
@@ -14,15 +25,85 @@ def generate_jwt(user):
     return token
 
 def get_user_from_jwt(request):
-    token = request.COOKIES.get('jwt')
+    """
+    Resolve the user for the request's JWT cookie.
+
+    The outcome is remembered on the underlying HttpRequest, so the token is
+    decoded at most once per request however many callers ask for it.
+    """
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_jwt_auth'):
+        try:
+            with phase('auth'):
+                http_request._jwt_auth = (_load_user_from_jwt(http_request), None)
+        except AuthenticationFailed as exc:
+            http_request._jwt_auth = (None, exc)
+
+    user, error = http_request._jwt_auth
+    if error is not None:
+        raise error
+    return user
+
+async def aget_user_from_jwt(request):
+    """Async counterpart of get_user_from_jwt() for native async views."""
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_jwt_auth'):
+        try:
+            with phase('auth'):
+                http_request._jwt_auth = (await _aload_user_from_jwt(http_request), None)
+        except AuthenticationFailed as exc:
+            http_request._jwt_auth = (None, exc)
+
+    user, error = http_request._jwt_auth
+    if error is not None:
+        raise error
+    return user
+
+def _decode_jwt(request):
+    """Return ``(user_id, claims)`` from the request's JWT cookie."""
+    token = request.COOKIES.get(settings.JWT_COOKIE_NAME)
     if not token:
         raise AuthenticationFailed('Unauthenticated')
 
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=['HS256'])
-        user = User.objects.get(id=payload['user_id'])
-        return user
-    except (jwt.ExpiredSignatureError, jwt.DecodeError):
+        user_id = payload['user_id']
+    except (jwt.ExpiredSignatureError, jwt.DecodeError, KeyError):
         raise AuthenticationFailed('Invalid or expired token')
+
+    return user_id, tuple(sorted(payload.items()))
+
+def _cached_user(user_id, claims):
+    cached = user_cache.get(user_id)
+    if cached is not None and cached[0] == claims:
+        # Hand out a copy so per-request changes never leak into the cache.
+        return copy.copy(cached[1])
+    return None
+
+def _load_user_from_jwt(request):
+    user_id, claims = _decode_jwt(request)
+    user = _cached_user(user_id, claims)
+    if user is not None:
+        return user
+
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed('User does not exist')
+
+    user_cache.set(user_id, (claims, user))
+    return copy.copy(user)
+
+async def _aload_user_from_jwt(request):
+    user_id, claims = _decode_jwt(request)
+    user = _cached_user(user_id, claims)
+    if user is not None:
+        return user
+
+    try:
+        user = await User.objects.aget(id=user_id)
     except User.DoesNotExist:
-        raise AuthenticationFailed('User does not exist')
\ No newline at end of file
+        raise AuthenticationFailed('User does not exist')
+
+    user_cache.set(user_id, (claims, user))
+    return copy.copy(user)
@@ -1,21 +1,56 @@
-from .models import Project, Task, ProjectMembership, Comment
-from .serializers import ProjectSerializer, TaskSerializer, ProjectMembershipSerializer, UserRegistrationSerializer, UserSerializer, CommentSerializer
-from .utils import generate_jwt
+from collections import Counter
+from datetime import timedelta
+import uuid
+import hmac
+from .models import Project, Task, ProjectMembership, Comment, Tombstone
+from .serializers import ProjectSerializer, TaskSerializer, TaskBulkItemSerializer, TaskMoveSerializer, ProjectMembershipSerializer, SyncMembershipSerializer, UserRegistrationSerializer, UserSerializer, CommentSerializer
+from . import metrics
+from .conditional import conditional_get
+from .deletion import mark_project_deleted, purge_task_comments
+from .response_cache import (
+    bump, cached_response, get_or_set_versioned, project_version_key, user_version_key, version_tag
+)
+from .events import event_stream, get_broadcaster, publish_event
+from .filters import filter_tasks, task_ordering
+from .ranking import rank_between
+from .rebalance import schedule_rebalance
+from .rows import CommentRowSerializer, RowListMixin, TaskRowSerializer
+from .search import search
+from .stats import project_stats, projects_stats
+from .throttling import FirstRejectionMixin, LoginEmailThrottle, LoginIPThrottle
+from .transfer import CONTENT_TYPES, PARSERS, RENDERERS, ImportFailed, ProjectImporter, async_chunks, export_records
+from .sync import changes_since, decode_cursor, encode_cursor
+from .permissions import IsProjectMember, ProjectRoleMixin, aget_project_role, role_cache, role_cache_key
+from .pagination import (
+    ProjectPagination, TaskPagination, MyTaskPagination, CommentPagination, MembershipPagination
+)
+from .utils import aget_user_from_jwt, generate_jwt
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Prefetch
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views import View
 from rest_framework import generics, permissions, status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny
+from rest_framework.pagination import _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
 # USER VIEWS
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(FirstRejectionMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny]
+    # No JWT lookup: throttles run first and reject before any query or hashing.
+    authentication_classes = []
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -35,24 +70,28 @@ class UserRegistrationView(generics.CreateAPIView):
         )
         return response
 
-class LoginView(APIView):
+class LoginView(FirstRejectionMixin, APIView):
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+    def throttled(self, request, wait):
+        metrics.LOGIN_ATTEMPTS.inc(outcome='throttled')
+        super().throttled(request, wait)
 
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
 
-        try:
-            user = User.objects.get(email=email)
-            username = user.username 
-        except User.DoesNotExist:
-            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        user = authenticate(request, username=username, password=password)
+        # One indexed lookup by email (see projects.backends.EmailBackend).
+        user = authenticate(request, email=email, password=password)
 
         if user is None:
+            metrics.LOGIN_ATTEMPTS.inc(outcome='failure')
             return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
+        metrics.LOGIN_ATTEMPTS.inc(outcome='success')
+
         token = generate_jwt(user)
 
         response = Response({"message": "Login successful"}, status=status.HTTP_200_OK)
@@ -89,12 +128,41 @@ class ProfileView(generics.RetrieveAPIView):
 
 
 # PROJECT VIEWS
+def visible_projects(user):
+    """Projects the user belongs to, with owner and members loaded up front."""
+    return Project.objects.filter(projectmembership__user=user).distinct().select_related(
+        'owner'
+    ).prefetch_related(
+        Prefetch('projectmembership_set', queryset=ProjectMembership.objects.select_related('user'))
+    )
+
 class ProjectListCreateView(generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_from_replica = True
+    pagination_class = ProjectPagination
 
     def get_queryset(self):
-        return Project.objects.filter(projectmembership__user=self.request.user).distinct()
+        return visible_projects(self.request.user).order_by('created_at', 'id')
+
+    def get_validators(self):
+        # Membership changes bump Project.updated_at (see projects.signals).
+        agg = Project.objects.filter(projectmembership__user=self.request.user).aggregate(
+            count=Count('id'), latest=Max('updated_at'))
+        return f"{agg['count']}:{agg['latest']}", None
+
+    def get_cache_versions(self):
+        # The user's project ids are cached under their own version, so a hit runs no query.
+        user = self.request.user
+        user_key = user_version_key(user.pk)
+        project_ids = get_or_set_versioned(f'projects:{user.pk}', [user_key], lambda: list(
+            ProjectMembership.objects.filter(user=user).order_by('project_id').values_list('project_id', flat=True)))
+        return [user_key] + [project_version_key(project_id) for project_id in project_ids]
+
+    @cached_response
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -105,73 +173,435 @@ class ProjectListCreateView(generics.ListCreateAPIView):
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_from_replica = True
 
     def get_queryset(self):
-        return Project.objects.filter(projectmembership__user=self.request.user).distinct()
+        return visible_projects(self.request.user)
+
+    def get_validators(self):
+        updated_at = Project.objects.filter(
+            id=self.kwargs['pk'], projectmembership__user=self.request.user
+        ).values_list('updated_at', flat=True).first()
+        return (str(updated_at) if updated_at else None), updated_at
+
+    def get_cache_versions(self):
+        return [project_version_key(self.kwargs['pk'])]
+
+    @cached_response
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        # Hidden now; its tasks, comments and memberships are purged in the background.
+        mark_project_deleted(instance)
+
+class ProjectStatsView(ProjectRoleMixin, APIView):
+    """Task counts by status and priority, overdue tasks, completion and per-assignee load."""
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+
+    def get(self, request, project_id):
+        return Response(project_stats(project_id))
+
+class ProjectStatsSummaryView(APIView):
+    """Dashboard variant: the same counts, minus assignees, for each of the user's projects."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        project_ids = None
+        if request.query_params.get('project'):
+            try:
+                project_ids = [uuid.UUID(value) for value in request.query_params['project'].split(',')]
+            except ValueError:
+                return Response({'project': 'Must be a comma separated list of project ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(projects_stats(request.user, project_ids))
+
+
+class ProjectExportView(ProjectRoleMixin, APIView):
+    """
+    Stream the project, its members, tasks and comments as NDJSON, or as CSV
+    with ``?as=csv``. Rows are read and encoded a batch at a time, so any
+    project size exports in constant memory, under ASGI too, where the
+    batches are fetched through async_chunks. See projects.transfer.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The stream is not rendered, so accept clients asking for NDJSON or CSV.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, project_id):
+        file_format = request.query_params.get('as', 'ndjson')
+        if file_format not in RENDERERS:
+            return Response({'as': f"Must be one of: {', '.join(RENDERERS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = settings.PROJECT_TRANSFER_BATCH_SIZE
+        chunks = RENDERERS[file_format](export_records(project_id, batch_size), batch_size)
+        if isinstance(request._request, ASGIRequest):
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks,
+            content_type=f'{CONTENT_TYPES[file_format]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="project-{project_id}.{file_format}"'
+        return response
+
+class ProjectImportView(APIView):
+    """
+    Create a project owned by the user from an export. Send the export as the
+    request body, with a ``text/csv`` content type for CSV and anything else
+    for NDJSON. The body is parsed line by line and written in batches.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        file_format = 'csv' if request.content_type.startswith('text/csv') else 'ndjson'
+        lines = (line.decode('utf-8', errors='replace') for line in (request.stream or []))
+        importer = ProjectImporter(request.user, settings.PROJECT_TRANSFER_BATCH_SIZE)
+        try:
+            summary = importer.run(PARSERS[file_format](lines))
+        except ImportFailed as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
 
 
 # TASK VIEWS
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(ProjectRoleMixin, RowListMixin, generics.ListCreateAPIView):
     serializer_class = TaskSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    row_serializer_class = TaskRowSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
+    pagination_class = TaskPagination
 
     def get_queryset(self):
-        project_id = self.kwargs['project_id']
-        project = get_object_or_404(Project, id=project_id)
+        queryset = Task.objects.filter(project_id=self.project_id).select_related('project', 'assignee')
+        return filter_tasks(queryset, self.request.query_params, self.request.user).order_by(*self.get_ordering())
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            raise PermissionDenied('You are not a member of this project.')
+    def get_ordering(self):
+        return task_ordering(self.request.query_params, default=TaskPagination.ordering)
 
-        return Task.objects.filter(project=project)
+    def get_validators(self):
+        # Tasks embed the project's name and their assignees, whose changes bump the project version.
+        agg = Task.objects.filter(project_id=self.project_id).aggregate(
+            count=Count('id'), latest=Max('updated_at'))
+        version = version_tag(project_version_key(self.project_id))
+        return f"{agg['count']}:{agg['latest']}:{version}", None
 
-    def perform_create(self, serializer):
-        project = get_object_or_404(Project, id=self.kwargs['project_id'])
+    def get_cache_versions(self):
+        return [project_version_key(self.project_id)]
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            raise PermissionDenied('You are not a member of this project.')
+    @cached_response
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
         assignee = self.request.data.get('assignee', None)
         if assignee:
             assignee = get_object_or_404(User, id=assignee)
 
-        serializer.save(project=project, assignee=assignee)
+        serializer.save(project_id=self.project_id, assignee=assignee)
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ProjectRoleMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
 
     def get_queryset(self):
-        project_id = self.kwargs['project_id']
-        project = get_object_or_404(Project, id=project_id)
+        return Task.objects.filter(project_id=self.project_id).select_related('project', 'assignee')
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            raise PermissionDenied('You are not a member of this project.')
+    def get_validators(self):
+        updated_at = Task.objects.filter(
+            project_id=self.project_id, id=self.kwargs['pk']
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return f'{updated_at}:{version_tag(project_version_key(self.project_id))}', updated_at
 
-        return Task.objects.filter(project=project)
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        # Comments go first, a bounded batch per statement, so the task's own delete stays short.
+        purge_task_comments(instance.pk, settings.PROJECT_PURGE_BATCH_SIZE)
+        instance.delete()
+
+class TaskMoveView(ProjectRoleMixin, APIView):
+    """
+    Move a task between two neighbours in its column, or in the ``status``
+    column it moves to, by giving it a rank between theirs.
+
+    Body: ``{"after": <id or null>, "before": <id or null>, "status": ...}``,
+    where ``after`` is the task it should follow and ``before`` the one it
+    should precede. Given one, it goes right next to it; with neither, to the
+    end of the column. Only the moved task's row is written, plus the project
+    counters when the status changes. A 409 means the neighbours are not in
+    that order any more, so the client should reload the column.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+
+    def post(self, request, project_id, pk):
+        serializer = TaskMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        neighbour_ids = {data.get('after'), data.get('before')} - {None}
+        if pk in neighbour_ids:
+            return Response({'detail': 'A task cannot be its own neighbour.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Locked, so a concurrent rebalance cannot respace the column between reading and writing.
+            rows = {
+                row['id']: row for row in Task.objects.select_for_update().filter(
+                    project_id=project_id, id__in={pk, *neighbour_ids}).values('id', 'status', 'rank')
+            }
+            if pk not in rows:
+                raise Http404('No Task matches the given query.')
+            old_status = rows[pk]['status']
+            new_status = data.get('status', old_status)
+
+            ranks = {}
+            for field in ('after', 'before'):
+                neighbour = rows.get(data.get(field))
+                if data.get(field) is not None and (neighbour is None or neighbour['status'] != new_status):
+                    return Response({field: ['No such task in this column.']}, status=status.HTTP_400_BAD_REQUEST)
+                ranks[field] = neighbour and neighbour['rank']
+            # Given one neighbour (or none, for the end), the other side is the task now next to it.
+            column = Task.objects.filter(project_id=project_id, status=new_status).exclude(pk=pk).values_list('rank', flat=True)
+            if ranks['before'] is None and ranks['after'] is not None:
+                ranks['before'] = column.filter(rank__gt=ranks['after']).order_by('rank').first()
+            elif ranks['after'] is None:
+                if ranks['before'] is not None:
+                    column = column.filter(rank__lt=ranks['before'])
+                ranks['after'] = column.order_by('-rank').first()
+
+            try:
+                rank = rank_between(ranks['after'], ranks['before'])
+            except ValueError:
+                rank = None
+            if rank is None or len(rank) > Task._meta.get_field('rank').max_length:
+                # Equal or exhausted ranks: respace the column for the client's retry.
+                self.queue_rebalance(project_id, new_status)
+                return Response({'detail': 'The column has changed; reload it and try again.'}, status=status.HTTP_409_CONFLICT)
+
+            Task.objects.filter(pk=pk).update(rank=rank, status=new_status, updated_at=timezone.now())
+            # update() skips Task.save() and its signals, so do their work here.
+            if new_status != old_status:
+                Project.adjust_task_counts(project_id, {old_status: -1, new_status: 1})
+            bump(project_version_key(project_id))
+            publish_event(project_id, 'task.updated', id=pk)
+            if len(rank) > settings.TASK_RANK_REBALANCE_LENGTH:
+                self.queue_rebalance(project_id, new_status)
+
+        task = Task.objects.select_related('project', 'assignee').get(pk=pk)
+        return Response(TaskSerializer(task).data)
+
+    @staticmethod
+    def queue_rebalance(project_id, task_status):
+        if settings.TASK_RANK_REBALANCE_IN_PROCESS:
+            transaction.on_commit(lambda: schedule_rebalance(project_id, task_status))
+
+class TaskBulkView(ProjectRoleMixin, APIView):
+    """
+    Create, update and delete many tasks of a project in one transaction.
+
+    Body: ``{"create": [{...}], "update": [{"id": 1, ...}], "delete": [2, 3]}``.
+    Every operation is validated first; if any fails, nothing is written and
+    a 400 carries per-item errors aligned with the request arrays.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    max_operations = 1000
+
+    def post(self, request, project_id):
+        creates = request.data.get('create', [])
+        updates = request.data.get('update', [])
+        deletes = request.data.get('delete', [])
+
+        if not all(isinstance(ops, list) for ops in (creates, updates, deletes)):
+            return Response({'detail': 'create, update and delete must be lists.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(creates) + len(updates) + len(deletes) > self.max_operations:
+            return Response({'detail': f'At most {self.max_operations} operations per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One query for every assignee named anywhere in the batch. As in
+        # get_project_role(), the owner counts even without a membership row.
+        usernames = {
+            item.get('assignee_username') for item in creates + updates
+            if isinstance(item, dict) and item.get('assignee_username')
+        }
+        members = {
+            user.username: user for user in
+            User.objects.filter(username__in=usernames).filter(
+                Exists(ProjectMembership.objects.filter(user=OuterRef('pk'), project_id=project_id))
+                | Exists(Project.objects.filter(pk=project_id, owner=OuterRef('pk')))
+            )
+        }
+
+        update_ids = [item.get('id') for item in updates if isinstance(item, dict)]
+        existing = Task.objects.filter(project_id=project_id, id__in=[i for i in update_ids if isinstance(i, int)]).in_bulk()
+        stored_statuses = {task_id: task.status for task_id, task in existing.items()}
+
+        create_errors, new_tasks = [], []
+        for item in creates:
+            task = Task(project_id=project_id)
+            errors, _ = self.apply_operation(task, item, members, partial=False)
+            create_errors.append(errors)
+            new_tasks.append(task)
+
+        # A task named twice would be counted twice in the status counters.
+        update_errors, changed_tasks, changed_fields, updated_ids = [], [], {'updated_at'}, set()
+        for item in updates:
+            if not isinstance(item, dict) or not isinstance(item.get('id'), int) or item['id'] not in existing:
+                update_errors.append({'id': ['No such task in this project.']})
+                continue
+            if item['id'] in updated_ids:
+                update_errors.append({'id': ['Task is updated more than once.']})
+                continue
+            updated_ids.add(item['id'])
+            task = existing[item['id']]
+            errors, fields = self.apply_operation(task, item, members, partial=True)
+            update_errors.append(errors)
+            changed_tasks.append(task)
+            changed_fields.update(fields)
+
+        delete_ids = [task_id for task_id in deletes if isinstance(task_id, int)]
+        deleted_statuses = dict(Task.objects.filter(project_id=project_id, id__in=delete_ids).values_list('id', 'status'))
+        found_ids = set(deleted_statuses)
+        delete_errors, seen_ids = [], set()
+        for task_id in deletes:
+            if not isinstance(task_id, int) or task_id not in found_ids:
+                delete_errors.append({'id': ['No such task in this project.']})
+            elif task_id in seen_ids:
+                delete_errors.append({'id': ['Task is deleted more than once.']})
+            elif task_id in updated_ids:
+                delete_errors.append({'id': ['Task is also updated.']})
+            else:
+                delete_errors.append({})
+                seen_ids.add(task_id)
+
+        if any(create_errors + update_errors + delete_errors):
+            return Response({
+                'create': create_errors,
+                'update': update_errors,
+                'delete': delete_errors,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # As Task.save() would: new tasks, and tasks changing column, go to the end of their column.
+            moved = [task for task in changed_tasks if task.status != stored_statuses[task.id]]
+            for task in moved:
+                task.rank = ''
+            if moved:
+                changed_fields.add('rank')
+            Task.append_ranks(new_tasks + moved)
+            created = Task.objects.bulk_create(new_tasks)
+            if changed_tasks:
+                now = timezone.now()
+                for task in changed_tasks:
+                    task.updated_at = now
+                Task.objects.bulk_update(changed_tasks, sorted(changed_fields))
+            if found_ids:
+                Task.objects.filter(project_id=project_id, id__in=found_ids).delete()
+
+            # bulk writes bypass Task.save()/delete(), so record tombstones, move the
+            # project counters, invalidate cached responses and publish the change feed event here.
+            Tombstone.objects.bulk_create([
+                Tombstone(kind='task', object_id=task_id, project_id=project_id) for task_id in sorted(found_ids)
+            ])
+            status_deltas = Counter(task.status for task in created)
+            for task in changed_tasks:
+                status_deltas[stored_statuses[task.id]] -= 1
+                status_deltas[task.status] += 1
+            status_deltas.subtract(deleted_statuses.values())
+            Project.adjust_task_counts(project_id, status_deltas)
+            bump(project_version_key(project_id))
+            publish_event(
+                project_id, 'task.bulk',
+                created=[task.id for task in created],
+                updated=[task.id for task in changed_tasks],
+                deleted=sorted(found_ids),
+            )
+
+        touched = Task.objects.filter(
+            id__in=[task.id for task in created + changed_tasks]
+        ).select_related('project', 'assignee').in_bulk()
+        return Response({
+            'created': TaskSerializer([touched[task.id] for task in created], many=True).data,
+            'updated': TaskSerializer([touched[task.id] for task in changed_tasks], many=True).data,
+            'deleted': sorted(found_ids),
+        })
+
+    def apply_operation(self, task, item, members, partial):
+        """Validate one operation and apply it to ``task``; returns (errors, changed fields)."""
+        if not isinstance(item, dict):
+            return {'non_field_errors': ['Expected an object.']}, []
+
+        serializer = TaskBulkItemSerializer(data=item, partial=partial)
+        if not serializer.is_valid():
+            return serializer.errors, []
+
+        data = dict(serializer.validated_data)
+        if 'assignee_username' in data:
+            username = data.pop('assignee_username')
+            if username and username not in members:
+                return {'assignee_username': ['Assignee must be a member of the project.']}, []
+            data['assignee'] = members.get(username) if username else None
+        for field, value in data.items():
+            setattr(task, field, value)
+        return {}, list(data)
+
+class MyTaskListView(RowListMixin, generics.ListAPIView):
+    """List every task visible to the user across all of their projects in one query."""
+    serializer_class = TaskSerializer
+    row_serializer_class = TaskRowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    read_from_replica = True
+    pagination_class = MyTaskPagination
+
+    def get_queryset(self):
+        queryset = Task.objects.filter(
+            project__projectmembership__user=self.request.user, project__deleted_at__isnull=True
+        ).select_related('project', 'assignee')
+        return filter_tasks(queryset, self.request.query_params, self.request.user)
+
+    def get_ordering(self):
+        return task_ordering(self.request.query_params, default=MyTaskPagination.ordering)
 
 
 # PROJECT MEMBERSHIP VIEWS
-class ProjectMembershipView(APIView):
+class ProjectMembershipView(ProjectRoleMixin, APIView):
     """Handles listing and adding project members"""
-    permission_classes = [permissions.IsAuthenticated]
-
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
+
+    def get_validators(self):
+        # Membership changes bump Project.updated_at (see projects.signals).
+        row = Project.objects.filter(id=self.project_id).annotate(
+            members=Count('projectmembership')).values_list('updated_at', 'members').first()
+        if row is None:
+            return None, None
+        return f'{row[0]}:{row[1]}', row[0]
+
+    def get_cache_versions(self):
+        return [project_version_key(self.project_id)]
+
+    @cached_response
+    @conditional_get
     def get(self, request, project_id):
         """List all members of a project"""
-        project = get_object_or_404(Project, id=project_id)
+        members = ProjectMembership.objects.filter(project_id=project_id).select_related('user').order_by('joined_at', 'id')
 
-        if not ProjectMembership.objects.filter(user=request.user, project=project).exists():
-            return Response({'detail': 'You are not a member of this project.'}, status=status.HTTP_403_FORBIDDEN)
+        paginator = MembershipPagination()
+        page = paginator.paginate_queryset(members, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(ProjectMembershipSerializer(page, many=True).data)
 
-        members = ProjectMembership.objects.filter(project=project)
         serializer = ProjectMembershipSerializer(members, many=True)
         return Response(serializer.data)
 
     def post(self, request, project_id):
-        project = get_object_or_404(Project, id=project_id)
-        requesting_membership = ProjectMembership.objects.filter(
-            project=project, user=request.user).first()
+        requesting_role = self.get_project_role()
 
-        if not (project.owner == request.user or (requesting_membership and requesting_membership.role == 'admin')):
+        if requesting_role not in ('owner', 'admin'):
             return Response({'detail': 'Only project owners and admins can add members.'}, status=status.HTTP_403_FORBIDDEN)
 
         username = request.data.get('username')
@@ -185,44 +615,44 @@ class ProjectMembershipView(APIView):
         except User.DoesNotExist:
             return Response({'error': 'User with that username does not exist.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if ProjectMembership.objects.filter(project=project, user=user).exists():
+        if ProjectMembership.objects.filter(project_id=project_id, user=user).exists():
             return Response({'detail': 'User is already a member of this project.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if role == 'admin' and request.user != project.owner:
+        if role == 'admin' and requesting_role != 'owner':
             return Response({'detail': 'Only the project owner can assign admin roles.'}, status=status.HTTP_403_FORBIDDEN)
 
         membership = ProjectMembership.objects.create(
-            user=user, project=project, role=role)
+            user=user, project_id=project_id, role=role)
         serializer = ProjectMembershipSerializer(membership)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class ProjectMembershipDetailView(APIView):
+class ProjectMembershipDetailView(ProjectRoleMixin, APIView):
     """Handles retrieving, updating, and removing a specific project member"""
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
 
     def get(self, request, project_id, user_id):
         """Retrieve a specific project member's details"""
-        project = get_object_or_404(Project, id=project_id)
         membership = get_object_or_404(
-            ProjectMembership, project=project, user_id=user_id)
+            ProjectMembership.objects.select_related('user'), project_id=project_id, user_id=user_id)
 
         serializer = ProjectMembershipSerializer(membership)
         return Response(serializer.data)
 
     def patch(self, request, project_id, user_id):
         """Update a member's role (Only owners can update roles)"""
-        project = get_object_or_404(Project, id=project_id)
+        requesting_role = self.get_project_role()
 
         # Ensure only owners can update roles
-        if project.owner != request.user:
+        if requesting_role != 'owner':
             return Response({'detail': 'Only the project owner can update roles.'}, status=status.HTTP_403_FORBIDDEN)
 
         membership = get_object_or_404(
-            ProjectMembership, project=project, user_id=user_id)
+            ProjectMembership.objects.select_related('user'), project_id=project_id, user_id=user_id)
         new_role = request.data.get('role')
 
         # Prevent admins from assigning other users as admin
-        if new_role == 'admin' and request.user != project.owner:
+        if new_role == 'admin' and requesting_role != 'owner':
             return Response({'detail': 'Only owners can assign admin roles.'}, status=status.HTTP_403_FORBIDDEN)
 
         membership.role = new_role
@@ -232,12 +662,11 @@ class ProjectMembershipDetailView(APIView):
 
     def delete(self, request, project_id, user_id):
         """Remove a project member (Admins & Owners can remove members)"""
-        project = get_object_or_404(Project, id=project_id)
         membership = get_object_or_404(
-            ProjectMembership, project=project, user_id=user_id)
+            ProjectMembership, project_id=project_id, user_id=user_id)
 
         # Owners can remove anyone, Admins can remove only members
-        if request.user != project.owner and (request.user != membership.user and membership.role == 'admin'):
+        if self.get_project_role() != 'owner' and (request.user.id != membership.user_id and membership.role == 'admin'):
             return Response({'detail': 'Admins cannot remove other admins.'}, status=status.HTTP_403_FORBIDDEN)
 
         membership.delete()
@@ -245,42 +674,160 @@ class ProjectMembershipDetailView(APIView):
     
 
 # COMMENT VIEWS
-class CommentListCreateView(generics.ListCreateAPIView):
+class CommentListCreateView(ProjectRoleMixin, RowListMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    row_serializer_class = CommentRowSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
+    pagination_class = CommentPagination
 
     def get_queryset(self):
-        project_id = self.kwargs['project_id']
-        task_id = self.kwargs['task_id']
-
         # Ensure task belongs to project
-        task = get_object_or_404(Task, id=task_id, project__id=project_id)
+        task = get_object_or_404(Task, id=self.kwargs['task_id'], project_id=self.project_id)
+        return Comment.objects.filter(task=task).select_related('commenter', 'task').order_by('posted_at', 'id')
+
+    def get_validators(self):
+        # Comments embed the task's title and their commenters, whose changes bump the project version.
+        agg = Comment.objects.filter(
+            task_id=self.kwargs['task_id'], task__project_id=self.project_id
+        ).aggregate(count=Count('id'), latest=Max('updated_at'))
+        version = version_tag(project_version_key(self.project_id))
+        return f"{agg['count']}:{agg['latest']}:{version}", None
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=task.project).exists():
-            raise PermissionDenied("You are not a member of this project.")
+    def perform_create(self, serializer):
+        task = get_object_or_404(Task, id=self.kwargs['task_id'], project_id=self.project_id)
+        serializer.save(task=task, commenter=self.request.user)
 
-        return Comment.objects.filter(task=task).order_by('posted_at')
+class CommentDetailView(ProjectRoleMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProjectMember]
+    read_from_replica = True
 
-    def perform_create(self, serializer):
-        project_id = self.kwargs['project_id']
-        task_id = self.kwargs['task_id']
-        task = get_object_or_404(Task, id=task_id, project__id=project_id)
+    def get_queryset(self):
+        task = get_object_or_404(Task, id=self.kwargs['task_id'], project_id=self.project_id)
+        return Comment.objects.filter(task=task).select_related('commenter', 'task')
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=task.project).exists():
-            raise PermissionDenied("You are not a member of this project.")
 
-        serializer.save(task=task, commenter=self.request.user)
+# SEARCH VIEWS
+class SearchView(APIView):
+    """Ranked full-text search over tasks and comments in the user's projects."""
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 20
+    max_page_size = 100
 
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    serializer_class = CommentSerializer
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'q': 'A search query is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = _positive_int(request.query_params.get('page', 1), strict=True)
+            page_size = _positive_int(request.query_params.get('page_size', self.page_size), strict=True, cutoff=self.max_page_size)
+        except ValueError:
+            return Response({'detail': 'page and page_size must be positive integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        hits = search(request.user, text, limit=page_size + 1, offset=(page - 1) * page_size)
+        next_url = None
+        if len(hits) > page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+        return Response({'next': next_url, 'results': hits[:page_size]})
+
+# SYNC VIEWS
+class SyncView(APIView):
+    """
+    Everything visible to the user that changed since ``?cursor=``, with
+    tombstones for deletions and the cursor to pass next time. Omit the
+    cursor for a full snapshot. A response holds about SYNC_PAGE_SIZE
+    changes; while ``has_more`` is true, clients pass the cursor straight
+    back for the next page.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
-        project_id = self.kwargs['project_id']
-        task_id = self.kwargs['task_id']
-        task = get_object_or_404(Task, id=task_id, project__id=project_id)
+    def get(self, request):
+        until = timezone.now()
+        since = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                since = decode_cursor(cursor)
+            except (ValueError, OverflowError):
+                return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+            if since < until - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+                # Tombstones this old may have been pruned, so the delta could miss deletions.
+                return Response({'detail': 'Cursor has expired; sync again without one.'}, status=status.HTTP_410_GONE)
+
+        changes = changes_since(request.user, since, until, settings.SYNC_PAGE_SIZE)
+        if changes['has_more']:
+            # The next page starts where this one ended.
+            next_since = changes['until']
+        else:
+            # Rewind by the overlap so rows committed out of timestamp order are
+            # picked up next time; clients upsert, so repeats are harmless.
+            next_since = until - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP)
+            if since is not None:
+                next_since = max(next_since, since)
+        return Response({
+            'cursor': encode_cursor(next_since),
+            'has_more': changes['has_more'],
+            'projects': ProjectSerializer(changes['projects'], many=True).data,
+            'tasks': TaskSerializer(changes['tasks'], many=True).data,
+            'comments': CommentSerializer(changes['comments'], many=True).data,
+            'memberships': SyncMembershipSerializer(changes['memberships'], many=True).data,
+            'deleted': changes['deleted'],
+        })
+
+# EVENT VIEWS
+class ProjectEventsView(View):
+    """
+    Server-Sent Events stream of task, comment and membership changes in a
+    project. Each message is a compact JSON event; clients refetch the
+    objects it names. Needs the ASGI server, since a stream holds its
+    connection open for as long as the client listens.
+    """
+
+    async def get(self, request, project_id):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'detail': 'The change feed is only served over ASGI.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        try:
+            user = await aget_user_from_jwt(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not ProjectMembership.objects.filter(user=self.request.user, project=task.project).exists():
-            raise PermissionDenied("You are not a member of this project.")
+        # A stream outlives the role cache TTL, so check membership against the database.
+        role_cache.pop(role_cache_key(user.pk, project_id))
+        try:
+            role = await aget_project_role(user, project_id)
+        except Http404 as exc:
+            return JsonResponse({'detail': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        if role is None:
+            return JsonResponse({'detail': IsProjectMember.message}, status=status.HTTP_403_FORBIDDEN)
+
+        subscription = get_broadcaster().subscribe(project_id, user.pk)
+        response = StreamingHttpResponse(
+            event_stream(subscription, settings.PROJECT_EVENTS_HEARTBEAT),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
-        return Comment.objects.filter(task=task)
\ No newline at end of file
+# METRICS VIEWS
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint; see projects.metrics. Without METRICS_TOKEN
+    it is only served with DEBUG on, so a deployment that forgets the token
+    does not publish its metrics.
+    """
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token and not settings.DEBUG:
+            raise Http404
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('Unauthorized\n', status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+        return HttpResponse(metrics.registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
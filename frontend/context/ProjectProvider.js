@@ -202,28 +202,21 @@ function ProjectProvider({ children }) {
       const projectsData = await projectsRes.json();
       setProjects(projectsData);
 
-      // Then get tasks for each project
+      // Then get tasks across every project, following the cursor pages
       const allTasks = [];
-      for (const project of projectsData) {
-        try {
-          const tasksRes = await fetch(
-            `${api_url}/api/projects/${project.id}/tasks/`,
-            {
-              method: "GET",
-              headers: {
-                "Content-Type": "application/json",
-              },
-              credentials: "include",
-            }
-          );
-          if (tasksRes.ok) {
-            const projectTasks = await tasksRes.json();
-            allTasks.push(...projectTasks);
-          }
-        } catch (err) {
-          console.error(`Error fetching tasks for project ${project.id}:`, err);
-          // Continue with other projects even if one fails
-        }
+      let nextUrl = `${api_url}/api/tasks/`;
+      while (nextUrl) {
+        const tasksRes = await fetch(nextUrl, {
+          method: "GET",
+          headers: {
+            "Content-Type": "application/json",
+          },
+          credentials: "include",
+        });
+        if (!tasksRes.ok) throw new Error("Failed to fetch tasks");
+        const page = await tasksRes.json();
+        allTasks.push(...page.results);
+        nextUrl = page.next;
       }
 
       setTasks(allTasks);